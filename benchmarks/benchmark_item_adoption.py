@@ -0,0 +1,57 @@
+"""
+Compare the cost of adopting product items in the STACItem hierarchy with a to_dict/from_dict round trip and with
+STACItem.adopt, using Sentinel-2 L2A like items (40 assets with eo:bands and raster:bands).
+
+    PYTHONPATH=. python benchmarks/benchmark_item_adoption.py
+"""
+import datetime
+import timeit
+import tracemalloc
+
+import pystac
+
+from stac_cat_utils.stac import STACItem
+
+NB_ITEMS = 500
+NB_ASSETS = 40
+
+
+def create_product_item(index):
+    item = pystac.Item(id=f'S2A_MSIL2A_{index}',
+                       geometry={'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]},
+                       bbox=[0, 0, 1, 1], datetime=datetime.datetime.now(), properties={'platform': 'sentinel-2a'})
+    for asset_index in range(NB_ASSETS):
+        item.add_asset(f'B{asset_index:02d}', pystac.Asset(
+            href=f'/data/S2A_MSIL2A_{index}.SAFE/GRANULE/IMG_DATA/B{asset_index:02d}.jp2',
+            media_type=pystac.MediaType.JPEG2000, roles=['data'], title=f'Band {asset_index}',
+            extra_fields={
+                'eo:bands': [{'name': f'B{asset_index:02d}', 'common_name': 'red', 'center_wavelength': 0.665}],
+                'raster:bands': [{'nodata': 0, 'data_type': 'uint16', 'scale': 0.0001, 'offset': -0.1}],
+                'proj:shape': [10980, 10980], 'proj:transform': [10, 0, 600000, 0, -10, 2400000],
+            }))
+    return item
+
+
+def round_trip(items):
+    return [STACItem.from_dict(item.to_dict()) for item in items]
+
+
+def adopt(items):
+    return [STACItem.adopt(item) for item in items]
+
+
+def measure(adoption):
+    items = [create_product_item(index) for index in range(NB_ITEMS)]
+    tracemalloc.start()
+    start = timeit.default_timer()
+    adoption(items)
+    duration = timeit.default_timer() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+if __name__ == '__main__':
+    for name, adoption in [('to_dict/from_dict', round_trip), ('STACItem.adopt', adopt)]:
+        duration, peak = measure(adoption)
+        print(f'{name:>18}: {duration * 1000:8.1f} ms for {NB_ITEMS} items, peak allocation {peak / 2 ** 20:6.1f} MiB')
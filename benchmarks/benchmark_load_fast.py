@@ -0,0 +1,53 @@
+"""
+Compare loading a saved catalog through the pystac lazy link resolution (one read and parse per item, resolved one
+after the other) with STACCatalog.load_fast, using a catalog of Sentinel-2 L2A like items.
+
+    PYTHONPATH=. python benchmarks/benchmark_load_fast.py
+"""
+import os
+import shutil
+import tempfile
+import timeit
+
+import pystac
+
+from benchmark_item_adoption import create_product_item
+from stac_cat_utils.stac import STACCatalog
+from stac_cat_utils.stac_io import CatalogStacIO
+
+NB_COLLECTIONS = 4
+NB_ITEMS = 1000
+
+
+def create_saved_catalog(path):
+    catalog = pystac.Catalog(id='benchmark', description='Benchmark catalog')
+    for collection_index in range(NB_COLLECTIONS):
+        collection = pystac.Collection(id=f'collection-{collection_index}', description='Benchmark collection',
+                                       extent=pystac.Extent(pystac.SpatialExtent([0, 0, 1, 1]),
+                                                            pystac.TemporalExtent([[None, None]])))
+        collection.add_items(create_product_item(f'{collection_index}-{index}')
+                             for index in range(NB_ITEMS // NB_COLLECTIONS))
+        catalog.add_child(collection)
+    catalog.normalize_and_save(path, catalog_type=pystac.CatalogType.SELF_CONTAINED,
+                               stac_io=CatalogStacIO(json_backend='json'))
+
+
+def pystac_load(path):
+    catalog = pystac.Catalog.from_file(os.path.join(path, 'catalog.json'))
+    return list(catalog.get_all_items())
+
+
+def fast_load(path, **kwargs):
+    return list(STACCatalog.load_fast(path, **kwargs).get_all_items())
+
+
+if __name__ == '__main__':
+    catalog_path = tempfile.mkdtemp()
+    try:
+        create_saved_catalog(catalog_path)
+        for name, load in [('pystac', pystac_load), ('load_fast', fast_load),
+                           ('load_fast (fields)', lambda path: fast_load(path, fields=['properties.platform']))]:
+            duration = min(timeit.repeat(lambda: load(catalog_path), number=1, repeat=3))
+            print(f'{name:>18}: {duration * 1000:8.1f} ms for {NB_ITEMS} items')
+    finally:
+        shutil.rmtree(catalog_path)
@@ -1,6 +1,10 @@
+import logging
+
 from stac_cat_utils.stac_generator import StacCatalogGenerator
 
 if __name__ == '__main__':
+    # The generator logs its progress to the StacCatalogGenerator logger
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     stac_gen = StacCatalogGenerator()
 
     src_path = './../test_files'
@@ -12,7 +12,9 @@ setup(
     author_email='spaceapps@spaceapplications.com',
     long_description=long_description,
     long_description_content_type='text/markdown',
-    packages=['stac-cat-utilr', 'stac_cat_utils/slc'],
+    packages=['stac_cat_utils', 'stac_cat_utils.slc'],
+    # STAC JSON schemas used by stac_cat_utils.validation, by <host>/<path> of their URI
+    package_data={'stac_cat_utils': ['schemas/*/*/*.json', 'schemas/*/*/*/*.json', 'schemas/*/*/*/*/*.json']},
     keywords='STAC, pystac, STAC generation',
     python_requires='>=3.6',
     license='BSD',
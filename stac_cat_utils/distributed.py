@@ -0,0 +1,156 @@
+import heapq
+import logging
+import os
+
+import pystac
+
+from stac_cat_utils.sqlite_index import write_sqlite_index, INDEX_FILE_NAME
+from stac_cat_utils.stac import STACCatalog
+from stac_cat_utils.stac_generator import StacCatalogGenerator
+from stac_cat_utils.stac_io import CatalogStacIO
+from stac_cat_utils.summaries import SummaryAggregator
+from stac_cat_utils.utils import generate_path_list, is_chunked_store, is_product_folder
+
+logger = logging.getLogger('StacCatalogGenerator')
+
+# Cost of a work unit: 1 per file, plus 1 per 64 MiB of data
+BYTES_PER_COST = 1 << 26
+
+
+def _folder_stats(path):
+    nb_files = size = 0
+    for folder, _, file_names in os.walk(path):
+        for file_name in file_names:
+            nb_files += 1
+            size += os.stat(os.path.join(folder, file_name)).st_size
+    return nb_files, size
+
+
+def work_units(src_path, ignore_paths=None, item_paths=None, store_paths=None):
+    """
+    Split src_path into the work units catalogued independently by create_shard: product folders, chunked stores
+    and item folders (handled as a whole by the generator), and the files of the other folders. Return the
+    (path, number of files, size) of each unit.
+    """
+    ignore_paths = set(generate_path_list(ignore_paths))
+    item_paths = set(generate_path_list(item_paths))
+    store_paths = generate_path_list(store_paths)
+
+    def folder_units(folder):
+        with os.scandir(folder) as scanned_entries:
+            dir_entries = list(scanned_entries)
+        folder_content = [dir_entry.name for dir_entry in dir_entries]
+        if folder in item_paths or is_product_folder(folder, folder_content)['is_product'] or \
+                is_chunked_store(folder, folder_content, store_paths)['is_store']:
+            yield (folder, *_folder_stats(folder))
+            return
+        for dir_entry in dir_entries:
+            if dir_entry.path in ignore_paths:
+                continue
+            if dir_entry.is_dir():
+                yield from folder_units(dir_entry.path)
+            elif dir_entry.is_file():
+                yield dir_entry.path, 1, dir_entry.stat().st_size
+
+    return list(folder_units(os.path.normpath(src_path)))
+
+
+def plan(src_path, n_shards, ignore_paths=None, item_paths=None, store_paths=None):
+    """
+    Split src_path into n_shards balanced lists of work units (see work_units), to be catalogued by create_shard on
+    different nodes. The units are assigned from the most to the least costly to the least loaded shard, the cost of
+    a unit being its number of files plus its size in units of 64 MiB. The plan only depends on the tree.
+    """
+    units = work_units(src_path, ignore_paths, item_paths, store_paths)
+    units.sort(key=lambda unit: (-(unit[1] + unit[2] / BYTES_PER_COST), unit[0]))
+    shards = [[] for _ in range(n_shards)]
+    loads = [(0.0, index) for index in range(n_shards)]
+    for path, nb_files, size in units:
+        load, index = heapq.heappop(loads)
+        shards[index].append(path)
+        heapq.heappush(loads, (load + nb_files + size / BYTES_PER_COST, index))
+    return [sorted(shard) for shard in shards]
+
+
+def create_shard(src_path, paths, fragment_path, save_kwargs=None, **create_kwargs):
+    """
+    Catalogue the work units of a shard (see plan) and save the partial catalog in fragment_path. create_kwargs are
+    the arguments of StacCatalogGenerator.create and must be the same for all the shards, save_kwargs the arguments
+    of StacCatalogGenerator.save.
+    """
+    generator = StacCatalogGenerator()
+    run = generator.create_run(src_path, paths=paths, **create_kwargs)
+    generator.save(fragment_path, run=run, **(save_kwargs or {}))
+    return fragment_path
+
+
+def _merge_into(target, source):
+    # Catalogs and collections are merged by id, i.e. by folder, and the objects missing from target are moved to it
+    if isinstance(source, pystac.Collection):
+        for key, asset in source.assets.items():
+            if key not in target.assets:
+                target.add_asset(key, asset)
+        # The summaries which can not be computed again from the saved items (e.g. the eo:bands of the assets)
+        bands = {band['name']: band for band in [*(target.summaries.get_list('eo:bands') or []),
+                                                 *(source.summaries.get_list('eo:bands') or [])]}
+        target.summaries = pystac.Summaries({**source.summaries.to_dict(), **target.summaries.to_dict()})
+        if bands:
+            target.summaries.add('eo:bands', list(bands.values()))
+    children = {child.id: child for child in target.get_children()}
+    for child in list(source.get_children()):
+        if child.id in children:
+            _merge_into(children[child.id], child)
+        else:
+            target.add_child(child)
+    items = {item.id for item in target.get_items()}
+    for item in list(source.get_items()):
+        if item.id in items:
+            logger.warning(f'{item} is in several fragments, only the first one is kept')
+            continue
+        target.add_item(item)
+
+
+def _link_order(link):
+    if link.rel not in (pystac.RelType.CHILD, pystac.RelType.ITEM):
+        return 0, '', ''
+    return 1, link.rel, link.target.id
+
+
+def merge(fragments, dest_path, stac_io=None, compact=False, compression=None, json_backend=None,
+          sqlite_index=False):
+    """
+    Merge the partial catalogs saved by create_shard into a single catalog saved in dest_path. The fragments are
+    merged in the order of their paths and the children and items of every catalog and collection are sorted by id,
+    so that the merged catalog only depends on the fragments. The extents and summaries of the collections are
+    computed again from all their items, the summaries of the fragments which can not be (e.g. the eo:bands of the
+    assets) are merged. Return the merged catalog.
+    """
+    fragment_catalogs = [STACCatalog.load_fast(fragment) for fragment in sorted(fragments)]
+    catalog = STACCatalog(id=fragment_catalogs[0].id, description=fragment_catalogs[0].description,
+                          title=fragment_catalogs[0].title)
+    for fragment_catalog in fragment_catalogs:
+        _merge_into(catalog, fragment_catalog)
+
+    for container, _, items in catalog.walk():
+        items = list(items)
+        container.links.sort(key=_link_order)
+        for stac_object in [container, *items]:
+            # The self links still point to the fragments, the asset hrefs must not be made relative to them
+            stac_object.remove_links(pystac.RelType.SELF)
+            stac_object.set_root(catalog)
+        if isinstance(container, pystac.Collection) and items:
+            container.update_extent_from_items()
+            summary_aggregator = SummaryAggregator()
+            for item in items:
+                summary_aggregator.add_item(item)
+            container.summaries = pystac.Summaries({**container.summaries.to_dict(),
+                                                    **summary_aggregator.summaries().to_dict()})
+
+    catalog.normalize_hrefs(dest_path)
+    if stac_io is None:
+        stac_io = CatalogStacIO(json_backend=json_backend, compact=compact, compression=compression)
+    catalog.save(catalog_type=pystac.CatalogType.SELF_CONTAINED, stac_io=stac_io)
+    if sqlite_index:
+        write_sqlite_index(catalog, os.path.join(dest_path, INDEX_FILE_NAME))
+    logger.debug(f'{len(fragment_catalogs)} fragments merged in {dest_path}')
+    return catalog
@@ -0,0 +1,220 @@
+import json
+import os
+
+import numpy as np
+import pystac
+
+from stac_cat_utils.utils import parse_datetime_interval
+
+try:
+    import shapely
+    from shapely import STRtree
+except ImportError:
+    # Shapely < 2 has no vectorized API, the geometries are then only filtered by their bbox
+    shapely = None
+
+DEFAULT_INDEX_PROPERTIES = ('platform', 'constellation', 'instruments')
+
+
+def _timestamp(value, default):
+    return value.timestamp() if value else default
+
+
+def _item_geometry(geometry, bbox):
+    if geometry:
+        return shapely.geometry.shape(geometry)
+    return None if np.isnan(bbox[0]) else shapely.box(*bbox)
+
+
+def _pack_wkb(geometries_wkb):
+    # WKB geometries are stored as a single byte buffer and the offsets of each geometry in the buffer
+    sizes = np.array([len(wkb) if wkb is not None else 0 for wkb in geometries_wkb], dtype=np.int64)
+    data = np.frombuffer(b''.join(wkb or b'' for wkb in geometries_wkb), dtype=np.uint8)
+    return data, np.concatenate([[0], np.cumsum(sizes)])
+
+
+def _unpack_wkb(data, offsets):
+    return np.array([bytes(data[start:end]) if end > start else None
+                     for start, end in zip(offsets[:-1], offsets[1:])], dtype=object)
+
+
+class IndexedItem:
+    """
+    Lightweight handle of an item matching a CatalogIndex query. The STAC item itself is only read (or returned from
+    the indexed catalog) when the item attribute is accessed.
+    """
+    __slots__ = ('_index', 'position')
+
+    def __init__(self, index, position):
+        self._index = index
+        self.position = position
+
+    @property
+    def id(self):
+        return str(self._index.ids[self.position])
+
+    @property
+    def collection_id(self):
+        return self._index.collection_ids[self.position]
+
+    @property
+    def href(self):
+        return self._index.hrefs[self.position]
+
+    @property
+    def bbox(self):
+        return self._index.bboxes[self.position].tolist()
+
+    @property
+    def item(self) -> pystac.Item:
+        if self._index.items is not None:
+            return self._index.items[self.position]
+        return pystac.Item.from_file(self.href)
+
+    def __repr__(self):
+        return f'<IndexedItem id={self.id}>'
+
+
+class CatalogIndex:
+    """
+    Columnar index of the items of a catalog: bboxes, start and end datetimes (as POSIX timestamps) and categorical
+    properties (as integer codes) are packed in NumPy arrays, and the geometries in a Shapely STRtree, so that bbox,
+    datetime and property queries are answered in a vectorized way.
+
+    The index can be saved next to the catalog with save and reloaded with load, the columns being memory-mapped.
+    """
+
+    def __init__(self, ids, collection_ids, hrefs, bboxes, starts, ends, categories, codes, geometries=None,
+                 items=None):
+        self.ids = ids
+        self.collection_ids = collection_ids
+        self.hrefs = hrefs
+        self.bboxes = bboxes
+        self.starts = starts
+        self.ends = ends
+        self.categories = categories
+        self.codes = codes
+        self.items = items
+        # Packed WKB geometries, only decoded when the STRtree is first needed
+        self.__geometries = geometries
+        self.__tree = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_catalog(cls, catalog: pystac.Catalog, properties=DEFAULT_INDEX_PROPERTIES):
+        items = list(catalog.get_all_items())
+        bboxes = np.full((len(items), 4), np.nan, dtype=np.float64)
+        starts = np.empty(len(items), dtype=np.float64)
+        ends = np.empty(len(items), dtype=np.float64)
+        values = {name: [] for name in properties}
+        geometries = []
+        for position, item in enumerate(items):
+            if item.bbox:
+                bboxes[position] = item.bbox[:2] + item.bbox[-3:-1] if len(item.bbox) == 6 else item.bbox
+            start = item.common_metadata.start_datetime or item.datetime
+            end = item.common_metadata.end_datetime or item.datetime
+            starts[position] = _timestamp(start, -np.inf)
+            ends[position] = _timestamp(end, np.inf)
+            for name in properties:
+                value = item.properties.get(name)
+                # Multi-valued properties (e.g. instruments) are indexed by their joined values
+                values[name].append(','.join(value) if isinstance(value, list) else value)
+            geometries.append(item.geometry)
+
+        categories = {}
+        codes = {}
+        for name, column in values.items():
+            categories[name], codes[name] = np.unique(np.array(['' if v is None else str(v) for v in column],
+                                                               dtype=str), return_inverse=True)
+            categories[name] = categories[name].tolist()
+            codes[name] = codes[name].astype(np.int32)
+
+        packed_geometries = None
+        if shapely is not None:
+            packed_geometries = _pack_wkb(shapely.to_wkb(np.array(
+                [_item_geometry(geometry, bbox) for geometry, bbox in zip(geometries, bboxes)], dtype=object)))
+
+        return cls(ids=np.array([item.id for item in items], dtype=str),
+                   collection_ids=[item.collection_id for item in items],
+                   hrefs=[item.get_self_href() for item in items],
+                   bboxes=bboxes, starts=starts, ends=ends, categories=categories, codes=codes,
+                   geometries=packed_geometries, items=items)
+
+    @property
+    def tree(self):
+        if self.__tree is None and self.__geometries is not None:
+            self.__tree = STRtree(shapely.from_wkb(_unpack_wkb(*self.__geometries)))
+        return self.__tree
+
+    def mask(self, bbox=None, datetime=None, **properties):
+        """
+        Boolean mask of the items intersecting the bbox ([min_lon, min_lat, max_lon, max_lat]) and the datetime
+        interval (see parse_datetime_interval) whose properties have the given value (or one of the given values).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if bbox is not None:
+            mask &= ((self.bboxes[:, 0] <= bbox[2]) & (self.bboxes[:, 2] >= bbox[0]) &
+                     (self.bboxes[:, 1] <= bbox[3]) & (self.bboxes[:, 3] >= bbox[1]))
+            if self.tree is not None:
+                geometry_mask = np.zeros(len(self), dtype=bool)
+                geometry_mask[self.tree.query(shapely.box(*bbox), predicate='intersects')] = True
+                mask &= geometry_mask
+        datetime_interval = parse_datetime_interval(datetime)
+        if datetime_interval:
+            start, end = datetime_interval
+            mask &= (self.starts <= _timestamp(end, np.inf)) & (self.ends >= _timestamp(start, -np.inf))
+        for name, value in properties.items():
+            if name not in self.categories:
+                raise ValueError(f'Property {name} is not indexed, expected one of {list(self.categories)}')
+            wanted = value if isinstance(value, (list, tuple, set)) else [value]
+            wanted_codes = [code for code, category in enumerate(self.categories[name]) if category in wanted]
+            mask &= np.isin(self.codes[name], wanted_codes)
+        return mask
+
+    def query(self, bbox=None, datetime=None, **properties):
+        return [IndexedItem(self, position) for position in np.flatnonzero(self.mask(bbox, datetime, **properties))]
+
+    def save(self, path):
+        """
+        Save the index in the path folder (e.g. next to the catalog.json), the NumPy columns as .npy files which are
+        memory-mapped when the index is loaded.
+        """
+        os.makedirs(path, exist_ok=True)
+        hrefs = [item.get_self_href() for item in self.items] if self.items is not None else self.hrefs
+        np.save(os.path.join(path, 'bboxes.npy'), self.bboxes)
+        np.save(os.path.join(path, 'starts.npy'), self.starts)
+        np.save(os.path.join(path, 'ends.npy'), self.ends)
+        for name, codes in self.codes.items():
+            np.save(os.path.join(path, f'{name}.npy'), codes)
+        if self.__geometries is not None:
+            np.save(os.path.join(path, 'geometries.npy'), self.__geometries[0])
+            np.save(os.path.join(path, 'geometries_offsets.npy'), self.__geometries[1])
+        with open(os.path.join(path, 'index.json'), 'w') as index_file:
+            json.dump({
+                'ids': self.ids.tolist(),
+                'collection_ids': self.collection_ids,
+                'hrefs': hrefs,
+                'categories': self.categories,
+                'geometries': self.__geometries is not None
+            }, index_file)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'index.json')) as index_file:
+            metadata = json.load(index_file)
+        geometries = None
+        if metadata['geometries'] and shapely is not None:
+            geometries = (np.load(os.path.join(path, 'geometries.npy'), mmap_mode='r'),
+                          np.load(os.path.join(path, 'geometries_offsets.npy'), mmap_mode='r'))
+        return cls(ids=np.array(metadata['ids'], dtype=str),
+                   collection_ids=metadata['collection_ids'],
+                   hrefs=metadata['hrefs'],
+                   bboxes=np.load(os.path.join(path, 'bboxes.npy'), mmap_mode='r'),
+                   starts=np.load(os.path.join(path, 'starts.npy'), mmap_mode='r'),
+                   ends=np.load(os.path.join(path, 'ends.npy'), mmap_mode='r'),
+                   categories=metadata['categories'],
+                   codes={name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                          for name in metadata['categories']},
+                   geometries=geometries)
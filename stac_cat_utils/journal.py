@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+
+import pystac
+
+from stac_cat_utils.stac import STACItem
+from stac_cat_utils.stac_io import CatalogStacIO
+from stac_cat_utils.utils import path_signature
+
+logger = logging.getLogger('StacCatalogGenerator')
+
+
+def _element_to_dict(element):
+    if isinstance(element, pystac.Item):
+        return {'item': element.to_dict(include_self_link=False, transform_hrefs=False)}
+    return {'asset': element.to_dict()}
+
+
+class _RecordingContainer:
+    # Stands for the container of a work unit, recording the STAC elements its handler adds to it before they are
+    # linked to the catalog
+    def __init__(self, container):
+        self.container = container
+        self.element_dicts = []
+
+    def add_stac_element(self, element):
+        self.element_dicts.append(_element_to_dict(element))
+        self.container.add_stac_element(element)
+
+
+def _element_from_dict(element_dict):
+    if 'item' in element_dict:
+        return STACItem.from_dict(element_dict['item'])
+    return pystac.Asset.from_dict(element_dict['asset'])
+
+
+class CreateJournal:
+    """
+    Append-only JSON Lines journal of the work units (product folders and archives, chunked stores and files)
+    catalogued by StacCatalogGenerator.create, with the STAC items and assets created for them.
+
+    Each unit is written and flushed to disk once its handler is done. When create is run again with the same
+    journal (e.g. after a crash), the units whose files have not changed since (see path_signature) are replayed
+    from the journal instead of being extracted again. A last line cut by a crash is ignored. compact rewrites the
+    journal with only the latest entry of each unit catalogued by the run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.replayed = 0
+        self.recorded = 0
+        self.__entries = self.__read(path)
+        self.__used = set()
+        self.__stac_io = CatalogStacIO(compact=True)
+        self.__file = open(path, 'ab')
+        if self.__file.tell() and not self.__ends_with_newline(path):
+            # The entries appended after a cut line must start on a new line
+            self.__file.write(b'\n')
+
+    @staticmethod
+    def __ends_with_newline(path):
+        with open(path, 'rb') as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b'\n'
+
+    @staticmethod
+    def __read(path):
+        entries = {}
+        if not os.path.exists(path):
+            return entries
+        with open(path, 'rb') as journal_file:
+            for line_number, line in enumerate(journal_file, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f'{path}:{line_number} is not a complete journal entry, it is ignored')
+                    continue
+                entries[entry['path']] = entry
+        return entries
+
+    def replay(self, path):
+        """Return the STAC elements of a unit of the journal, or None when it must be catalogued again."""
+        entry = self.__entries.get(path)
+        if entry is None:
+            return None
+        try:
+            if entry['signature'] != list(path_signature(path)):
+                return None
+        except OSError:
+            return None
+        self.__used.add(path)
+        self.replayed += 1
+        return [_element_from_dict(element_dict) for element_dict in entry['elements']]
+
+    def record(self, path, element_dicts):
+        entry = {'path': path, 'signature': list(path_signature(path)), 'elements': element_dicts}
+        # Values read with rasterio (e.g. numpy scalars) are serialized as in the catalog files
+        data = self.__stac_io.json_dumps_bytes(entry)
+        self.__file.write(data + b'\n')
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__entries[path] = json.loads(data)
+        self.__used.add(path)
+        self.recorded += 1
+
+    def run_unit(self, path, container, handler):
+        """Add the STAC elements of a unit to its container, replayed from the journal or created by handler."""
+        elements = self.replay(path)
+        if elements is not None:
+            for element in elements:
+                container.add_stac_element(element)
+            return
+        recording_container = _RecordingContainer(container)
+        handler(recording_container)
+        self.record(path, recording_container.element_dicts)
+
+    def compact(self):
+        """Rewrite the journal with the latest entry of each unit catalogued since it was opened, and close it."""
+        self.__file.close()
+        temporary_path = f'{self.path}.{os.getpid()}'
+        with open(temporary_path, 'wb') as journal_file:
+            for path in sorted(self.__used):
+                journal_file.write(self.__stac_io.json_dumps_bytes(self.__entries[path]) + b'\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temporary_path, self.path)
+
+    def close(self):
+        self.__file.close()
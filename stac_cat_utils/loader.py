@@ -0,0 +1,83 @@
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+import fsspec
+
+from stac_cat_utils.stac_io import CatalogStacIO, COMPRESSION_SUFFIXES
+
+STAC_TYPES = {'Catalog', 'Collection', 'Feature'}
+
+STAC_JSON_SUFFIXES = ('.json', *(f'.json{suffix}' for suffix in COMPRESSION_SUFFIXES.values()))
+
+# Item fields always kept when only some fields are hydrated
+ITEM_REQUIRED_FIELDS = {'type', 'stac_version', 'stac_extensions', 'id', 'geometry', 'bbox', 'links', 'collection'}
+
+ITEM_REQUIRED_PROPERTIES = {'datetime', 'start_datetime', 'end_datetime'}
+
+DEFAULT_WORKERS = 16
+
+
+def discover_stac_files(root_path, listing=None):
+    """
+    List the STAC JSON files under root_path in a single directory walk, or read them from a listing: an iterable of
+    paths or the path of a text file with one path per line, relative to root_path.
+    """
+    if listing is None:
+        paths = []
+        for folder, _, file_names in os.walk(root_path):
+            paths.extend(os.path.join(folder, file_name) for file_name in file_names
+                         if file_name.endswith(STAC_JSON_SUFFIXES))
+        return paths
+    if isinstance(listing, (str, os.PathLike)):
+        with open(listing) as listing_file:
+            listing = [line.strip() for line in listing_file if line.strip()]
+    return [os.path.join(root_path, path) for path in listing]
+
+
+def stac_href(path):
+    """Absolute href of the STAC object of a JSON file, without the suffix of compressed files."""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if path.endswith(f'.json{suffix}'):
+            path = path[:-len(suffix)]
+    return os.path.abspath(path)
+
+
+def hydrate_item_fields(item_dict, fields):
+    """
+    Reduce an item dict to the required item fields, the datetimes and the requested fields: top level fields (e.g.
+    'assets') or properties prefixed by 'properties.' (e.g. 'properties.platform').
+    """
+    properties = item_dict.get('properties', {})
+    if 'properties' not in fields:
+        properties_fields = {field.split('.', 1)[1] for field in fields if field.startswith('properties.')}
+        properties = {key: value for key, value in properties.items()
+                      if key in ITEM_REQUIRED_PROPERTIES or key in properties_fields}
+    item_dict = {key: value for key, value in item_dict.items() if key in ITEM_REQUIRED_FIELDS or key in fields}
+    item_dict['properties'] = properties
+    return item_dict
+
+
+def read_stac_dicts(paths, workers=DEFAULT_WORKERS, fields=None):
+    """
+    Read and parse the JSON files concurrently. Return a dict of the STAC objects by absolute href, the other JSON
+    files being ignored. When fields are given, only these fields of the items are kept (see hydrate_item_fields).
+    """
+    json_loads = CatalogStacIO().json_loads
+
+    def read(path):
+        if path.endswith('.json'):
+            with open(path, 'rb') as json_file:
+                data = json_file.read()
+        else:
+            with fsspec.open(path, 'rb', compression='infer') as json_file:
+                data = json_file.read()
+        stac_dict = json_loads(data)
+        if not isinstance(stac_dict, dict) or stac_dict.get('type') not in STAC_TYPES:
+            return path, None
+        if fields is not None and stac_dict['type'] == 'Feature':
+            stac_dict = hydrate_item_fields(stac_dict, fields)
+        return path, stac_dict
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return {stac_href(path): stac_dict for path, stac_dict in executor.map(read, paths) if stac_dict is not None}
@@ -5,7 +5,7 @@ from typing import Optional, Tuple
 import pystac
 from pystac.extensions.eo import EOExtension
 
-from stac_cat_utils.slc.constants import SENTINEL_POLARIZATIONS
+from stac_cat_utils.slc.constants import SENTINEL_POLARIZATIONS, SENTINEL_SLC_IMAGE_DESCRIPTION
 
 logger = logging.getLogger(__name__)
 
@@ -39,13 +39,12 @@ def image_asset_from_href(
         band = SENTINEL_POLARIZATIONS[band_id.split('-')[1]]
 
         # Create asset
-        desc = "Actual SAR data that have been processed into an image"
         asset = pystac.Asset(
             href=asset_href,
             media_type=asset_media_type,
             title=f"{band_id.split('-')[0].upper()} {band.name} Data",
             roles=["data"],
-            description=desc,
+            description=SENTINEL_SLC_IMAGE_DESCRIPTION,
         )
 
         asset_eo = EOExtension.ext(asset)
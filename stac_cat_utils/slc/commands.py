@@ -1,5 +1,6 @@
 import logging
 import os
+from typing import Tuple
 
 import click
 
@@ -20,11 +21,23 @@ def slc_cmd() -> None:
     "create-collection", short_help="Create a Sentinel1 SLC STAC Collection"
 )
 @click.argument("destination")
-def create_collection_command(destination: str) -> None:
-    """Creates a STAC Collection for Sentinel1 SLC products"""
+@click.option(
+    "--src",
+    multiple=True,
+    help="Sentinel1 SLC scene whose item is summarised in the collection, may be repeated",
+)
+def create_collection_command(destination: str, src: Tuple[str, ...] = ()) -> None:
+    """Creates a STAC Collection for Sentinel1 SLC products
+
+    Args:
+        destination (str): folder of the STAC Collection JSON file that will be created
+        src (Tuple[str, ...]): paths to the scenes the summaries are derived from. Without
+            scenes, the summaries list all the possible values.
+    """
 
     json_path = os.path.join(destination, "sentinel1-slc.json")
-    collection = create_collection(json_path)
+    items = [create_item(scene) for scene in src] or None
+    collection = create_collection(json_path, items=items)
     collection.validate()
     collection.save_object(dest_href=json_path)
 
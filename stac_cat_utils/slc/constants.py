@@ -134,6 +134,39 @@ SENTINEL_SLC_SAR: Dict[str, Any] = {
     "looks_equivalent_number": [3.7, 29.7, 398.4, 4.4, 81.8, 2.8, 10.7, 123.7],
 }
 
+SENTINEL_SLC_IMAGE_DESCRIPTION = "Actual SAR data that have been processed into an image"
+
+SENTINEL_SLC_CALIBRATION_DESCRIPTION = (
+    "Calibration metadata including calibration information and the beta nought, "
+    "sigma nought, gamma and digital number look-up tables that can be used for "
+    "absolute product calibration."
+)
+
+SENTINEL_SLC_NOISE_DESCRIPTION = "Estimated thermal noise look-up tables"
+
+SENTINEL_SLC_PRODUCT_DESCRIPTION = (
+    "Describes the main characteristics corresponding to the band: state of the "
+    "platform during acquisition, image properties, Doppler information, geographic "
+    "location, etc."
+)
+
+SENTINEL_SLC_MANIFEST_DESCRIPTION = (
+    "General product metadata in XML format. Contains a high-level textual "
+    "description of the product and references to all of product's components, "
+    "the product metadata, including the product identification and the resource "
+    "references, and references to the physical location of each component file "
+    "contained in the product."
+)
+
+SENTINEL_SLC_THUMBNAIL_DESCRIPTION = (
+    "An averaged, decimated preview image in PNG format. Single polarization "
+    "products are represented with a grey scale image. Dual polarization products "
+    "are represented by a single composite colour image in RGB with the red channel "
+    "(R) representing the  co-polarization VV or HH), the green channel (G) "
+    "represents the cross-polarization (VH or HV) and the blue channel (B) "
+    "represents the ratio of the cross an co-polarizations."
+)
+
 SENTINEL_SLC_ASSETS = {
     "vh": AssetDefinition(
         {
@@ -171,11 +204,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HH Calibration Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Calibration metadata including calibration information and the beta nought, "
-                "sigma nought, gamma and digital number look-up tables that can be used for "
-                "absolute product calibration."
-            ),
+            "description": SENTINEL_SLC_CALIBRATION_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -183,11 +212,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HV Calibration Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Calibration metadata including calibration information and the beta nought, "
-                "sigma nought, gamma and digital number look-up tables that can be used for "
-                "absolute product calibration."
-            ),
+            "description": SENTINEL_SLC_CALIBRATION_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -195,11 +220,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VH Calibration Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Calibration metadata including calibration information and the beta nought, "
-                "sigma nought, gamma and digital number look-up tables that can be used for "
-                "absolute product calibration."
-            ),
+            "description": SENTINEL_SLC_CALIBRATION_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -207,11 +228,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VV Calibration Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Calibration metadata including calibration information and the beta nought, "
-                "sigma nought, gamma and digital number look-up tables that can be used for "
-                "absolute product calibration."
-            ),
+            "description": SENTINEL_SLC_CALIBRATION_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -219,7 +236,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HH Noise Schema",
             "type": pystac.MediaType.XML,
-            "description": "Estimated thermal noise look-up tables",
+            "description": SENTINEL_SLC_NOISE_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -227,7 +244,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HV Noise Schema",
             "type": pystac.MediaType.XML,
-            "description": "Estimated thermal noise look-up tables",
+            "description": SENTINEL_SLC_NOISE_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -235,7 +252,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VH Noise Schema",
             "type": pystac.MediaType.XML,
-            "description": "Estimated thermal noise look-up tables",
+            "description": SENTINEL_SLC_NOISE_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -243,7 +260,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VV Noise Schema",
             "type": pystac.MediaType.XML,
-            "description": "Estimated thermal noise look-up tables",
+            "description": SENTINEL_SLC_NOISE_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -251,11 +268,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HH Product Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Describes the main characteristics corresponding to the band: state of the "
-                "platform during acquisition, image properties, Doppler information, geographic "
-                "location, etc."
-            ),
+            "description": SENTINEL_SLC_PRODUCT_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -263,11 +276,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "HV Product Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Describes the main characteristics corresponding to the band: state of the "
-                "platform during acquisition, image properties, Doppler information, geographic "
-                "location, etc."
-            ),
+            "description": SENTINEL_SLC_PRODUCT_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -275,11 +284,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VH Product Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Describes the main characteristics corresponding to the band: state of the "
-                "platform during acquisition, image properties, Doppler information, geographic "
-                "location, etc."
-            ),
+            "description": SENTINEL_SLC_PRODUCT_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -287,11 +292,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "VV Product Schema",
             "type": pystac.MediaType.XML,
-            "description": (
-                "Describes the main characteristics corresponding to the band: state of the "
-                "platform during acquisition, image properties, Doppler information, geographic "
-                "location, etc."
-            ),
+            "description": SENTINEL_SLC_PRODUCT_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -299,13 +300,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "Manifest File",
             "type": pystac.MediaType.XML,
-            "description": (
-                "General product metadata in XML format. Contains a high-level textual "
-                "description of the product and references to all of product's components, "
-                "the product metadata, including the product identification and the resource "
-                "references, and references to the physical location of each component file "
-                "contained in the product."
-            ),
+            "description": SENTINEL_SLC_MANIFEST_DESCRIPTION,
             "roles": ["metadata"],
         }
     ),
@@ -313,14 +308,7 @@ SENTINEL_SLC_ASSETS = {
         {
             "title": "Preview Image",
             "type": pystac.MediaType.PNG,
-            "description": (
-                "An averaged, decimated preview image in PNG format. Single polarization "
-                "products are represented with a grey scale image. Dual polarization products "
-                "are represented by a single composite colour image in RGB with the red channel "
-                "(R) representing the  co-polarization VV or HH), the green channel (G) "
-                "represents the cross-polarization (VH or HV) and the blue channel (B) "
-                "represents the ratio of the cross an co-polarizations."
-            ),
+            "description": SENTINEL_SLC_THUMBNAIL_DESCRIPTION,
             "roles": ["thumbnail"],
         }
     ),
@@ -11,7 +11,13 @@ from stactools.core.io import ReadHrefModifier
 from stactools.core.io.xml import XmlElement
 
 from . import Format
-from .constants import SAFE_MANIFEST_ASSET_KEY
+from .constants import (
+    SAFE_MANIFEST_ASSET_KEY,
+    SENTINEL_SLC_CALIBRATION_DESCRIPTION,
+    SENTINEL_SLC_MANIFEST_DESCRIPTION,
+    SENTINEL_SLC_NOISE_DESCRIPTION,
+    SENTINEL_SLC_PRODUCT_DESCRIPTION,
+)
 
 
 class ManifestError(Exception):
@@ -185,30 +191,17 @@ class MetadataLinks:
         ]
 
     def create_manifest_asset(self) -> Tuple[str, pystac.asset.Asset]:
-        desc = (
-            "General product metadata in XML format. Contains a high-level textual "
-            "description of the product and references to all of product's components, "
-            "the product metadata, including the product identification and the resource "
-            "references, and references to the physical location of each component file "
-            "contained in the product."
-        )
-
         asset = pystac.Asset(
             href=self.href,
             media_type=pystac.MediaType.XML,
             title="Manifest File",
             roles=["metadata"],
-            description=desc,
+            description=SENTINEL_SLC_MANIFEST_DESCRIPTION,
         )
         return SAFE_MANIFEST_ASSET_KEY, asset
 
     def create_product_asset(self) -> List[Tuple[str, pystac.asset.Asset]]:
         assets = []
-        desc = (
-            "Describes the main characteristics corresponding to the band: state of the "
-            "platform during acquisition, image properties, Doppler information, geographic "
-            "location, etc."
-        )
         for key, href in self.annotation_hrefs:
             # Extract polarisation from href
             polarisation = extract_polarisation(href)
@@ -220,18 +213,13 @@ class MetadataLinks:
                     media_type=pystac.MediaType.XML,
                     title=title,
                     roles=["metadata"],
-                    description=desc,
+                    description=SENTINEL_SLC_PRODUCT_DESCRIPTION,
                 )
                 assets.append((f'{polarisation.split("-")[0]}-{key}', asset))
         return assets
 
     def create_calibration_asset(self) -> List[Tuple[str, pystac.asset.Asset]]:
         assets = []
-        desc = (
-            "Calibration metadata including calibration information and the beta nought, "
-            "sigma nought, gamma and digital number look-up tables that can be used for "
-            "absolute product calibration."
-        )
         for key, href in self.calibration_hrefs:
             # Extract polarisation from href
             polarisation = extract_polarisation(href)
@@ -243,7 +231,7 @@ class MetadataLinks:
                     media_type=pystac.MediaType.XML,
                     title=title,
                     roles=["metadata"],
-                    description=desc,
+                    description=SENTINEL_SLC_CALIBRATION_DESCRIPTION,
                 )
                 assets.append((f'{polarisation.split("-")[0]}-{key}', asset))
         return assets
@@ -261,7 +249,7 @@ class MetadataLinks:
                     media_type=pystac.MediaType.XML,
                     title=title,
                     roles=["metadata"],
-                    description="Estimated thermal noise look-up tables",
+                    description=SENTINEL_SLC_NOISE_DESCRIPTION,
                 )
                 assets.append((f'{polarisation.split("-")[0]}-{key}', asset))
         return assets
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 import pystac
 from pystac import Summaries
@@ -11,6 +11,7 @@ from pystac.extensions.sat import SatExtension
 from stactools.core.io import ReadHrefModifier
 
 from stac_cat_utils.slc import constants as c
+from stac_cat_utils.summaries import SummaryAggregator
 
 from . import Format
 from .bands import image_asset_from_href
@@ -21,13 +22,25 @@ from .properties import fill_sar_properties, fill_sat_properties
 logger = logging.getLogger(__name__)
 
 
-def create_collection(json_path: str) -> pystac.Collection:
-    """Creates a STAC Collection for Sentinel-1 SLC"""
-    # Lists of all possible values for items
-    summary_dict = {
-        "constellation": [c.SENTINEL_CONSTELLATION],
-        "platform": c.SENTINEL_PLATFORMS,
-    }
+def create_collection(
+    json_path: str, items: Optional[Iterable[pystac.Item]] = None
+) -> pystac.Collection:
+    """Creates a STAC Collection for Sentinel-1 SLC
+
+    When items are given, the summaries are derived from the items instead of
+    listing all possible values.
+    """
+    if items is None:
+        # Lists of all possible values for items
+        summary_dict = {
+            "constellation": [c.SENTINEL_CONSTELLATION],
+            "platform": c.SENTINEL_PLATFORMS,
+        }
+    else:
+        aggregator = SummaryAggregator()
+        for item in items:
+            aggregator.add_item(item)
+        summary_dict = aggregator.summaries().to_dict()
 
     collection = pystac.Collection(
         id="sentinel1-slc",
@@ -49,6 +62,17 @@ def create_collection(json_path: str) -> pystac.Collection:
     collection.links.append(c.SENTINEL_SLC_LICENSE)
     collection.links.append(c.SENTINEL_SLC_TECHNICAL_GUIDE)
 
+    if items is None:
+        _add_constant_summaries(collection)
+
+    # Item Asset Extension
+    assets = ItemAssetsExtension.ext(collection, add_if_missing=True)
+    assets.item_assets = c.SENTINEL_SLC_ASSETS
+
+    return collection
+
+
+def _add_constant_summaries(collection: pystac.Collection) -> None:
     # SAR Extension
     sar = SarExtension.summaries(collection, add_if_missing=True)
     sar.looks_range = c.SENTINEL_SLC_SAR["looks_range"]
@@ -69,12 +93,6 @@ def create_collection(json_path: str) -> pystac.Collection:
     sat = SatExtension.summaries(collection, add_if_missing=True)
     sat.orbit_state = c.SENTINEL_SLC_SAT["orbit_state"]
 
-    # Item Asset Extension
-    assets = ItemAssetsExtension.ext(collection, add_if_missing=True)
-    assets.item_assets = c.SENTINEL_SLC_ASSETS
-
-    return collection
-
 
 def create_item(
     granule_href: str,
@@ -159,14 +177,6 @@ def create_item(
 
     # Thumbnail
     if metalinks.thumbnail_href is not None:
-        desc = (
-            "An averaged, decimated preview image in PNG format. Single polarization "
-            "products are represented with a grey scale image. Dual polarization products "
-            "are represented by a single composite colour image in RGB with the red channel "
-            "(R) representing the  co-polarization VV or HH), the green channel (G) "
-            "represents the cross-polarization (VH or HV) and the blue channel (B) "
-            "represents the ratio of the cross an co-polarizations."
-        )
         item.add_asset(
             "thumbnail",
             pystac.Asset(
@@ -174,7 +184,7 @@ def create_item(
                 media_type=pystac.MediaType.PNG,
                 roles=["thumbnail"],
                 title="Preview Image",
-                description=desc,
+                description=c.SENTINEL_SLC_THUMBNAIL_DESCRIPTION,
             ),
         )
 
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+
+from pathlib import Path
+
+import pystac
+from pystac.utils import make_relative_href
+
+from stac_cat_utils.utils import parse_datetime_interval
+
+INDEX_FILE_NAME = 'index.sqlite'
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS items ('
+    'rowid INTEGER PRIMARY KEY, id TEXT NOT NULL, collection TEXT NOT NULL, datetime TEXT, start REAL, end REAL, '
+    'platform TEXT, href TEXT NOT NULL, min_x REAL, max_x REAL, min_y REAL, max_y REAL, UNIQUE (href))',
+    'CREATE INDEX IF NOT EXISTS items_start ON items (start)',
+    'CREATE INDEX IF NOT EXISTS items_end ON items (end)',
+    'CREATE INDEX IF NOT EXISTS items_collection ON items (collection)',
+    'CREATE INDEX IF NOT EXISTS items_platform ON items (platform)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS items_rtree USING rtree (rowid, min_x, max_x, min_y, max_y)',
+]
+
+
+def _timestamp(value):
+    return value.timestamp() if value else None
+
+
+def _item_bbox(item: pystac.Item):
+    if not item.bbox:
+        return None, None, None, None
+    bbox = item.bbox[:2] + item.bbox[-3:-1] if len(item.bbox) == 6 else item.bbox
+    return float(bbox[0]), float(bbox[2]), float(bbox[1]), float(bbox[3])
+
+
+def _item_row(item: pystac.Item, index_path):
+    start = item.common_metadata.start_datetime or item.datetime
+    end = item.common_metadata.end_datetime or item.datetime
+    return (
+        item.id,
+        item.collection_id or '',
+        item.datetime.isoformat() if item.datetime else None,
+        _timestamp(start),
+        _timestamp(end),
+        item.common_metadata.platform,
+        # Item hrefs are relative to the index, which stays valid when the saved catalog is moved
+        make_relative_href(item.get_self_href(), index_path),
+        # The bbox is also kept at full precision in the items table, the R*Tree only stores 32 bits floats
+        *_item_bbox(item)
+    )
+
+
+def write_sqlite_index(catalog: pystac.Catalog, index_path):
+    """
+    Write (or update) the SQLite search index of a saved catalog: an items table with indexed datetime, collection
+    and platform columns and the href of the item JSON file, and an R*Tree over the item bboxes.
+
+    An existing index is updated incrementally: only new or changed items are written and the items which are no
+    longer in the catalog are removed. Return the number of inserted, updated and deleted items.
+    """
+    connection = sqlite3.connect(index_path)
+    try:
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            # Items are identified by their JSON file, as item ids are only unique within a folder
+            existing = {row[7]: (row[0], row[1:]) for row in connection.execute(
+                'SELECT rowid, id, collection, datetime, start, end, platform, href, min_x, max_x, min_y, max_y '
+                'FROM items')}
+
+            inserted = updated = 0
+            seen = set()
+            rtree_rows = []
+            for item in catalog.get_all_items():
+                row = _item_row(item, index_path)
+                key = row[6]
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key in existing:
+                    rowid, values = existing[key]
+                    if tuple(values) == row:
+                        continue
+                    connection.execute('UPDATE items SET id = ?, collection = ?, datetime = ?, start = ?, end = ?, '
+                                       'platform = ?, href = ?, min_x = ?, max_x = ?, min_y = ?, max_y = ? '
+                                       'WHERE rowid = ?', (*row, rowid))
+                    updated += 1
+                else:
+                    rowid = connection.execute(
+                        'INSERT INTO items (id, collection, datetime, start, end, platform, href, min_x, max_x, min_y, '
+                        'max_y) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row
+                    ).lastrowid
+                    inserted += 1
+                if row[-1] is not None:
+                    rtree_rows.append((rowid, *row[-4:]))
+                else:
+                    connection.execute('DELETE FROM items_rtree WHERE rowid = ?', (rowid,))
+            connection.executemany('INSERT OR REPLACE INTO items_rtree (rowid, min_x, max_x, min_y, max_y) '
+                                   'VALUES (?, ?, ?, ?, ?)', rtree_rows)
+
+            deleted_rowids = [(rowid,) for key, (rowid, _) in existing.items() if key not in seen]
+            connection.executemany('DELETE FROM items WHERE rowid = ?', deleted_rowids)
+            connection.executemany('DELETE FROM items_rtree WHERE rowid = ?', deleted_rowids)
+    finally:
+        connection.close()
+    return inserted, updated, len(deleted_rowids)
+
+
+def query_items(index_path, bbox=None, datetime=None, collections=None, platforms=None):
+    """
+    Return the absolute hrefs of the items of the SQLite index (see write_sqlite_index) intersecting the bbox
+    ([min_lon, min_lat, max_lon, max_lat]) and the datetime interval (see parse_datetime_interval), in the given
+    collections and of the given platforms.
+    """
+    query = 'SELECT items.href FROM items'
+    conditions = []
+    parameters = []
+    if bbox is not None:
+        query += ' JOIN items_rtree ON items_rtree.rowid = items.rowid'
+        conditions.append('items_rtree.min_x <= ? AND items_rtree.max_x >= ? AND '
+                          'items_rtree.min_y <= ? AND items_rtree.max_y >= ?')
+        parameters.extend([bbox[2], bbox[0], bbox[3], bbox[1]])
+    datetime_interval = parse_datetime_interval(datetime)
+    if datetime_interval:
+        start, end = datetime_interval
+        if end:
+            conditions.append('(items.start IS NULL OR items.start <= ?)')
+            parameters.append(end.timestamp())
+        if start:
+            conditions.append('(items.end IS NULL OR items.end >= ?)')
+            parameters.append(start.timestamp())
+    for column, values in (('collection', collections), ('platform', platforms)):
+        if values:
+            values = [values] if isinstance(values, str) else list(values)
+            conditions.append(f'items.{column} IN ({", ".join("?" * len(values))})')
+            parameters.extend(values)
+    if conditions:
+        query += f' WHERE {" AND ".join(conditions)}'
+
+    index_folder = os.path.dirname(os.path.abspath(index_path))
+    connection = sqlite3.connect(f'{Path(index_path).resolve().as_uri()}?mode=ro', uri=True)
+    try:
+        return [os.path.normpath(os.path.join(index_folder, href)) for href, in connection.execute(query, parameters)]
+    finally:
+        connection.close()
@@ -8,12 +8,22 @@ from abc import ABC, abstractmethod
 
 from pystac.extensions.datacube import HorizontalSpatialDimension, TemporalDimension, Dimension, \
     VerticalSpatialDimension, Variable
+from pystac.extensions.item_assets import ItemAssetsExtension
 
-from stac_cat_utils.utils import collection_to_assets, is_datacube_compliant, cube_extend, is_key_unique, remove_empty_key
+from stac_cat_utils.utils import collection_to_assets, is_datacube_compliant, group_datacube_items, cube_extend, \
+    is_key_unique, remove_empty_key, sidecar_roles, lean_item_assets, LEAN_ASSET_FIELDS, datacube_time_values, \
+    datacube_spatial_steps, decode_cf_times, read_zarr_coordinate_range
+from stac_cat_utils.index import CatalogIndex, DEFAULT_INDEX_PROPERTIES
+from stac_cat_utils.loader import discover_stac_files, read_stac_dicts, DEFAULT_WORKERS
+from stac_cat_utils.summaries import SummaryAggregator
+from stac_cat_utils.validation import validate_catalog
 
 logger = logging.getLogger('StacCatalogGenerator')
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
+LOADED_LINK_RELS = {pystac.RelType.ROOT, pystac.RelType.PARENT, pystac.RelType.CHILD, pystac.RelType.ITEM,
+                    pystac.RelType.COLLECTION}
+
 
 class STACABC(ABC):
     @abstractmethod
@@ -22,24 +32,39 @@ class STACABC(ABC):
 
 
 class STACCollection(pystac.Collection, STACABC):
+    # Whether the items added with add_stac_element are aggregated in the summaries (see finalize_summaries)
+    aggregate_summaries = True
+
+    @property
+    def summary_aggregator(self):
+        if getattr(self, '_summary_aggregator', None) is None:
+            self._summary_aggregator = SummaryAggregator()
+        return self._summary_aggregator
+
     def add_stac_element(self, element):
         if isinstance(element, pystac.Asset):
             self.add_asset(element.title, element)
         elif isinstance(element, pystac.Item):
             self.add_item(element)
+            if self.aggregate_summaries:
+                self.summary_aggregator.add_item(element)
         elif isinstance(element, pystac.Collection):
             self.add_child(element)
         if len(list(self.get_all_items())):
             self.update_extent_from_items()
 
-    def make_datacube_compliant(self):
+    def make_datacube_compliant(self, split=False, values=False, step_tolerance=1.0):
         col_cube_compliance = is_datacube_compliant(self)
         if not col_cube_compliance[0]:
+            if split and any(True for _ in self.get_items()):
+                self.split_datacube_groups(values=values, step_tolerance=step_tolerance)
+                return
             logger.error(f'{self} is not Datacube compliant')
             return
         bands = list(set([v['name'] for v in col_cube_compliance[1]]))
         col_bbox = self.extent.spatial.bboxes[0]
-        col_temp = self.extent.temporal.to_dict()
+        # The time dimension extent is the first interval of the temporal extent, as [start, end]
+        col_temp = self.extent.temporal.to_dict()['interval'][0]
         cube_collection = cube_extend(self, 'dimensions')
         cube_collection.dimensions = {
             **cube_collection.dimensions,
@@ -52,6 +77,88 @@ class STACCollection(pystac.Collection, STACABC):
             'time': TemporalDimension({'type': 'temporal', 'extent': col_temp}),
             'spectral': Dimension({'type': 'bands', 'values': bands})
         }
+        if values:
+            self.add_datacube_values(step_tolerance)
+
+    def add_datacube_values(self, step_tolerance=1.0):
+        """
+        Add the sorted unique datetimes of the items and their regular step (if any, within step_tolerance seconds)
+        to the time dimension, and the pixel size from proj:transform as step of the x and y dimensions when all the
+        items share the same projection and pixel size.
+        """
+        items = list(self.get_all_items())
+        cube_collection = cube_extend(self, 'dimensions')
+        dimensions = cube_collection.dimensions
+        time_values, time_step = datacube_time_values(items, step_tolerance)
+        dimensions['time'] = TemporalDimension(remove_empty_key({
+            **(dimensions['time'].to_dict() if 'time' in dimensions else {'type': 'temporal'}),
+            'values': time_values,
+            'step': time_step
+        }))
+        spatial_steps = datacube_spatial_steps(items)
+        if spatial_steps:
+            x_step, y_step, epsg, extent = spatial_steps
+            for axis, step, axis_extent in (('x', x_step, [extent[0], extent[2]]),
+                                            ('y', y_step, [extent[1], extent[3]])):
+                # The steps are expressed in the reference system of the items
+                dimensions[axis] = HorizontalSpatialDimension(remove_empty_key({
+                    **(dimensions[axis].to_dict() if axis in dimensions else {'type': 'spatial', 'axis': axis}),
+                    'step': step,
+                    'reference_system': epsg,
+                    'extent': axis_extent
+                }))
+        cube_collection.dimensions = dimensions
+
+    def split_datacube_groups(self, values=False, step_tolerance=1.0):
+        """
+        Move the items of the collection into one child collection per group of datacube compliant items
+        (see group_datacube_items) and make each child collection datacube compliant.
+        """
+        groups = group_datacube_items(self.get_items())
+        moved_items = {id(item) for items in groups.values() for item in items}
+        self.links = [link for link in self.links
+                      if not (link.rel == pystac.RelType.ITEM and id(link.target) in moved_items)]
+        cube_collections = []
+        for index, items in enumerate(groups.values()):
+            cube_collection = STACCollection(id=f'{self.id}-cube-{index + 1}',
+                                             description=f'Datacube compliant items of {self.id}',
+                                             extent=pystac.Extent(spatial=pystac.SpatialExtent([[-180, -90, 180, 90]]),
+                                                                  temporal=pystac.TemporalExtent([[None, None]])))
+            if ItemAssetsExtension.has_extension(self):
+                # The asset fields of lean items are defined in the item_assets of their collection
+                ItemAssetsExtension.ext(cube_collection, add_if_missing=True).item_assets = \
+                    dict(ItemAssetsExtension.ext(self).item_assets)
+            cube_collection.add_items(items)
+            for item in items:
+                cube_collection.summary_aggregator.add_item(item)
+            cube_collection.update_extent_from_items()
+            cube_collection.finalize_summaries()
+            cube_collection.make_datacube_compliant(values=values, step_tolerance=step_tolerance)
+            self.add_child(cube_collection)
+            cube_collections.append(cube_collection)
+        if cube_collections:
+            # The moved items are summarised by the child collections, the aggregated summaries are removed
+            aggregated_fields = self.summary_aggregator.summaries().to_dict()
+            self.summaries = pystac.Summaries({field: summary for field, summary in self.summaries.to_dict().items()
+                                               if field not in aggregated_fields})
+            self._summary_aggregator = None
+        logger.info(f'{self} split into {len(cube_collections)} Datacube compliant collections')
+        return cube_collections
+
+    def finalize_summaries(self, refresh=False):
+        if not self.summary_aggregator.count:
+            return
+        if refresh:
+            # Items were added after the summaries were finalized, the aggregated summaries are the most recent ones
+            self.summaries = pystac.Summaries({**self.summaries.to_dict(),
+                                               **self.summary_aggregator.summaries().to_dict()})
+            return
+        # Summaries already set on the collection take precedence over the aggregated ones
+        self.summaries = pystac.Summaries({**self.summary_aggregator.summaries().to_dict(),
+                                           **self.summaries.to_dict()})
+
+    def make_items_lean(self, fields=tuple(LEAN_ASSET_FIELDS)):
+        lean_item_assets(self, fields)
 
     def add_temporal_dimension(
         self, name, extent, values=None, step=None, description=None, replace=False
@@ -161,6 +268,15 @@ class STACCollection(pystac.Collection, STACABC):
 
 
 class STACItem(pystac.Item, STACABC):
+    @classmethod
+    def adopt(cls, item: pystac.Item):
+        """
+        Make a pystac Item (e.g. created by a stactools product handler) a STACItem in place, by rebinding its class.
+        Contrary to a to_dict/from_dict round trip, the assets, extensions and links are not copied.
+        """
+        item.__class__ = cls
+        return item
+
     def add_stac_element(self, element):
         if isinstance(element, pystac.Asset):
             self.add_asset(element.title, element)
@@ -177,11 +293,51 @@ class STACCatalog(pystac.Catalog, STACABC):
         elif isinstance(element, pystac.Collection):
             self.add_child(element)
 
-    def make_datacube_compliant(self):
-        for collection in self.get_all_collections():
+    def build_index(self, properties=DEFAULT_INDEX_PROPERTIES):
+        return CatalogIndex.from_catalog(self, properties)
+
+    @classmethod
+    def load_fast(cls, path, workers=DEFAULT_WORKERS, fields=None, listing=None):
+        """
+        Load a saved catalog (path of its folder or of its catalog.json) with all its collections and items at once:
+        the JSON files are found in a single directory walk (or read from a listing, see discover_stac_files), read
+        and parsed concurrently, and the links between the objects are resolved from the parsed files.
+        When fields are given, only these fields of the items are hydrated (see hydrate_item_fields).
+        """
+        root_href = os.path.abspath(path if path.endswith('.json') else os.path.join(path, 'catalog.json'))
+        root_folder = os.path.dirname(root_href)
+        stac_dicts = read_stac_dicts([root_href, *discover_stac_files(root_folder, listing)], workers, fields)
+        stac_classes = {'Catalog': STACCatalog, 'Collection': STACCollection, 'Feature': STACItem}
+
+        root_dict = stac_dicts.pop(root_href)
+        root = stac_classes[root_dict['type']].from_dict(root_dict, href=root_href, preserve_dict=False)
+        stac_objects = {root_href: root}
+        for href, stac_dict in stac_dicts.items():
+            stac_objects[href] = stac_classes[stac_dict['type']].from_dict(stac_dict, href=href, root=root,
+                                                                           preserve_dict=False)
+        for stac_object in stac_objects.values():
+            for link in stac_object.links:
+                if link.rel in LOADED_LINK_RELS and not link.is_resolved():
+                    target = stac_objects.get(link.get_absolute_href())
+                    if target is not None:
+                        link.target = target
+        return root
+
+    def validate_all(self, workers=None, check_assets=False, schema_cache_paths=None):
+        """
+        Validate the catalog and all its collections and items in parallel and offline, against the schemas of the
+        local schema cache (see stac_cat_utils.validation). Contrary to pystac validate_all, the errors are not
+        raised but returned in a ValidationReport, with the missing assets when check_assets is True.
+        """
+        return validate_catalog(self, workers=workers, check_assets=check_assets,
+                                schema_cache_paths=schema_cache_paths)
+
+    def make_datacube_compliant(self, split=False, values=False, step_tolerance=1.0):
+        for collection in list(self.get_all_collections()):
             try:
-                collection.make_datacube_compliant()
-            except Exception:
+                collection.make_datacube_compliant(split=split, values=values, step_tolerance=step_tolerance)
+            except Exception as e:
+                logger.error(f'{collection} could not be made Datacube compliant: {e}')
                 continue
 
 
@@ -210,10 +366,111 @@ def create_generic_asset(href):
     if extension.lower() in MEDIA_TYPES:
         file_media_type = MEDIA_TYPES[extension.lower()]
     else:
-        file_media_type = mimetypes.guess_type(href)
+        file_media_type, _ = mimetypes.guess_type(href)
     file_asset = pystac.Asset(href=href,
                               title=href,
                               media_type=file_media_type,
                               extra_fields={'Creation': file_dt_creation.strftime('%Y-%m-%d %H:%M')},
                               roles=['data'])
     return file_asset
+
+
+def create_sidecar_asset(href):
+    file_asset = create_generic_asset(href)
+    file_asset.roles = sidecar_roles(os.path.basename(href))
+    return file_asset
+
+
+ZARR_MEDIA_TYPE = 'application/vnd+zarr'
+
+TEMPORAL_DIMENSION_NAMES = {'time', 't', 'date', 'datetime'}
+HORIZONTAL_DIMENSION_NAMES = {
+    'x': 'x', 'lon': 'x', 'longitude': 'x', 'easting': 'x',
+    'y': 'y', 'lat': 'y', 'latitude': 'y', 'northing': 'y',
+}
+VERTICAL_DIMENSION_NAMES = {'z', 'level', 'height', 'depth', 'altitude', 'elevation'}
+# Extent of the geographic dimensions whose coordinates are unknown
+GEOGRAPHIC_DIMENSION_EXTENTS = {
+    'lon': [-180, 180], 'longitude': [-180, 180],
+    'lat': [-90, 90], 'latitude': [-90, 90],
+}
+
+
+def _attrs_extent(attrs):
+    if 'actual_range' in attrs:
+        return list(attrs['actual_range'])
+    if 'valid_range' in attrs:
+        return list(attrs['valid_range'])
+    if 'valid_min' in attrs and 'valid_max' in attrs:
+        return [attrs['valid_min'], attrs['valid_max']]
+    return None
+
+
+def _store_dimension(name, coordinate, size):
+    coordinate_attrs = coordinate['attrs'] if coordinate else {}
+    if coordinate is None:
+        # Without coordinate array, the coordinates of a dimension are its indices (as for xarray)
+        extent = [0, size - 1] if size else None
+    else:
+        extent = _attrs_extent(coordinate_attrs) or read_zarr_coordinate_range(coordinate)
+    fields = {
+        'extent': extent,
+        'unit': coordinate_attrs.get('units'),
+        'description': coordinate_attrs.get('long_name') or coordinate_attrs.get('description'),
+    }
+    if name.lower() in TEMPORAL_DIMENSION_NAMES:
+        fields.pop('unit')
+        # The temporal extent is made of ISO 8601 datetimes, open when the CF times cannot be decoded
+        times = decode_cf_times(extent, coordinate_attrs.get('units'), coordinate_attrs.get('calendar')) \
+            if coordinate is not None and extent else None
+        fields['extent'] = times or [None, None]
+        return TemporalDimension(remove_empty_key({'type': 'temporal', **fields}))
+    if name.lower() in HORIZONTAL_DIMENSION_NAMES:
+        if fields['extent'] is None:
+            fields['extent'] = GEOGRAPHIC_DIMENSION_EXTENTS.get(name.lower())
+        if fields['extent'] is None:
+            logger.warning(f'The extent of the {name} dimension is unknown')
+        return HorizontalSpatialDimension(remove_empty_key({
+            'type': 'spatial', 'axis': HORIZONTAL_DIMENSION_NAMES[name.lower()], **fields
+        }))
+    if name.lower() in VERTICAL_DIMENSION_NAMES:
+        return VerticalSpatialDimension(remove_empty_key({'type': 'spatial', 'axis': 'z', **fields}))
+    return Dimension(remove_empty_key({'type': 'other', **fields}))
+
+
+def create_store_item(path, arrays=None, attrs=None, media_type=ZARR_MEDIA_TYPE):
+    """
+    Create a single datacube ready STAC Item for a chunked store (e.g. Zarr), using only its metadata.
+    The cube:dimensions and cube:variables are derived from the arrays dimension names, shapes and attributes.
+    """
+    arrays = arrays or {}
+    attrs = attrs or {}
+    store_name = os.path.basename(path)
+    item = STACItem(id=store_name,
+                    geometry=None, bbox=None,
+                    datetime=_get_file_creation_date(path),
+                    properties=remove_empty_key({'title': attrs.get('title'), 'description': attrs.get('summary')}))
+    item.add_asset('data', pystac.Asset(href=path, title=store_name, media_type=media_type, roles=['data']))
+    if not arrays:
+        return item
+
+    dimension_sizes = {}
+    for array in arrays.values():
+        for name, size in zip(array['dimensions'], array['shape']):
+            dimension_sizes.setdefault(name, size)
+
+    cube_item = cube_extend(item, 'dimensions')
+    cube_item.dimensions = {
+        name: _store_dimension(name, arrays.get(name), size) for name, size in dimension_sizes.items()
+    }
+    cube_item = cube_extend(cube_item, 'variables')
+    cube_item.variables = {
+        name: Variable(remove_empty_key({
+            'type': 'data',
+            'dimensions': array['dimensions'],
+            'unit': array['attrs'].get('units'),
+            'description': array['attrs'].get('long_name'),
+        }))
+        for name, array in arrays.items() if name not in dimension_sizes
+    }
+    return item
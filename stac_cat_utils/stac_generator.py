@@ -1,13 +1,29 @@
+import asyncio
+import contextlib
+import contextvars
 import datetime
+import functools
 import logging
 import os
-import sys
-import warnings
+import shutil
+import threading
+import weakref
 
 import pystac
+import rasterio
 
-from stac_cat_utils.stac import STACCatalog, STACCollection, STACItem, create_generic_asset
-from stac_cat_utils.utils import is_product_folder, is_collection_empty, generate_path_list
+from pystac.layout import BestPracticesLayoutStrategy
+from stac_cat_utils.stac import STACCatalog, STACCollection, STACItem, create_generic_asset, create_store_item, \
+    create_sidecar_asset, _get_file_creation_date
+from stac_cat_utils.journal import CreateJournal
+from stac_cat_utils.sqlite_index import write_sqlite_index, INDEX_FILE_NAME
+from stac_cat_utils.stac_io import CatalogStacIO, COMPRESSION_SUFFIXES, LINK_MODES, current_snapshot_path, \
+    switch_current_snapshot
+from stac_cat_utils.walker import ConcurrentLister
+from stac_cat_utils.utils import is_product_folder, is_collection_empty, generate_path_list, is_product_archive, \
+    vsi_read_href_modifier, href_exists, absolute_asset_href, AssetHrefTransform, is_chunked_store, \
+    read_zarr_metadata, group_sidecar_files, parse_datetime_interval, product_name_matches, product_footprint_bbox, \
+    bbox_intersects, find_duplicate_products
 from rasterio.errors import RasterioIOError, RasterioError
 from stac_cat_utils.slc import stac as stac_sentinel1_slc
 from stactools.sentinel1.grd import stac as stac_sentinel1_grd
@@ -16,165 +32,713 @@ from stactools.landsat import stac as stac_landsat
 from typing import Optional
 from rio_stac import create_stac_item
 
-default_extent = pystac.Extent(spatial=pystac.SpatialExtent([-180, -90, 180, 90]),
+default_extent = pystac.Extent(spatial=pystac.SpatialExtent([[-180, -90, 180, 90]]),
                                temporal=pystac.TemporalExtent([[None, None]]))
 
-warnings.filterwarnings('ignore')
-
+# The logs are only output where the application configured the logging, e.g. with logging.basicConfig
 logger = logging.getLogger('StacCatalogGenerator')
-logger.setLevel(logging.DEBUG)
 
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(formatter)
-handler.setLevel(logging.DEBUG)
+DEFAULT_MAX_PENDING_ITEMS = 64
 
-logger.addHandler(handler)
+# Current run of each generator in the thread or asyncio task. The generators are weakly referenced, their runs are
+# released with them
+_current_runs = contextvars.ContextVar('current_runs', default=None)
 
 
-class StacCatalogGenerator:
+def _set_current_run(generator, run):
+    # The mapping is copied, it is shared by the contexts copied from this one
+    current_runs = weakref.WeakKeyDictionary(_current_runs.get() or {})
+    current_runs[generator] = run
+    return _current_runs.set(current_runs)
+
+
+async def _wait_stopped(future):
+    await asyncio.wait([future])
+    if not future.cancelled():
+        # The CancelledError raised in the generation thread once it stopped is expected
+        future.exception()
+
+
+class _ItemStreamingContainer:
+    # Stands for the container of a work unit, passing the items its handler adds to it to item_callback
+    def __init__(self, container, item_callback):
+        self.container = container
+        self.item_callback = item_callback
+
+    def add_stac_element(self, element):
+        self.container.add_stac_element(element)
+        # The items of item folders are only complete once the whole folder is catalogued
+        if isinstance(element, pystac.Item) and not isinstance(self.container, pystac.Item):
+            self.item_callback(element)
+
+
+class CatalogRun:
+    """
+    State of a generation run of a StacCatalogGenerator (see create_run): the created catalog, the arguments of
+    create and the collections and items created for the folders, used by save, update and add.
+    """
+
     def __init__(self):
-        self.__stac_catalog: Optional[STACCatalog] = None
-        self.__src_path = None
-        self.__asset_href_prefix = '/'
-        self.__catalog_name = 'stac_catalog'
-        self.__generic_collection = None
+        self.catalog: Optional[STACCatalog] = None
+        self.src_path = None
+        self.asset_href_prefix = '/'
+        self.asset_hrefs_rewritten = False
+        self.catalog_name = 'stac_catalog'
+        self.generic_collection = None
+        self.store_paths = []
+        self.summaries = True
+        self.datetime_interval = None
+        self.bbox = None
+        self.platforms = None
+        self.collection_paths = []
+        self.item_paths = []
+        self.ignore_paths = set()
+        # Collections and items created for the folders of collection_paths and item_paths, by folder
+        self.containers = {}
+        self.journal: Optional[CreateJournal] = None
+        self.lister: Optional[ConcurrentLister] = None
+        # Set while create runs for acreate or astream_items
+        self.cancel_event: Optional[threading.Event] = None
+        self.item_callback = None
+
+    def __repr__(self):
+        return f'<CatalogRun src_path={self.src_path}>'
+
+
+class StacCatalogGenerator:
+    """
+    Generate STAC catalogs from folders. A generator can run any number of generations at once (in threads or
+    asyncio tasks): the state of each generation is kept in a CatalogRun, the methods of the generator using the
+    given run, or the run created last by create in the main thread or by acreate in the current asyncio task (see
+    create_run). The executor runs the generations of acreate and astream_items, bounding the number of concurrent
+    runs.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+
+    @property
+    def current_run(self) -> Optional[CatalogRun]:
+        """Run created last by create in the main thread, or by acreate in the current asyncio task."""
+        return (_current_runs.get() or {}).get(self)
+
+    @contextlib.contextmanager
+    def __using_run(self, run):
+        # A given run is the current run of the methods called on it, until the previous one is restored
+        if run is None:
+            yield self.current_run
+            return
+        token = _set_current_run(self, run)
+        try:
+            yield run
+        finally:
+            _current_runs.reset(token)
 
     @staticmethod
     def __handle_product_stac_item(product, base_path, container):
+        # Products read from an archive are handled through their GDAL virtual file system path
+        base_path = product.get('href', base_path)
+        read_href_modifier = vsi_read_href_modifier if 'href' in product else None
         if product['name'] == 'S1':
             if product['extra_info'] == 'GRD':
-                sentinel1_grd_item = STACItem.from_dict(stac_sentinel1_grd.create_item(base_path).to_dict())
+                sentinel1_grd_item = STACItem.adopt(
+                    stac_sentinel1_grd.create_item(base_path, read_href_modifier=read_href_modifier))
                 container.add_stac_element(sentinel1_grd_item)
             if product['extra_info'] == 'SLC':
-                sentinel1_slc_item = STACItem.from_dict(stac_sentinel1_slc.create_item(base_path).to_dict())
+                sentinel1_slc_item = STACItem.adopt(
+                    stac_sentinel1_slc.create_item(base_path, read_href_modifier=read_href_modifier))
                 container.add_stac_element(sentinel1_slc_item)
         if product['name'] == 'S2':
-            sentinel2_item = STACItem.from_dict(stac_sentinel2.create_item(base_path).to_dict())
+            sentinel2_item = STACItem.adopt(
+                stac_sentinel2.create_item(base_path, read_href_modifier=read_href_modifier))
             container.add_stac_element(sentinel2_item)
         if product['name'] == 'LANDSAT':
-            landsat_item = STACItem.from_dict(
-                stac_landsat.create_item(os.path.join(base_path, product['extra_info'])).to_dict())
+            landsat_item = STACItem.adopt(
+                stac_landsat.create_item(os.path.join(base_path, product['extra_info']),
+                                         read_href_modifier=read_href_modifier))
             container.add_stac_element(landsat_item)
 
     @staticmethod
-    def __handle_file_stac(path, container):
+    def __handle_store_stac_item(store, base_path, folder_content, container):
+        if store['format'] == 'zarr':
+            arrays, attrs = read_zarr_metadata(base_path, store['zarr_format'], folder_content)
+            store_item = create_store_item(base_path, arrays, attrs)
+        else:
+            store_item = create_store_item(base_path, media_type=None)
+        container.add_stac_element(store_item)
+
+    @staticmethod
+    def __handle_file_stac(path, container, sidecar_paths=(), has_siblings=True):
+        # Without any file sharing its name, GDAL does not need to list the folder to look for sidecar files
+        gdal_options = {} if has_siblings else {'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR'}
         try:
-            item = create_stac_item(path, asset_name=path, with_proj=True, with_eo=True, with_raster=True)
+            with rasterio.Env(**gdal_options), rasterio.open(path) as dataset:
+                # Without a TIFFTAG_DATETIME, rio_stac uses the current time and the item changes at each generation
+                input_datetime = None if dataset.get_tag_item('TIFFTAG_DATETIME') else _get_file_creation_date(path)
+                item = create_stac_item(dataset, input_datetime=input_datetime, asset_name=path, with_proj=True,
+                                        with_eo=True, with_raster=True)
+            for sidecar_path in sidecar_paths:
+                item.add_asset(sidecar_path, create_sidecar_asset(sidecar_path))
             container.add_stac_element(item)
         except (RasterioIOError, RasterioError):
             item = create_generic_asset(path)
             container.add_stac_element(item)
+            for sidecar_path in sidecar_paths:
+                container.add_stac_element(create_generic_asset(sidecar_path))
 
-    @staticmethod
-    def __get_container(base_path, collection_paths, item_paths, container):
+    def __handle_product(self, product, base_path, product_href, container):
+        # Products outside the bbox filter are only skipped once their footprint is read
+        if self.__match_product_footprint(product, product_href):
+            self.__handle_product_stac_item(product, base_path, container)
+
+    def __check_cancelled(self):
+        run = self.current_run
+        if run.cancel_event is not None and run.cancel_event.is_set():
+            raise asyncio.CancelledError(f'Generation of {run.src_path} cancelled')
+
+    def __emit_item(self, stac_object):
+        run = self.current_run
+        if run.item_callback is not None and isinstance(stac_object, pystac.Item):
+            run.item_callback(stac_object)
+
+    def __run_unit(self, path, container, handler):
+        run = self.current_run
+        # Product folders and archives, chunked stores and files are the work units recorded in the journal
+        self.__check_cancelled()
+        if run.item_callback is not None:
+            container = _ItemStreamingContainer(container, run.item_callback)
+        if run.journal is None:
+            handler(container)
+        else:
+            run.journal.run_unit(path, container, handler)
+
+    def __get_container(self, base_path, collection_paths, item_paths, container):
         folder_name = os.path.basename(base_path)
         if base_path in collection_paths:
             container = STACCollection(id=folder_name,
                                          description=f'Collection of files under {folder_name}',
                                          extent=default_extent)
+            container.aggregate_summaries = self.current_run.summaries
         elif base_path in item_paths:
             container = STACItem(id=folder_name,
                                    geometry=None, bbox=None,
                                    datetime=datetime.datetime.now(), properties={})
         return container
 
+    def __match_product_name(self, path):
+        run = self.current_run
+        return product_name_matches(path, run.datetime_interval, run.platforms)
+
+    def __match_product_footprint(self, product, product_href):
+        run = self.current_run
+        if not run.bbox:
+            return True
+        footprint = product_footprint_bbox(product, product_href)
+        return footprint is None or bbox_intersects(footprint, run.bbox)
+
+    def __list_folder(self, path):
+        run = self.current_run
+        if run.lister is not None:
+            return run.lister.list(path)
+        with os.scandir(path) as scanned_entries:
+            return list(scanned_entries)
+
     def populate_catalog(self, base_path, collection_paths, item_paths, ignore_paths, parent_container=None):
-        default_container = parent_container or self.__stac_catalog
+        run = self.current_run
+        self.__check_cancelled()
+        default_container = parent_container or run.catalog
 
         # Check if current folder should be a collection or an item
         base_path_container = self.__get_container(base_path, collection_paths, item_paths, parent_container)
 
-        product = is_product_folder(base_path)
+        if not self.__match_product_name(base_path):
+            # Product folders outside the datetime and platforms filters are skipped without being listed
+            logger.debug(f'{base_path} skipped by the datetime or platforms filter')
+            if run.lister is not None:
+                run.lister.discard(base_path)
+            return
+
+        dir_entries = self.__list_folder(base_path)
+        folder_content = [dir_entry.name for dir_entry in dir_entries]
+        product = is_product_folder(base_path, folder_content)
         if product['is_product']:
+            if run.lister is not None:
+                # The product folder is not walked, e.g. when it is recognized by its content and not its name
+                run.lister.discard(base_path)
             # Handle and create STAC item for recognized product folder
-            self.__handle_product_stac_item(product, base_path, default_container)
+            self.__run_unit(base_path, default_container,
+                            functools.partial(self.__handle_product, product, base_path, base_path))
             return
 
-        for entry in os.listdir(base_path):
-            path = os.path.join(base_path, entry)
-            if path in ignore_paths:
-                continue
+        store = is_chunked_store(base_path, folder_content, run.store_paths)
+        if store['is_store']:
+            if run.lister is not None:
+                run.lister.discard(base_path)
+            # Handle chunked stores as a single STAC item instead of walking their chunk files
+            self.__run_unit(base_path, default_container,
+                            functools.partial(self.__handle_store_stac_item, store, base_path, folder_content))
+            return
+
+        dir_entries = [dir_entry for dir_entry in dir_entries if dir_entry.path not in ignore_paths]
+        # Sidecar files are handled together with their primary raster file
+        file_groups = group_sidecar_files([dir_entry.name for dir_entry in dir_entries if dir_entry.is_file()])
 
-            if os.path.isdir(path):
+        for dir_entry in dir_entries:
+            path = dir_entry.path
+            if dir_entry.is_dir():
                 # Recursive handling of folders
                 container = base_path_container
                 self.populate_catalog(path, collection_paths, item_paths, ignore_paths, parent_container=container)
 
-            if os.path.isfile(path):
-                # Handle files and add them to the correct container
-                container = base_path_container or self.__generic_collection
-                file_path_container = self.__get_container(path, collection_paths, item_paths, container)
-                logger.debug(f'{path} added to {file_path_container}')
-                self.__handle_file_stac(path, file_path_container)
-                if file_path_container != container:
-                    container.add_stac_element(file_path_container)
+            if dir_entry.is_file() and dir_entry.name in file_groups:
+                self.__populate_file(path, file_groups[dir_entry.name], collection_paths, item_paths,
+                                     base_path_container, default_container)
 
         if base_path_container != parent_container:
+            run.containers[base_path] = base_path_container
             default_container.add_stac_element(base_path_container)
+            self.__emit_item(base_path_container)
+
+    def __populate_file(self, path, file_group, collection_paths, item_paths, base_path_container, default_container):
+        run = self.current_run
+        if not self.__match_product_name(path):
+            logger.debug(f'{path} skipped by the datetime or platforms filter')
+            return
+        archive_product = is_product_archive(path)
+        if archive_product['is_product']:
+            # Handle and create STAC item for recognized product archive, without extracting it
+            self.__run_unit(path, base_path_container or default_container,
+                            functools.partial(self.__handle_product, archive_product, path, archive_product['href']))
+            return
+
+        # Handle files and add them to the correct container
+        container = base_path_container or run.generic_collection
+        file_path_container = self.__get_container(path, collection_paths, item_paths, container)
+        logger.debug(f'{path} added to {file_path_container}')
+        sidecars, has_siblings = file_group
+        base_path = os.path.dirname(path)
+        sidecar_paths = [os.path.join(base_path, sidecar) for sidecar in sidecars]
+        self.__run_unit(path, file_path_container, lambda unit_container: self.__handle_file_stac(
+            path, unit_container, sidecar_paths, has_siblings))
+        if file_path_container != container:
+            container.add_stac_element(file_path_container)
+            self.__emit_item(file_path_container)
 
     def __clean(self):
         def clean(assets_dict):
-            return {k: d for k, d in assets_dict.items() if os.path.exists(d.href)}
+            return {k: d for k, d in assets_dict.items() if href_exists(d.href)}
 
-        for i in self.__stac_catalog.get_all_collections():
+        run = self.current_run
+        for i in run.catalog.get_all_collections():
             i.assets = clean(i.assets)
-        for i in self.__stac_catalog.get_all_items():
+        for i in run.catalog.get_all_items():
             i.assets = clean(i.assets)
+            for asset in i.assets.values():
+                # The asset hrefs of the files stay valid when the catalog is saved several times
+                asset.href = absolute_asset_href(asset.href)
 
-    def update_asset_href(self, asset_href_prefix=None):
-        self.__asset_href_prefix = asset_href_prefix or self.__asset_href_prefix
-
-        def add_asset_href_prefix(assets_dict):
-            def update_asset_href(asset: pystac.Asset):
-                if not asset.href.startswith(self.__asset_href_prefix):
-                    asset.href = f'{self.__asset_href_prefix}{asset.href}'
-                asset.href = os.path.normpath(asset.href)
-                return asset
-
-            return {k: update_asset_href(d) for k, d in assets_dict.items()}
-
-        for col in self.__stac_catalog.get_all_collections():
-            col.set_self_href(self.__src_path)
-            for item in col.get_items():
-                item.set_self_href(self.__src_path)
-            col.make_all_asset_hrefs_relative()
-            col.assets = add_asset_href_prefix(col.assets)
-        for item in self.__stac_catalog.get_all_items():
-            item.set_self_href(self.__src_path)
-            item.make_asset_hrefs_relative()
-            item.assets = add_asset_href_prefix(item.assets)
+    def update_asset_href(self, asset_href_prefix=None, run=None):
+        """
+        Rewrite the asset hrefs of the catalog in place (see AssetHrefTransform). This is not needed to save the
+        catalog, the asset hrefs being rewritten in the files when they are written.
+        """
+        with self.__using_run(run) as run:
+            run.asset_href_prefix = asset_href_prefix or run.asset_href_prefix
+            transform = AssetHrefTransform(run.src_path, run.asset_href_prefix)
+            for collection in run.catalog.get_all_collections():
+                for asset in collection.assets.values():
+                    asset.href = transform.href(asset.href, relative=False)
+            for item in run.catalog.get_all_items():
+                for asset in item.assets.values():
+                    asset.href = transform.href(asset.href)
+            run.asset_hrefs_rewritten = True
+
+    def __serialization_stac_io(self, run, stac_io, asset_href_prefix, **stac_io_options):
+        if stac_io is None:
+            stac_io = CatalogStacIO(**stac_io_options)
+        if run.asset_hrefs_rewritten or not isinstance(stac_io, CatalogStacIO):
+            # Only a CatalogStacIO rewrites the asset hrefs while writing the files
+            if not run.asset_hrefs_rewritten or asset_href_prefix != run.asset_href_prefix:
+                self.update_asset_href(asset_href_prefix, run=run)
+        else:
+            stac_io.asset_href_transform = AssetHrefTransform(run.src_path, asset_href_prefix)
+        return stac_io
 
     def create(
             self, src_path, catalog_name='Catalog', collection_paths=None, item_paths=None, ignore_paths=None,
-            asset_href_prefix='/'
+            asset_href_prefix='/', store_paths=None, datetime=None, bbox=None, platforms=None, deduplicate=False,
+            duplicate_policy='latest_baseline', preferred_paths=None, lean_items=False, summaries=True, paths=None,
+            journal_path=None, walk_workers=None, run=None
     ):
-        self.__generic_collection = STACCollection(id='files',
-                                                     description='Collection of generic files',
-                                                     extent=default_extent)
-        self.__src_path = os.path.normpath(src_path)
-        self.__asset_href_prefix = asset_href_prefix
-        self.__catalog_name = catalog_name
-        self.__stac_catalog = STACCatalog(id=self.__catalog_name,
-                                            description=f'STAC Catalog for {os.path.basename(src_path)}')
-        self.populate_catalog(self.__src_path,
-                              generate_path_list(collection_paths),
-                              generate_path_list(item_paths),
-                              generate_path_list(ignore_paths))
-
-        if not is_collection_empty(self.__generic_collection):
-            self.__stac_catalog.add_child(self.__generic_collection)
-
-        self.__clean()
-        self.update_asset_href()
-
-        return self.__stac_catalog
-
-    def save(self, dest_path=None, asset_href_prefix='/'):
-        if not self.__src_path:
-            logger.error('Stac catalog must be created first using "create" method')
-        dest_path = dest_path or f'stac_{self.__catalog_name.lower()}'
-        self.__stac_catalog.normalize_hrefs(dest_path)
-        if asset_href_prefix != self.__asset_href_prefix:
-            self.update_asset_href(asset_href_prefix)
-        self.__stac_catalog.save(catalog_type=pystac.CatalogType.SELF_CONTAINED)
+        if run is None and threading.current_thread() is threading.main_thread():
+            # A script creates then saves its catalog: the run stays the current run of the main thread (or asyncio
+            # task), while the run of another thread, e.g. of a pool shared by catalog jobs, must be passed to save
+            # (see create_run) so that it is not inherited by the next job of the thread
+            run = CatalogRun()
+            _set_current_run(self, run)
+        # The run is the current run of the methods called by create, until the previous one is restored
+        with self.__using_run(run or CatalogRun()) as run:
+            run.generic_collection = STACCollection(id='files',
+                                                    description='Collection of generic files',
+                                                    extent=default_extent)
+            run.summaries = summaries
+            run.generic_collection.aggregate_summaries = summaries
+            run.src_path = os.path.normpath(src_path)
+            run.asset_href_prefix = asset_href_prefix
+            run.asset_hrefs_rewritten = False
+            run.catalog_name = catalog_name
+            run.store_paths = generate_path_list(store_paths)
+            run.datetime_interval = parse_datetime_interval(datetime)
+            run.bbox = bbox
+            run.platforms = platforms
+            run.catalog = STACCatalog(id=run.catalog_name,
+                                      description=f'STAC Catalog for {os.path.basename(src_path)}')
+            ignore_paths = set(generate_path_list(ignore_paths))
+            if deduplicate:
+                # Planning pass: duplicated products are skipped before any of their metadata is read
+                ignore_paths.update(find_duplicate_products(run.src_path, ignore_paths, duplicate_policy,
+                                                            generate_path_list(preferred_paths)))
+            # Kept to catalogue the paths added later to src_path, see add
+            run.collection_paths = generate_path_list(collection_paths)
+            run.item_paths = generate_path_list(item_paths)
+            run.ignore_paths = ignore_paths
+            run.containers = {}
+            # The work units catalogued by a previous interrupted run are replayed from the journal
+            run.journal = CreateJournal(journal_path) if journal_path else None
+            if walk_workers:
+                # The folders are listed concurrently ahead of the walk, which keeps its order
+                run.lister = ConcurrentLister(walk_workers, ignore_paths, run.store_paths)
+            try:
+                if paths is None:
+                    self.populate_catalog(run.src_path, run.collection_paths, run.item_paths, ignore_paths)
+                else:
+                    # Only the given paths are catalogued, e.g. a shard (see stac_cat_utils.distributed)
+                    for path in paths:
+                        if os.path.normpath(path) not in ignore_paths:
+                            self.__populate_path(os.path.normpath(path))
+                if run.journal is not None:
+                    logger.info(f'{run.journal.replayed} units replayed from {journal_path}, '
+                                f'{run.journal.recorded} units catalogued')
+                    run.journal.compact()
+            finally:
+                if run.journal is not None:
+                    run.journal.close()
+                    run.journal = None
+                if run.lister is not None:
+                    run.lister.close()
+                    logger.info(f'{run.lister.listed} folders listed at {run.lister.rate:.1f} folders/s with '
+                                f'{walk_workers} workers')
+                    run.lister = None
+
+            if not is_collection_empty(run.generic_collection):
+                run.catalog.add_child(run.generic_collection)
+
+            self.__clean()
+
+            if summaries:
+                # Summaries were aggregated while the items were added to their collection
+                for collection in run.catalog.get_all_collections():
+                    collection.finalize_summaries()
+
+            if lean_items:
+                # Static asset fields repeated in every item are only kept once, in the collections item_assets
+                for collection in run.catalog.get_all_collections():
+                    collection.make_items_lean()
+
+            return run.catalog
+
+    def create_run(self, src_path, run=None, **kwargs):
+        """
+        Create a catalog (see create, kwargs being its arguments) and return its CatalogRun, a new one or the given run.
+        The run is not kept as the current run: it must be passed to the methods called on it, e.g. save.
+        """
+        run = run or CatalogRun()
+        self.create(src_path, run=run, **kwargs)
+        return run
+
+    def __start_async_run(self, item_callback=None):
+        # The run is the current run of the asyncio task, and of the thread of the executor running create
+        run = CatalogRun()
+        run.cancel_event = threading.Event()
+        run.item_callback = item_callback
+        _set_current_run(self, run)
+        return run, contextvars.copy_context()
+
+    def __create_in_thread(self, run, context, src_path, **kwargs):
+        try:
+            return context.run(self.create, src_path, run=run, **kwargs)
+        finally:
+            run.cancel_event = None
+            run.item_callback = None
+
+    async def acreate(self, src_path, executor=None, **kwargs):
+        """
+        Asynchronous create (kwargs being its arguments): the whole generation (directory walk, metadata reads and
+        item creation) runs in executor (the executor of the generator, or the default executor of the event loop
+        when None), e.g. a ThreadPoolExecutor shared by the catalog jobs of a service to bound their concurrency.
+        When the task is cancelled, the generation stops at the next folder or work unit.
+        """
+        loop = asyncio.get_running_loop()
+        run, context = self.__start_async_run()
+        cancel_event = run.cancel_event
+        future = loop.run_in_executor(executor or self.executor,
+                                      functools.partial(self.__create_in_thread, run, context, src_path, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            # The generation state is only left once the thread stopped
+            await _wait_stopped(future)
+            raise
+
+    async def astream_items(self, src_path, max_pending=DEFAULT_MAX_PENDING_ITEMS, executor=None, **kwargs):
+        """
+        Asynchronous create (kwargs being its arguments, see acreate) yielding the items as they are created. At
+        most max_pending items wait to be consumed, the generation being paused until they are. When the iteration
+        is stopped or cancelled, the generation stops at the next folder or work unit. Once all the items are
+        consumed, the catalog can be saved with save.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(max_pending)
+        end = object()
+
+        def put(element):
+            if cancel_event.is_set():
+                raise asyncio.CancelledError(f'Generation of {src_path} cancelled')
+            # Blocks the generation thread while the queue is full
+            asyncio.run_coroutine_threadsafe(queue.put(element), loop).result()
+
+        run, context = self.__start_async_run(put)
+        cancel_event = run.cancel_event
+
+        def generate():
+            try:
+                self.__create_in_thread(run, context, src_path, **kwargs)
+            finally:
+                if not cancel_event.is_set():
+                    put(end)
+
+        future = loop.run_in_executor(executor or self.executor, generate)
+        try:
+            while True:
+                item = await queue.get()
+                if item is end:
+                    break
+                yield item
+            # Errors of the generation are raised to the consumer
+            await future
+        finally:
+            if not future.done():
+                cancel_event.set()
+                while not queue.empty():
+                    # Unblocks the generation thread waiting for a free place in the queue
+                    queue.get_nowait()
+                await _wait_stopped(future)
+
+    def save(self, dest_path=None, asset_href_prefix=None, stac_io=None, compact=False, compression=None,
+             json_backend=None, sqlite_index=False, only_changed=False, snapshot=None, link_mode='hardlink', run=None):
+        with self.__using_run(run) as run:
+            if run is None or not run.src_path:
+                logger.error('Stac catalog must be created first using "create" method')
+                return
+            dest_path = dest_path or f'stac_{run.catalog_name.lower()}'
+            catalog_path = dest_path
+            previous_snapshot_path = None
+            if link_mode not in LINK_MODES:
+                raise ValueError(f'Unknown link mode {link_mode}, expected one of {LINK_MODES}')
+            if snapshot:
+                # Each snapshot is a version folder of dest_path, the current one being pointed to by a symbolic link
+                version = snapshot if isinstance(snapshot, str) else \
+                    datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+                catalog_path = os.path.join(dest_path, version)
+                if not isinstance(snapshot, str) and os.path.exists(catalog_path):
+                    raise FileExistsError(f'The snapshot folder {catalog_path} already exists')
+                previous_snapshot_path = current_snapshot_path(dest_path)
+                if previous_snapshot_path == os.path.realpath(catalog_path):
+                    previous_snapshot_path = None
+            run.catalog.normalize_hrefs(catalog_path)
+            stac_io = self.__serialization_stac_io(run, stac_io, asset_href_prefix or run.asset_href_prefix,
+                                                   json_backend=json_backend, compact=compact, compression=compression)
+            if (only_changed or snapshot) and not isinstance(stac_io, CatalogStacIO):
+                logger.error('only_changed and snapshot require a CatalogStacIO, all the files are written')
+            elif only_changed:
+                stac_io.only_changed = True
+            if snapshot and isinstance(stac_io, CatalogStacIO):
+                stac_io.snapshot_path = os.path.abspath(catalog_path)
+                stac_io.previous_snapshot_path = previous_snapshot_path
+                stac_io.link_mode = link_mode
+            run.catalog.save(catalog_type=pystac.CatalogType.SELF_CONTAINED, stac_io=stac_io)
+            if isinstance(stac_io, CatalogStacIO) and (stac_io.only_changed or stac_io.snapshot_path):
+                logger.info(f'{stac_io.written} files written, {stac_io.skipped} unchanged files skipped, '
+                            f'{stac_io.linked} files linked to the previous snapshot')
+                if stac_io.manifest is not None:
+                    stac_io.save_manifest()
+            if sqlite_index:
+                index_path = os.path.join(catalog_path, INDEX_FILE_NAME)
+                if previous_snapshot_path and os.path.exists(os.path.join(previous_snapshot_path, INDEX_FILE_NAME)):
+                    # The index of the previous snapshot is updated incrementally
+                    shutil.copyfile(os.path.join(previous_snapshot_path, INDEX_FILE_NAME), index_path)
+                inserted, updated, deleted = write_sqlite_index(run.catalog, index_path)
+                logger.debug(f'Search index updated: {inserted} items inserted, {updated} updated, {deleted} deleted')
+            if snapshot:
+                switch_current_snapshot(dest_path, version)
+
+    @staticmethod
+    def __remove_stac_file(href):
+        # Files written by CatalogStacIO may be compressed, with an additional suffix
+        for path in [href, *(f'{href}{suffix}' for suffix in COMPRESSION_SUFFIXES.values())]:
+            if os.path.exists(path):
+                os.remove(path)
+        folder = os.path.dirname(href)
+        if os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+
+    def update(self, existing_catalog_path, src_path, stac_io=None, compact=False, compression=None,
+               json_backend=None, sqlite_index=False, **kwargs):
+        """
+        Generate the catalog of src_path (see create, kwargs being its arguments) and update the catalog previously
+        saved in existing_catalog_path with it: items are compared by path (i.e. by id and parent) and asset hrefs,
+        and only the new or changed items are written and the items which are no longer generated are removed.
+        Only the collections with changed assets and the collections and catalogs containing a changed item (and
+        their ancestors) are written again, with their recomputed extent and summaries.
+        """
+        run = self.create_run(src_path, **kwargs)
+        catalog = run.catalog
+        existing_catalog = STACCatalog.load_fast(existing_catalog_path)
+        existing_items = {item.get_self_href(): item for item in existing_catalog.get_all_items()}
+        existing_containers = {container.get_self_href(): container for container, _, _ in existing_catalog.walk()}
+
+        catalog.normalize_hrefs(existing_catalog_path)
+        catalog.catalog_type = pystac.CatalogType.SELF_CONTAINED
+        stac_io = self.__serialization_stac_io(run, stac_io, run.asset_href_prefix, json_backend=json_backend,
+                                               compact=compact, compression=compression)
+        transform = getattr(stac_io, 'asset_href_transform', None)
+        containers = {container.get_self_href(): container for container, _, _ in catalog.walk()}
+
+        def asset_hrefs(stac_object, href_transform=None):
+            # Catalogs have no assets, collections hold the generic files and the files of the path rules
+            return {key: href_transform.href(asset.href) if href_transform else asset.href
+                    for key, asset in getattr(stac_object, 'assets', {}).items()}
+
+        def changed_parent_href(stac_object):
+            # Closest parent of a changed object which is still in the generated catalog
+            parent = stac_object.get_parent()
+            while parent is not None and parent.get_self_href() not in containers:
+                parent = parent.get_parent()
+            return parent.get_self_href() if parent is not None else catalog.get_self_href()
+
+        changed_containers = {href for href, container in containers.items() if href not in existing_containers or
+                              asset_hrefs(existing_containers[href]) != asset_hrefs(container, transform)}
+        nb_written = 0
+        for item in catalog.get_all_items():
+            existing_item = existing_items.pop(item.get_self_href(), None)
+            if existing_item is not None and asset_hrefs(existing_item) == asset_hrefs(item, transform):
+                continue
+            item.save_object(include_self_link=False, stac_io=stac_io)
+            changed_containers.add(item.get_parent().get_self_href())
+            nb_written += 1
+        for href, existing_item in existing_items.items():
+            self.__remove_stac_file(href)
+            changed_containers.add(changed_parent_href(existing_item))
+        for href, existing_container in existing_containers.items():
+            if href not in containers:
+                self.__remove_stac_file(href)
+                changed_containers.add(changed_parent_href(existing_container))
+
+        # The ancestors of the changed collections and catalogs link to them, and summarise their extent
+        for href in list(changed_containers):
+            parent = containers[href].get_parent()
+            while parent is not None:
+                changed_containers.add(parent.get_self_href())
+                parent = parent.get_parent()
+        for href in changed_containers:
+            containers[href].save_object(include_self_link=False, stac_io=stac_io)
+
+        logger.debug(f'{existing_catalog_path} updated: {nb_written} items written, {len(existing_items)} removed, '
+                     f'{len(changed_containers)} collections or catalogs written')
+        if sqlite_index:
+            write_sqlite_index(catalog, os.path.join(existing_catalog_path, INDEX_FILE_NAME))
+        return catalog
+
+    def __path_container(self, path):
+        run = self.current_run
+        # Container of the STAC objects of a path of src_path, the collection and item folders missing from the
+        # catalog being created as populate_catalog does
+        folder = os.path.dirname(path)
+        if path == run.src_path or folder == path:
+            return None
+        if folder in run.containers:
+            return run.containers[folder]
+        parent_container = self.__path_container(folder)
+        container = self.__get_container(folder, run.collection_paths, run.item_paths, parent_container)
+        if container is not parent_container:
+            run.containers[folder] = container
+            (parent_container or run.catalog).add_stac_element(container)
+        return container
+
+    def __populate_path(self, path):
+        run = self.current_run
+        # Catalogue a single path of src_path in the container populate_catalog would have put it in
+        container = self.__path_container(path)
+        if os.path.isdir(path):
+            self.populate_catalog(path, run.collection_paths, run.item_paths, run.ignore_paths,
+                                  parent_container=container)
+            return
+        with os.scandir(os.path.dirname(path)) as scanned_entries:
+            file_groups = group_sidecar_files([dir_entry.name for dir_entry in scanned_entries if dir_entry.is_file()])
+        if os.path.basename(path) in file_groups:
+            self.__populate_file(path, file_groups[os.path.basename(path)], run.collection_paths,
+                                 run.item_paths, container, container or run.catalog)
+
+    def add(self, path, stac_io=None, compact=False, compression=None, json_backend=None, sqlite_index=False,
+            run=None):
+        """
+        Catalogue a path (product folder or archive, chunked store, folder or file) added to src_path after the
+        catalog was created and saved. Only the handler of the path is run, without walking src_path again, and only
+        the new STAC objects and the collections, catalogs and items they were added to are written.
+        Return the number of written STAC objects.
+        """
+        with self.__using_run(run) as run:
+            if run is None or run.catalog.get_self_href() is None:
+                logger.error('Stac catalog must be created and saved first using "create" and "save" methods')
+                return 0
+            path = os.path.normpath(path)
+            if path in run.ignore_paths:
+                return 0
+
+            # New objects are linked after the existing ones, the number of links of the containers is enough to find
+            # them
+            containers = [run.catalog, run.generic_collection, *run.containers.values()]
+            sizes = [(len(container.links), len(getattr(container, 'assets', {}))) for container in containers]
+            self.__populate_path(path)
+            if not is_collection_empty(run.generic_collection) and run.generic_collection.get_parent() is None:
+                run.catalog.add_child(run.generic_collection)
+
+            changed_objects = []
+            layout_strategy = BestPracticesLayoutStrategy()
+            for changed_container, (nb_links, nb_assets) in zip(containers, sizes):
+                nb_assets_now = len(getattr(changed_container, 'assets', {}))
+                if (len(changed_container.links), nb_assets_now) == (nb_links, nb_assets):
+                    continue
+                changed_objects.append(changed_container)
+                if isinstance(changed_container, STACCollection):
+                    changed_container.finalize_summaries(refresh=True)
+                parent_folder = os.path.dirname(changed_container.get_self_href())
+                for link in changed_container.links[nb_links:]:
+                    if link.rel == pystac.RelType.ITEM:
+                        link.target.set_self_href(layout_strategy.get_href(link.target, parent_folder))
+                        changed_objects.append(link.target)
+                    elif link.rel == pystac.RelType.CHILD:
+                        link.target.normalize_hrefs(os.path.join(parent_folder, link.target.id))
+                        for child, _, items in link.target.walk():
+                            changed_objects.extend([child, *items])
+
+            stac_io = self.__serialization_stac_io(run, stac_io, run.asset_href_prefix, json_backend=json_backend,
+                                                   compact=compact, compression=compression)
+            for stac_object in changed_objects:
+                stac_object.save_object(include_self_link=False, stac_io=stac_io)
+            logger.debug(f'{path} catalogued: {len(changed_objects)} STAC objects written')
+            if sqlite_index:
+                write_sqlite_index(run.catalog,
+                                   os.path.join(os.path.dirname(run.catalog.get_self_href()), INDEX_FILE_NAME))
+            return len(changed_objects)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict
+
+import fsspec
+from fsspec.implementations.local import LocalFileSystem
+from pystac import Link
+from stactools.core.io import FsspecStacIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+JSON_BACKENDS = ['orjson', 'msgspec', 'json']
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+LINK_MODES = ['hardlink', 'reflink']
+
+SNAPSHOT_CURRENT = 'current'
+
+# Linux ioctl cloning a file into another one sharing its blocks (Btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def _default(value):
+    # Values read with rasterio (e.g. by rio_stac) may be numpy scalars or arrays
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def _reflink(source, destination):
+    import fcntl
+    with open(source, 'rb') as source_file, open(destination, 'wb') as destination_file:
+        fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+
+
+def _temporary_path(path):
+    # Unique for the writing thread, in the folder of the path so that it replaces it atomically
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def switch_current_snapshot(path, version):
+    """Atomically point the 'current' symbolic link of the path folder to its version sub folder."""
+    current_path = os.path.join(path, SNAPSHOT_CURRENT)
+    temporary_path = f'{current_path}.{os.getpid()}'
+    os.symlink(version, temporary_path)
+    os.replace(temporary_path, current_path)
+
+
+def current_snapshot_path(path):
+    current_path = os.path.join(path, SNAPSHOT_CURRENT)
+    return os.path.realpath(current_path) if os.path.islink(current_path) else None
+
+
+def _available_json_backend():
+    if orjson is not None:
+        return 'orjson'
+    if msgspec is not None:
+        return 'msgspec'
+    return 'json'
+
+
+class CatalogStacIO(FsspecStacIO):
+    """
+    StacIO serializing STAC objects with the fastest available JSON library (orjson, then msgspec, then the standard
+    json module), optionally without indentation (compact) and optionally compressed with gzip or zstd.
+
+    Compressed files are written with an additional .gz or .zst suffix (e.g. catalog.json.gz) while the links keep
+    pointing to the .json files. A CatalogStacIO created with the same compression reads them back transparently.
+
+    With only_changed, a file is not written again when its content is unchanged, which keeps its mtime and inode.
+    The SHA-256 hash of the content is compared with the file on disk or, when a manifest_path is given, with the
+    hash saved in this JSON manifest by save_manifest. The number of written and skipped files is counted.
+
+    With a snapshot_path and a previous_snapshot_path, the files written under snapshot_path whose content is the
+    same as the file at the same place under previous_snapshot_path are linked to it (hardlink, or reflink where the
+    file system supports it) instead of being written. The number of linked files is counted.
+
+    With an asset_href_transform (see stac_cat_utils.utils.AssetHrefTransform), the asset hrefs are rewritten in the
+    written files only.
+    """
+
+    def __init__(self, json_backend=None, compact=False, compression=None, only_changed=False, manifest_path=None,
+                 snapshot_path=None, previous_snapshot_path=None, link_mode='hardlink', asset_href_transform=None,
+                 *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        json_backend = json_backend or _available_json_backend()
+        if json_backend not in JSON_BACKENDS:
+            raise ValueError(f'Unknown JSON backend {json_backend}, expected one of {JSON_BACKENDS}')
+        if (json_backend == 'orjson' and orjson is None) or (json_backend == 'msgspec' and msgspec is None):
+            raise ImportError(f'The {json_backend} JSON backend is not installed')
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f'Unknown compression {compression}, expected one of {list(COMPRESSION_SUFFIXES)}')
+        if link_mode not in LINK_MODES:
+            raise ValueError(f'Unknown link mode {link_mode}, expected one of {LINK_MODES}')
+        self.json_backend = json_backend
+        self.compact = compact
+        self.compression = compression
+        self.only_changed = only_changed
+        self.manifest_path = manifest_path
+        self.manifest = None
+        if manifest_path is not None:
+            self.manifest = self.__read_manifest(manifest_path)
+        self.snapshot_path = snapshot_path
+        self.previous_snapshot_path = previous_snapshot_path
+        self.link_mode = link_mode
+        self.asset_href_transform = asset_href_transform
+        self.written = 0
+        self.skipped = 0
+        self.linked = 0
+
+    @staticmethod
+    def __read_manifest(manifest_path):
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+
+    def save_manifest(self):
+        with open(self.manifest_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2, sort_keys=True)
+
+    def __has_content(self, href, digest):
+        try:
+            # Compressed files are compared on their uncompressed content, gzip headers contain a timestamp
+            with fsspec.open(href, 'rb', compression=self.compression) as existing:
+                return hashlib.sha256(existing.read()).hexdigest() == digest
+        except FileNotFoundError:
+            return False
+
+    def __is_unchanged(self, href, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if self.manifest is not None:
+            manifest_key = os.path.relpath(href, os.path.dirname(os.path.abspath(self.manifest_path)))
+            unchanged = self.manifest.get(manifest_key) == digest and os.path.exists(href)
+            self.manifest[manifest_key] = digest
+            return unchanged
+        return self.__has_content(href, digest)
+
+    def __link_previous_snapshot(self, href, data):
+        previous_href = os.path.join(self.previous_snapshot_path, os.path.relpath(href, self.snapshot_path))
+        if not self.__has_content(previous_href, hashlib.sha256(data).hexdigest()):
+            return False
+        os.makedirs(os.path.dirname(href), exist_ok=True)
+        temporary_href = _temporary_path(href)
+        try:
+            if self.link_mode == 'reflink':
+                try:
+                    _reflink(previous_href, temporary_href)
+                except (ImportError, OSError):
+                    # Not supported by the platform or the file system
+                    if os.path.exists(temporary_href):
+                        os.remove(temporary_href)
+            if not os.path.exists(temporary_href):
+                os.link(previous_href, temporary_href)
+            os.replace(temporary_href, href)
+        finally:
+            if os.path.lexists(temporary_href):
+                os.remove(temporary_href)
+        return True
+
+    def json_dumps_bytes(self, json_dict: Dict[str, Any]) -> bytes:
+        if self.json_backend == 'orjson':
+            option = orjson.OPT_SERIALIZE_NUMPY | (0 if self.compact else orjson.OPT_INDENT_2)
+            return orjson.dumps(json_dict, default=_default, option=option)
+        if self.json_backend == 'msgspec':
+            data = msgspec.json.encode(json_dict, enc_hook=_default)
+            return data if self.compact else msgspec.json.format(data, indent=2)
+        if self.compact:
+            return json.dumps(json_dict, separators=(',', ':'), default=_default).encode('utf-8')
+        return json.dumps(json_dict, indent=2, default=_default).encode('utf-8')
+
+    def json_dumps(self, json_dict: Dict[str, Any], *args: Any, **kwargs: Any) -> str:
+        return self.json_dumps_bytes(json_dict).decode('utf-8')
+
+    def json_loads(self, txt: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        if self.json_backend == 'orjson':
+            return orjson.loads(txt)
+        if self.json_backend == 'msgspec':
+            return msgspec.json.decode(txt)
+        return json.loads(txt)
+
+    def save_json(self, dest, json_dict: Dict[str, Any], *args: Any, **kwargs: Any) -> None:
+        href = dest.get_absolute_href() if isinstance(dest, Link) else str(os.fspath(dest))
+        if self.asset_href_transform is not None:
+            # The dict is created by to_dict for the serialization, the STAC object keeps its hrefs
+            json_dict = self.asset_href_transform.apply(json_dict)
+        self.write_bytes_to_href(href, self.json_dumps_bytes(json_dict))
+
+    def write_text_to_href(self, href: str, txt: str, **kwargs: Any) -> None:
+        self.write_bytes_to_href(href, txt.encode('utf-8'), **kwargs)
+
+    def write_bytes_to_href(self, href: str, data: bytes, **kwargs: Any) -> None:
+        if self.compression:
+            href = f'{href}{COMPRESSION_SUFFIXES[self.compression]}'
+        if self.previous_snapshot_path is not None and self.__link_previous_snapshot(href, data):
+            self.linked += 1
+            return
+        if self.only_changed and self.__is_unchanged(href, data):
+            self.skipped += 1
+            return
+        fs, path = fsspec.core.url_to_fs(href)
+        if not isinstance(fs, LocalFileSystem):
+            with fsspec.open(href, 'wb', compression=self.compression, **kwargs) as destination:
+                destination.write(data)
+            self.written += 1
+            return
+        # Local files are replaced instead of overwritten: a reader never sees a partly written file, and the files
+        # linked to the file (e.g. by a snapshot) are left unchanged
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = _temporary_path(path)
+        try:
+            with fsspec.open(temporary_path, 'wb', compression=self.compression, **kwargs) as destination:
+                destination.write(data)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.lexists(temporary_path):
+                os.remove(temporary_path)
+        self.written += 1
+
+    def read_text_from_href(self, href: str, **kwargs: Any) -> str:
+        if self.compression and not href.endswith(COMPRESSION_SUFFIXES[self.compression]):
+            compressed_href = f'{href}{COMPRESSION_SUFFIXES[self.compression]}'
+            fs, path = fsspec.core.url_to_fs(compressed_href)
+            if fs.exists(path):
+                href = compressed_href
+        with fsspec.open(href, 'rb', compression='infer', **kwargs) as source:
+            return source.read().decode('utf-8')
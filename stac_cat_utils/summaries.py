@@ -0,0 +1,85 @@
+from numbers import Number
+
+import pystac
+
+# Properties which are different for every item or are described by the collection extent
+EXCLUDED_SUMMARY_FIELDS = {'datetime', 'start_datetime', 'end_datetime', 'created', 'updated', 'title', 'description'}
+
+# Numeric properties which are codes rather than measures, summarised as a set of values instead of a range
+DISTINCT_NUMBER_FIELDS = {'proj:epsg', 'sat:relative_orbit'}
+
+DEFAULT_MAX_DISTINCT = 25
+
+
+def _plain_value(value):
+    # Properties read with rasterio (e.g. by rio_stac) may be numpy scalars
+    return value.item() if hasattr(value, 'item') and not isinstance(value, (list, dict)) else value
+
+
+class SummaryAggregator:
+    """
+    Accumulate the summaries of a collection while its items are created, so that they can be written at once
+    without walking the items afterwards.
+
+    String, boolean and code properties are gathered in sets of distinct values, capped to max_distinct values
+    (properties with more distinct values are not summarised), numeric properties in minimum/maximum ranges and
+    the eo:bands of the items and their assets are gathered by band name. The number of items is counted.
+    """
+
+    def __init__(self, max_distinct=DEFAULT_MAX_DISTINCT):
+        self.max_distinct = max_distinct
+        self.count = 0
+        self.__distinct = {}
+        self.__ranges = {}
+        self.__bands = {}
+        self.__overflowed = set()
+
+    def __add_distinct(self, field, values):
+        if field in self.__overflowed:
+            return
+        distinct = self.__distinct.setdefault(field, {})
+        for value in values:
+            distinct[value] = None
+        if len(distinct) > self.max_distinct:
+            # Too many distinct values to be a useful summary, the values are not kept
+            self.__overflowed.add(field)
+            del self.__distinct[field]
+
+    def __add_range(self, field, value):
+        minimum, maximum = self.__ranges.get(field, (value, value))
+        self.__ranges[field] = (min(minimum, value), max(maximum, value))
+
+    def __add_bands(self, bands):
+        for band in bands or []:
+            if isinstance(band, dict) and band.get('name') is not None:
+                self.__bands.setdefault(band['name'], band)
+
+    def add_item(self, item: pystac.Item):
+        self.count += 1
+        for field, value in item.properties.items():
+            if field in EXCLUDED_SUMMARY_FIELDS or value is None:
+                continue
+            if field == 'eo:bands':
+                self.__add_bands(value)
+                continue
+            value = _plain_value(value)
+            if isinstance(value, (str, bool)) or (isinstance(value, Number) and field in DISTINCT_NUMBER_FIELDS):
+                self.__add_distinct(field, [value])
+            elif isinstance(value, Number):
+                self.__add_range(field, value)
+            elif isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+                self.__add_distinct(field, value)
+            else:
+                # Nested objects and lists of numbers (e.g. proj:transform) are not summarised
+                continue
+        for asset in item.assets.values():
+            self.__add_bands(asset.extra_fields.get('eo:bands'))
+
+    def summaries(self) -> pystac.Summaries:
+        summaries = {field: list(values) for field, values in self.__distinct.items()}
+        summaries.update({
+            field: {'minimum': minimum, 'maximum': maximum} for field, (minimum, maximum) in self.__ranges.items()
+        })
+        if self.__bands:
+            summaries['eo:bands'] = list(self.__bands.values())
+        return pystac.Summaries(summaries)
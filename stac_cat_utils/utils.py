@@ -1,23 +1,45 @@
+import datetime
+import gzip
+import hashlib
+import json
 import logging
 import os
 import re
+import tarfile
+import zipfile
+import zlib
+import fsspec
+import numpy as np
 import pystac
 
+from dateutil import parser as date_parser
+from functools import lru_cache
 from glob import glob
 from lxml import etree
 from pystac import RequiredPropertyMissing
-from pystac.extensions.datacube import DatacubeExtension, CollectionDatacubeExtension
+from pystac.utils import datetime_to_str, is_absolute_href, make_relative_href, str_to_datetime
+from pystac.extensions.datacube import DatacubeExtension
+from pystac.extensions.item_assets import AssetDefinition, ItemAssetsExtension
+
+try:
+    import numcodecs
+except ImportError:
+    # Only the uncompressed, zlib and gzip chunks of the Zarr coordinate arrays are read without numcodecs
+    numcodecs = None
 
 logger = logging.getLogger('StacCatalogGenerator')
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 
-def is_product_folder(path):
-    folder_name = os.path.basename(path)
-    folder_content = os.listdir(path)
+ARCHIVE_EXTENSIONS = {'.zip': 'vsizip', '.tar': 'vsitar'}
+
+vsi_href_pattern = re.compile(r'^/(?P<vsi>vsizip|vsitar)/(?P<archive>.*?\.(?:zip|tar))(?:/(?P<inner>.*))?$', re.IGNORECASE)
 
+
+def _identify_product(folder_name, folder_content, open_member, is_file):
     if folder_name.startswith('S1') and 'manifest.safe' in folder_content:
-        tree = etree.parse(os.path.join(path, 'manifest.safe'))
+        with open_member('manifest.safe') as manifest:
+            tree = etree.parse(manifest)
         elements = tree.findall('.//s1sarl1:productType', tree.getroot().nsmap)
         if len(elements) > 0 and elements[0].text == 'GRD':
             return {'is_product': True, 'name': 'S1', 'extra_info': 'GRD'}
@@ -25,7 +47,8 @@ def is_product_folder(path):
             return {'is_product': True, 'name': 'S1', 'extra_info': 'SLC'}
 
     if folder_name.startswith('S2') and 'manifest.safe' in folder_content:
-        tree = etree.parse(os.path.join(path, 'manifest.safe'))
+        with open_member('manifest.safe') as manifest:
+            tree = etree.parse(manifest)
         elements = tree.findall('.//*[@unitType="Product_Level-2A"]')
         if len(elements) > 0:
             return {'is_product': True, 'name': 'S2', 'extra_info': 'L2A'}
@@ -38,7 +61,7 @@ def is_product_folder(path):
         landsat_type = f'{landsat_metadata[0][2:]}{landsat_metadata[1][:2]}{landsat_metadata[5]}'
         if re.match(r'(0[1-5]L102|0[4579]L202)', landsat_type):
             for file in folder_content:
-                if os.path.isfile(os.path.join(path, file)) and file.lower().endswith('mtl.xml'):
+                if is_file(file) and file.lower().endswith('mtl.xml'):
                     return {'is_product': True, 'name': 'LANDSAT', 'extra_info': file}
         else:
             logger.warning(f'Supported Landsat: Landsat 1-5 Collection 2 Level-1 or Landsat 4-5, 7-9 Collection 2 '
@@ -47,6 +70,685 @@ def is_product_folder(path):
     return {'is_product': False, 'name': None, 'extra_info': None}
 
 
+def is_product_folder(path, folder_content=None):
+    folder_name = os.path.basename(path)
+    folder_content = os.listdir(path) if folder_content is None else folder_content
+
+    return _identify_product(folder_name,
+                             folder_content,
+                             lambda name: open(os.path.join(path, name), 'rb'),
+                             lambda name: os.path.isfile(os.path.join(path, name)))
+
+
+def is_product_archive(path):
+    """
+    Check if a zip or tar file holds a recognized product, without extracting it.
+
+    Only the zip central directory or the tar member index is read, plus the product metadata file needed to
+    identify the product. The returned dictionary has an additional 'href' key holding the GDAL virtual file system
+    path (/vsizip/ or /vsitar/) of the product root.
+    """
+    not_product = {'is_product': False, 'name': None, 'extra_info': None}
+    archive_name, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() not in ARCHIVE_EXTENSIONS:
+        return not_product
+
+    try:
+        if extension.lower() == '.zip':
+            archive = zipfile.ZipFile(path)
+            names = [name for name in archive.namelist() if not name.endswith('/')]
+            open_archive_member = archive.open
+        else:
+            archive = tarfile.open(path)
+            names = [member.name for member in archive.getmembers() if member.isfile()]
+            open_archive_member = archive.extractfile
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        logger.warning(f'{path} could not be read as an archive and will be handled as a generic file.')
+        return not_product
+
+    with archive:
+        # The product either sits in a single top level folder (e.g. SAFE.zip) or at the root (e.g. Landsat tar)
+        top_levels = {os.path.normpath(name).split(os.sep)[0] for name in names}
+        if len(top_levels) == 1 and not any(os.path.normpath(name) in top_levels for name in names):
+            root = top_levels.pop()
+            folder_name = root
+        else:
+            root = ''
+            folder_name = archive_name
+        prefix = f'{root}/' if root else ''
+        folder_content = [name[len(prefix):] for name in names
+                          if name.startswith(prefix) and '/' not in name[len(prefix):]]
+
+        product = _identify_product(folder_name,
+                                    folder_content,
+                                    lambda name: open_archive_member(f'{prefix}{name}'),
+                                    lambda name: name in folder_content)
+
+    if product['is_product']:
+        vsi_path = f'/{ARCHIVE_EXTENSIONS[extension.lower()]}/{os.path.abspath(path)}'
+        product['href'] = f'{vsi_path}/{root}' if root else vsi_path
+    return product
+
+
+def split_vsi_href(href):
+    """
+    Split a GDAL /vsizip/ or /vsitar/ href into its virtual file system, archive path and inner path parts.
+    Return None if the href does not point inside an archive.
+    """
+    match = vsi_href_pattern.match(href)
+    if not match:
+        return None
+    return match.group('vsi'), match.group('archive'), match.group('inner') or ''
+
+
+def join_vsi_href(vsi, archive, inner):
+    return f'/{vsi}/{archive}/{inner}' if inner else f'/{vsi}/{archive}'
+
+
+def vsi_read_href_modifier(href):
+    """
+    Translate a GDAL /vsizip/ or /vsitar/ href to its fsspec equivalent so that the stactools product handlers
+    can read metadata files directly from the archive.
+    """
+    vsi_href = split_vsi_href(href)
+    if not vsi_href:
+        return href
+    vsi, archive, inner = vsi_href
+    protocol = 'zip' if vsi == 'vsizip' else 'tar'
+    return f'{protocol}://{inner}::{archive}'
+
+
+@lru_cache(maxsize=32)
+def _archive_members(archive, mtime):
+    if archive.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive) as zip_archive:
+            return frozenset(zip_archive.namelist())
+    with tarfile.open(archive) as tar_archive:
+        return frozenset(tar_archive.getnames())
+
+
+def href_exists(href):
+    vsi_href = split_vsi_href(href)
+    if vsi_href:
+        _, archive, inner = vsi_href
+        if not os.path.exists(archive):
+            return False
+        return not inner or inner in _archive_members(archive, os.path.getmtime(archive))
+    return os.path.exists(href)
+
+
+def path_signature(path):
+    """Number of files, total size and latest modification time of a file or folder, which change with its content."""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return 1, stat.st_size, stat.st_mtime_ns
+    nb_files = size = mtime = 0
+    for folder, _, file_names in os.walk(path):
+        for file_name in file_names:
+            stat = os.stat(os.path.join(folder, file_name))
+            nb_files += 1
+            size += stat.st_size
+            mtime = max(mtime, stat.st_mtime_ns)
+    return nb_files, size, mtime
+
+
+def relative_asset_href(href, start_href):
+    """
+    Make an asset href relative to start_href. For hrefs pointing inside an archive, only the archive path is
+    made relative so the href remains a valid GDAL virtual file system path.
+    """
+    vsi_href = split_vsi_href(href)
+    if vsi_href:
+        vsi, archive, inner = vsi_href
+        return join_vsi_href(vsi, make_relative_href(archive, start_href), inner)
+    if is_absolute_href(href):
+        return make_relative_href(href, start_href)
+    return href
+
+
+def absolute_asset_href(href):
+    """
+    Make a relative asset href absolute, from the current working directory. Unlike relative hrefs, the absolute asset
+    hrefs of an item are not rebased by pystac when its self href changes, e.g. when it is saved again elsewhere.
+    """
+    if is_absolute_href(href):
+        return href
+    return os.path.abspath(href)
+
+
+class AssetHrefTransform:
+    """
+    Rewrite the asset hrefs of the STAC objects when they are serialized, without changing the objects themselves:
+    the absolute hrefs of the item assets are made relative to src_path (see relative_asset_href) and all asset hrefs
+    are prefixed with prefix. The relative path of each asset folder is only computed once.
+    """
+
+    def __init__(self, src_path, prefix='/'):
+        self.src_path = os.path.normpath(src_path)
+        self.prefix = prefix
+        # The files of a relative src_path have hrefs made absolute from the working directory (see
+        # absolute_asset_href), which are written relative to it as they were given
+        self.__start_path = os.path.dirname(self.src_path) if os.path.isabs(self.src_path) else os.getcwd()
+        self.__relative_folders = {}
+
+    def __relative(self, href):
+        if not is_absolute_href(href):
+            return href
+        folder, file_name = os.path.split(href)
+        relative_folder = self.__relative_folders.get(folder)
+        if relative_folder is None:
+            # Same as make_relative_href(href, src_path), src_path being considered as a file
+            relative_folder = os.path.relpath(folder, self.__start_path)
+            self.__relative_folders[folder] = relative_folder
+        return os.path.join(relative_folder, file_name)
+
+    def __add_prefix(self, href):
+        if not href.startswith(self.prefix):
+            href = f'{self.prefix}{href}'
+        return os.path.normpath(href)
+
+    def href(self, href, relative=True):
+        vsi_href = split_vsi_href(href)
+        if vsi_href:
+            # Only the archive path of /vsizip/ and /vsitar/ hrefs is made relative and prefixed
+            vsi, archive, inner = vsi_href
+            archive = self.__relative(archive) if relative else archive
+            return join_vsi_href(vsi, self.__add_prefix(archive), inner)
+        return self.__add_prefix(self.__relative(href) if relative else href)
+
+    def apply(self, stac_dict):
+        """Rewrite in place the asset hrefs of a serialized STAC object, only those of the items being made relative."""
+        relative = stac_dict.get('type') == 'Feature'
+        for asset in stac_dict.get('assets', {}).values():
+            asset['href'] = self.href(asset['href'], relative)
+        return stac_dict
+
+
+ZARR_V2_MARKERS = ('.zmetadata', '.zgroup', '.zarray')
+ZARR_V3_MARKER = 'zarr.json'
+
+
+def is_chunked_store(path, folder_content=None, store_paths=None):
+    """
+    Check if a folder is a chunked store (Zarr v2/v3 or a path matching one of the configured store patterns) which
+    must be handled as a single unit instead of being walked file by file.
+    """
+    folder_content = os.listdir(path) if folder_content is None else folder_content
+    if any(marker in folder_content for marker in ZARR_V2_MARKERS):
+        return {'is_store': True, 'format': 'zarr', 'zarr_format': 2}
+    if ZARR_V3_MARKER in folder_content:
+        return {'is_store': True, 'format': 'zarr', 'zarr_format': 3}
+    if store_paths and path in store_paths:
+        return {'is_store': True, 'format': None, 'zarr_format': None}
+    return {'is_store': False, 'format': None, 'zarr_format': None}
+
+
+def _read_json(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _zarr_v2_metadata(path, folder_content):
+    if '.zmetadata' in folder_content:
+        consolidated = _read_json(os.path.join(path, '.zmetadata')).get('metadata', {})
+    else:
+        # Not consolidated: only read the metadata documents of the root and its direct children
+        consolidated = {key: _read_json(os.path.join(path, key))
+                        for key in ('.zarray', '.zattrs') if key in folder_content}
+        for entry in folder_content:
+            for key in ('.zarray', '.zattrs'):
+                key_path = os.path.join(path, entry, key)
+                if os.path.isfile(key_path):
+                    consolidated[f'{entry}/{key}'] = _read_json(key_path)
+
+    arrays = {}
+    for key, value in consolidated.items():
+        name, _, document = key.rpartition('/')
+        if document != '.zarray':
+            continue
+        attrs = consolidated.get(f'{name}/.zattrs' if name else '.zattrs', {})
+        arrays[name or os.path.basename(path)] = {
+            'shape': value.get('shape', []),
+            'dimensions': attrs.get('_ARRAY_DIMENSIONS', []),
+            'attrs': attrs,
+            'encoding': {
+                'chunks': value.get('chunks'),
+                'first_chunk_path': os.path.join(path, name, '0'),
+                'dtype': value.get('dtype'),
+                'codecs': [*(value.get('filters') or []), *([value['compressor']] if value.get('compressor') else [])],
+                'fill_value': value.get('fill_value'),
+            },
+        }
+    return arrays, consolidated.get('.zattrs', {})
+
+
+def _zarr_v3_encoding(array_path, node):
+    key_encoding = node.get('chunk_key_encoding') or {'name': 'default'}
+    if key_encoding.get('name') == 'v2':
+        first_chunk_key = ['0']
+    else:
+        separator = (key_encoding.get('configuration') or {}).get('separator', '/')
+        first_chunk_key = ['c', '0'] if separator == '/' else ['c.0']
+    codecs = node.get('codecs') or []
+    endian = next(((codec.get('configuration') or {}).get('endian', 'little')
+                   for codec in codecs if codec.get('name') == 'bytes'), 'little')
+    try:
+        dtype = np.dtype(node.get('data_type')).newbyteorder('<' if endian == 'little' else '>').str
+    except TypeError:
+        dtype = None
+    return {
+        'chunks': ((node.get('chunk_grid') or {}).get('configuration') or {}).get('chunk_shape'),
+        'first_chunk_path': os.path.join(array_path, *first_chunk_key),
+        'dtype': dtype,
+        # The bytes codec is applied by reading the chunk with the dtype byte order
+        'codecs': [{'id': codec.get('name'), **(codec.get('configuration') or {})}
+                   for codec in codecs if codec.get('name') != 'bytes'],
+        'fill_value': node.get('fill_value'),
+    }
+
+
+def _zarr_v3_metadata(path, folder_content):
+    root = _read_json(os.path.join(path, ZARR_V3_MARKER))
+    if root.get('node_type') == 'array':
+        nodes = {os.path.basename(path): root}
+        node_paths = {os.path.basename(path): path}
+    elif (root.get('consolidated_metadata') or {}).get('metadata'):
+        nodes = root['consolidated_metadata']['metadata']
+    else:
+        nodes = {entry: _read_json(os.path.join(path, entry, ZARR_V3_MARKER)) for entry in folder_content}
+    if root.get('node_type') != 'array':
+        node_paths = {name: os.path.join(path, name) for name in nodes}
+
+    arrays = {}
+    for name, node in nodes.items():
+        if node.get('node_type') != 'array':
+            continue
+        attrs = node.get('attributes', {})
+        arrays[name] = {
+            'shape': node.get('shape', []),
+            'dimensions': node.get('dimension_names') or attrs.get('_ARRAY_DIMENSIONS', []),
+            'attrs': attrs,
+            'encoding': _zarr_v3_encoding(node_paths[name], node),
+        }
+    return arrays, root.get('attributes', {}) if root.get('node_type') == 'group' else {}
+
+
+def read_zarr_metadata(path, zarr_format, folder_content=None):
+    """
+    Read the arrays (shape, dimension names and attributes) and the root attributes of a Zarr store from its
+    (preferably consolidated) metadata only. Chunk files are never listed nor read.
+    """
+    folder_content = os.listdir(path) if folder_content is None else folder_content
+    if zarr_format == 3:
+        return _zarr_v3_metadata(path, folder_content)
+    return _zarr_v2_metadata(path, folder_content)
+
+
+# Compressors of the Zarr chunks decoded with the standard library
+STANDARD_CODECS = {'zlib': zlib.decompress, 'gzip': gzip.decompress}
+
+
+def _decode_chunk(data, codecs):
+    # The codecs are listed in encoding order
+    for codec in reversed(codecs):
+        if codec['id'] in STANDARD_CODECS:
+            data = STANDARD_CODECS[codec['id']](data)
+        elif numcodecs is not None:
+            data = numcodecs.get_codec(dict(codec)).decode(data)
+        else:
+            return None
+    return data
+
+
+def read_zarr_coordinate_range(array):
+    """
+    Return the [minimum, maximum] of a one dimensional Zarr array (e.g. the coordinates of a dimension) read with
+    read_zarr_metadata, or None when it is stored in more than one chunk, is empty or is encoded with codecs which
+    cannot be decoded. The values equal to the fill value are ignored and the CF scale_factor and add_offset
+    attributes are applied.
+    """
+    encoding = array.get('encoding') or {}
+    shape, chunks = array.get('shape') or [], encoding.get('chunks') or []
+    if len(shape) != 1 or not shape[0] or len(chunks) != 1 or chunks[0] < shape[0]:
+        return None
+    try:
+        with open(encoding['first_chunk_path'], 'rb') as chunk_file:
+            data = _decode_chunk(chunk_file.read(), encoding['codecs'])
+        if data is None:
+            return None
+        values = np.frombuffer(data, dtype=np.dtype(encoding['dtype']))[:shape[0]]
+    except Exception as e:
+        # Missing chunks (only made of the fill value), unsupported data types or codecs
+        logger.debug(f'{encoding.get("first_chunk_path")} could not be read: {e}')
+        return None
+    if values.dtype.kind not in 'iuf':
+        return None
+    fill_value = encoding.get('fill_value')
+    if isinstance(fill_value, (int, float)) and not isinstance(fill_value, bool):
+        values = values[values != fill_value]
+    attrs = array.get('attrs') or {}
+    if 'scale_factor' in attrs or 'add_offset' in attrs:
+        values = values * attrs.get('scale_factor', 1) + attrs.get('add_offset', 0)
+    if values.dtype.kind == 'f':
+        values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    return [values.min().item(), values.max().item()]
+
+
+CF_TIME_UNITS = {
+    'days': 'days', 'day': 'days', 'd': 'days',
+    'hours': 'hours', 'hour': 'hours', 'hr': 'hours', 'h': 'hours',
+    'minutes': 'minutes', 'minute': 'minutes', 'min': 'minutes',
+    'seconds': 'seconds', 'second': 'seconds', 'sec': 'seconds', 's': 'seconds',
+    'milliseconds': 'milliseconds', 'millisecond': 'milliseconds', 'ms': 'milliseconds',
+    'microseconds': 'microseconds', 'microsecond': 'microseconds', 'us': 'microseconds',
+}
+
+# Calendars of the datetime module, the times of the other CF calendars (e.g. noleap, 360_day) are not decoded
+CF_STANDARD_CALENDARS = {'standard', 'gregorian', 'proleptic_gregorian'}
+
+cf_time_units_pattern = re.compile(r'^\s*(?P<unit>\w+)\s+since\s+(?P<reference>.+?)\s*$', re.IGNORECASE)
+
+
+def decode_cf_times(values, units, calendar='standard'):
+    """
+    Convert numeric CF times, in units such as 'days since 1970-01-01 00:00:00', to ISO 8601 datetimes. Return None
+    when the units or the calendar are not supported.
+    """
+    match = cf_time_units_pattern.match(units or '')
+    if match is None or match['unit'].lower() not in CF_TIME_UNITS or \
+            (calendar or 'standard').lower() not in CF_STANDARD_CALENDARS:
+        return None
+    try:
+        reference = date_parser.parse(match['reference'])
+        if reference.tzinfo is None:
+            reference = reference.replace(tzinfo=datetime.timezone.utc)
+        return [datetime_to_str(reference + datetime.timedelta(**{CF_TIME_UNITS[match['unit'].lower()]: value}))
+                for value in values]
+    except (ValueError, OverflowError, TypeError):
+        return None
+
+
+SIDECAR_ROLES = {
+    '.aux.xml': ['metadata'],
+    '.ovr': ['overview'],
+    '.msk': ['data-mask'],
+    '.tfw': ['metadata'],
+    '.tifw': ['metadata'],
+    '.wld': ['metadata'],
+    '.jgw': ['metadata'],
+    '.pgw': ['metadata'],
+    '.prj': ['metadata'],
+    # RPC and imagery metadata files, which replace the extension of the raster or suffix its name stem
+    '.rpb': ['metadata'],
+    '_rpc.txt': ['metadata'],
+    '.imd': ['metadata'],
+}
+
+
+def _sidecar_suffix(file_name):
+    for suffix in SIDECAR_ROLES:
+        if file_name.lower().endswith(suffix) and len(file_name) > len(suffix):
+            return suffix
+    return None
+
+
+def sidecar_roles(file_name):
+    suffix = _sidecar_suffix(file_name)
+    return SIDECAR_ROLES[suffix] if suffix else None
+
+
+def group_sidecar_files(file_names):
+    """
+    Group raster files with their GDAL sidecar files (.aux.xml, .ovr, .msk, world files, .prj and RPC files) using the
+    folder listing only. Return a dictionary, in listing order, mapping each primary file to a tuple of its sidecar
+    files and a flag telling if GDAL must list the folder to open it: when other files share its name stem, or when
+    the folder has sidecar files without a primary file, which GDAL may find under a naming not known here. Sidecar
+    files without a primary file are kept as primary.
+    """
+    names = set(file_names)
+    by_stem = {}
+    for name in file_names:
+        by_stem.setdefault(os.path.splitext(name)[0], []).append(name)
+
+    sidecars = {}
+    for name in file_names:
+        suffix = _sidecar_suffix(name)
+        if not suffix:
+            continue
+        base = name[:-len(suffix)]
+        if base in names and not _sidecar_suffix(base):
+            # e.g. image.tif.aux.xml, image.tif.ovr
+            sidecars[name] = base
+            continue
+        # e.g. image.tfw, image.prj, image.aux.xml, image_rpc.txt
+        primaries = [candidate for candidate in by_stem.get(base, []) if not _sidecar_suffix(candidate)]
+        if primaries:
+            sidecars[name] = primaries[0]
+
+    unmatched_sidecars = any(_sidecar_suffix(name) and name not in sidecars for name in file_names)
+    groups = {name: ([], len(by_stem[os.path.splitext(name)[0]]) > 1) for name in file_names if name not in sidecars}
+    for sidecar, primary in sidecars.items():
+        groups[primary][0].append(sidecar)
+    return {name: (tuple(group_sidecars), has_siblings or bool(group_sidecars) or unmatched_sidecars)
+            for name, (group_sidecars, has_siblings) in groups.items()}
+
+
+product_name_patterns = {
+    'S1': re.compile(
+        r'^(?P<mission>S1[A-D])_(?P<mode>[A-Z0-9]{2})_(?P<product_type>[A-Z]{3})(?P<resolution>[FHM_])_'
+        r'(?P<level>\d)(?P<product_class>[SA])(?P<polarisation>[SDHV]{2})_(?P<start>\d{8}T\d{6})_'
+        r'(?P<stop>\d{8}T\d{6})_(?P<orbit>\d{6})_(?P<datatake>[0-9A-F]{6})_(?P<unique_id>[0-9A-F]{4})$'
+    ),
+    'S2': re.compile(
+        r'^(?P<mission>S2[A-D])_MSI(?P<level>L1C|L2A)_(?P<start>\d{8}T\d{6})_N(?P<baseline>\d{4})_'
+        r'R(?P<relative_orbit>\d{3})_T(?P<tile>[0-9A-Z]{5})_(?P<generation>\d{8}T\d{6})$'
+    ),
+    'LANDSAT': re.compile(
+        r'^L(?P<sensor>[COTEM])(?P<satellite>\d{2})_(?P<level>L1TP|L1GT|L1GS|L2SP|L2SR)_(?P<path>\d{3})'
+        r'(?P<row>\d{3})_(?P<start>\d{8})_(?P<generation>\d{8})_(?P<collection>\d{2})_(?P<tier>RT|T1|T2)$'
+    ),
+}
+
+
+def _name_datetime(value):
+    date_format = '%Y%m%dT%H%M%S' if 'T' in value else '%Y%m%d'
+    return datetime.datetime.strptime(value, date_format).replace(tzinfo=datetime.timezone.utc)
+
+
+def parse_product_name(name):
+    """
+    Parse a Sentinel-1, Sentinel-2 or Landsat Collection 2 product folder or archive name.
+    Return a dictionary with the product mission, platform and acquisition interval as well as all the fields of the
+    naming convention, or None if the name does not follow a supported naming convention.
+    """
+    product_name = os.path.basename(os.path.normpath(name))
+    for extension in ('.zip', '.tar', '.SAFE', '.safe'):
+        if product_name.endswith(extension):
+            product_name = product_name[:-len(extension)]
+
+    for mission, pattern in product_name_patterns.items():
+        match = pattern.match(product_name)
+        if not match:
+            continue
+        fields = match.groupdict()
+        start = _name_datetime(fields['start'])
+        if mission == 'S1':
+            platform = f'sentinel-1{fields["mission"][-1].lower()}'
+            end = _name_datetime(fields['stop'])
+        elif mission == 'S2':
+            platform = f'sentinel-2{fields["mission"][-1].lower()}'
+            end = start
+        else:
+            platform = f'landsat-{int(fields["satellite"])}'
+            # Only the acquisition day is part of Landsat product names
+            end = start + datetime.timedelta(days=1)
+        return {**fields, 'name': product_name, 'mission': mission, 'platform': platform,
+                'start_datetime': start, 'end_datetime': end}
+    return None
+
+
+def _to_utc_datetime(value):
+    if value is None or value in ('', '..'):
+        return None
+    if isinstance(value, str):
+        value = str_to_datetime(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+def parse_datetime_interval(value):
+    """
+    Convert a datetime filter to a (start, end) tuple of UTC datetimes, where None means an open end.
+    Accepted values: a datetime, a (start, end) tuple or list, or a string such as '2023-01-01/2023-01-31',
+    '2023-01-01T00:00:00Z/..' or a single RFC 3339 datetime.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        bounds = value.split('/')
+        if len(bounds) == 1:
+            bounds = [bounds[0], bounds[0]]
+    elif isinstance(value, (tuple, list)):
+        bounds = list(value)
+    else:
+        bounds = [value, value]
+    start, end = _to_utc_datetime(bounds[0]), _to_utc_datetime(bounds[1])
+    if isinstance(bounds[1], str) and len(bounds[1]) == 10:
+        # A date only end bound includes the whole day
+        end = end + datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    return start, end
+
+
+def product_name_matches(product_name, datetime_interval=None, platforms=None):
+    """
+    Check, from the product name only, if a product is in the datetime interval and was acquired by one of the
+    platforms (e.g. 'sentinel-2', 'sentinel-1a', 'landsat-8'). Names which can not be parsed always match.
+    """
+    product_info = parse_product_name(product_name)
+    if product_info is None:
+        return True
+    if platforms and not any(product_info['platform'].startswith(platform.lower()) for platform in platforms):
+        return False
+    if datetime_interval:
+        start, end = datetime_interval
+        if start and product_info['end_datetime'] < start:
+            return False
+        if end and product_info['start_datetime'] > end:
+            return False
+    return True
+
+
+SCENE_IDENTITY_FIELDS = {
+    # S1 reprocessings only differ by their unique identifier
+    'S1': ('mission', 'mode', 'product_type', 'resolution', 'level', 'product_class', 'polarisation', 'start', 'stop',
+           'orbit', 'datatake'),
+    # S2 reprocessings differ by their processing baseline and generation time
+    'S2': ('mission', 'level', 'start', 'relative_orbit', 'tile'),
+    # Landsat reprocessings differ by their processing date and may change tier
+    'LANDSAT': ('sensor', 'satellite', 'level', 'path', 'row', 'start', 'collection'),
+}
+
+DUPLICATE_POLICIES = {
+    'latest_baseline': lambda product_info: (product_info.get('baseline') or '', product_info.get('generation') or ''),
+    'newest_generation': lambda product_info: product_info.get('generation') or '',
+    'first': lambda product_info: 0,
+}
+
+
+def product_scene_key(product_info):
+    return (product_info['mission'], *(product_info[field] for field in SCENE_IDENTITY_FIELDS[product_info['mission']]))
+
+
+def find_duplicate_products(src_path, ignore_paths=(), policy='latest_baseline', preferred_paths=None):
+    """
+    Find the product folders and archives under src_path which are copies or reprocessings of the same scene, using
+    their names only. For each scene, the copy under the first matching preferred path prefix is kept, then the best
+    one according to the policy ('latest_baseline', 'newest_generation' or 'first'), then the first one in path order.
+    Return the set of paths of the duplicates which must be skipped.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f'Unknown duplicate policy {policy}, expected one of {list(DUPLICATE_POLICIES)}')
+    preferred_paths = [os.path.normpath(str(path)) for path in preferred_paths or []]
+
+    scenes = {}
+    for root, dirs, files in os.walk(src_path):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) not in ignore_paths]
+        for name in [*dirs, *files]:
+            path = os.path.join(root, name)
+            product_info = parse_product_name(name)
+            if product_info is None or path in ignore_paths:
+                continue
+            scenes.setdefault(product_scene_key(product_info), []).append((path, product_info))
+        # Product folders are not walked
+        dirs[:] = [name for name in dirs if parse_product_name(name) is None]
+
+    def preference(candidate):
+        path, product_info = candidate
+        preferred_rank = next((rank for rank, prefix in enumerate(preferred_paths)
+                               if path == prefix or path.startswith(f'{prefix}{os.sep}')), len(preferred_paths))
+        return -preferred_rank, DUPLICATE_POLICIES[policy](product_info)
+
+    duplicates = set()
+    for candidates in scenes.values():
+        if len(candidates) < 2:
+            continue
+        candidates.sort(key=lambda candidate: candidate[0])
+        kept = max(candidates, key=preference)
+        logger.info(f'{kept[0]} kept over {len(candidates) - 1} duplicate(s) of the same scene')
+        duplicates.update(path for path, _ in candidates if path != kept[0])
+    return duplicates
+
+
+def _open_product_member(product_href, member):
+    href = f'{product_href}/{member}'
+    if split_vsi_href(href):
+        return fsspec.open(vsi_read_href_modifier(href), 'rb')
+    return open(href, 'rb')
+
+
+def product_footprint_bbox(product, product_href):
+    """
+    Read the bounding box of a recognized product from its manifest.safe (gml:coordinates) or from the corner
+    coordinates of its Landsat MTL file, without running the product handler. Return None if it can not be read.
+    """
+    try:
+        return _read_product_footprint_bbox(product, product_href)
+    except (OSError, KeyError, ValueError, etree.XMLSyntaxError, tarfile.TarError, zipfile.BadZipFile) as e:
+        logger.warning(f'The footprint of {product_href} can not be read: {e}')
+        return None
+
+
+def _read_product_footprint_bbox(product, product_href):
+    if product['name'] in ('S1', 'S2'):
+        with _open_product_member(product_href, 'manifest.safe') as manifest:
+            tree = etree.parse(manifest)
+        coordinates = ' '.join(element.text or '' for element in tree.iter('{*}coordinates'))
+        values = [float(value) for value in coordinates.replace(',', ' ').split()]
+        latitudes, longitudes = values[0::2], values[1::2]
+    elif product['name'] == 'LANDSAT':
+        with _open_product_member(product_href, product['extra_info']) as mtl:
+            tree = etree.parse(mtl)
+        corners = {str(element.tag): float(element.text) for element in tree.iter()
+                   if re.match(r'CORNER_.._(LAT|LON)_PRODUCT', str(element.tag))}
+        latitudes = [value for tag, value in corners.items() if tag.endswith('_LAT_PRODUCT')]
+        longitudes = [value for tag, value in corners.items() if tag.endswith('_LON_PRODUCT')]
+    else:
+        return None
+    if not latitudes or not longitudes:
+        return None
+    return [min(longitudes), min(latitudes), max(longitudes), max(latitudes)]
+
+
+def bbox_intersects(bbox, other_bbox):
+    return not (bbox[2] < other_bbox[0] or other_bbox[2] < bbox[0] or bbox[3] < other_bbox[1]
+                or other_bbox[3] < bbox[1])
+
+
 def is_collection_empty(collection: pystac.Collection):
     return not(
         list(collection.get_all_items()) or collection.get_assets().keys() or list(collection.get_all_collections())
@@ -74,7 +776,7 @@ def collection_to_assets(collection: pystac.Collection):
 
 
 def cube_extend(collection, key):
-    if not isinstance(collection, CollectionDatacubeExtension):
+    if not isinstance(collection, DatacubeExtension):
         collection = DatacubeExtension.ext(collection, add_if_missing=True)
     try:
         value = getattr(collection, key)
@@ -97,11 +799,22 @@ def is_key_unique(collection, key):
     return is_unique
 
 
+def item_asset_media_type(item: pystac.Item, key):
+    """Media type of an item asset, defined in the asset or, for lean items, in its collection item_assets."""
+    media_type = item.assets[key].media_type
+    if media_type is None:
+        collection = item.get_collection()
+        if collection is not None and ItemAssetsExtension.has_extension(collection):
+            definition = (ItemAssetsExtension.ext(collection).item_assets or {}).get(key)
+            media_type = definition.media_type if definition is not None else None
+    return media_type
+
+
 def item_assets_info(item: pystac.Item):
     asset_names = []
     asset_bands = []
     for name, asset in item.assets.items():
-        if asset.media_type.startswith('image/'):
+        if (item_asset_media_type(item, name) or '').startswith('image/'):
             if 'eo:bands' in asset.extra_fields:
                 asset_bands.extend(asset.extra_fields['eo:bands'])
                 band_names = '_'.join([i['name'] for i in asset.extra_fields['eo:bands']])
@@ -115,20 +828,183 @@ def item_assets_info(item: pystac.Item):
     return sorted(asset_names), asset_bands
 
 
+SIGNATURE_PRECISION = 7
+
+
+def _canonical_coordinates(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return tuple(round(value, SIGNATURE_PRECISION) for value in coordinates)
+    coordinates = [_canonical_coordinates(value) for value in coordinates]
+    if len(coordinates) > 3 and coordinates[0] == coordinates[-1] and isinstance(coordinates[0][0], (int, float)):
+        # Closed rings start at their smallest vertex, whatever vertex they were written from
+        ring = coordinates[:-1]
+        start = ring.index(min(ring))
+        ring = ring[start:] + ring[:start]
+        coordinates = ring + [ring[0]]
+    return tuple(coordinates)
+
+
+def item_datacube_signature(item: pystac.Item):
+    """
+    Compact hash of what items of a same datacube must share: the canonical footprint (bbox and geometry rounded to
+    SIGNATURE_PRECISION decimals), the platform and the asset/band layout.
+    """
+    geometry = item.geometry or {}
+    asset_names, _ = item_assets_info(item)
+    signature = (
+        _canonical_coordinates([float(value) for value in item.bbox or []]),
+        geometry.get('type'),
+        _canonical_coordinates(geometry.get('coordinates') or []),
+        item.common_metadata.platform,
+        tuple(asset_names)
+    )
+    return hashlib.blake2b(repr(signature).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def group_datacube_items(items):
+    """
+    Partition items in groups of datacube compliant items in a single pass, keyed by their signature.
+    Groups are in the order of their first item.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item_datacube_signature(item), []).append(item)
+    return groups
+
+
 def is_datacube_compliant(collection: pystac.Collection):
-    validation = None
     bands = []
     if len(collection.get_assets()) != 0:
         return False, bands
-    for item in collection.get_all_items():
-        assets_str, bands = item_assets_info(item)
-        item_info = f'{item.bbox}-{item.geometry}-{item.common_metadata.platform}-{assets_str}'
-        if validation is None or validation == item_info:
-            validation = item_info
-        else:
-            return True, bands
+    groups = group_datacube_items(collection.get_all_items())
+    if len(groups) > 1:
+        logger.info(f'{collection} items form {len(groups)} datacube compliant groups: '
+                    f'{[len(group) for group in groups.values()]}')
+        return False, bands
+    for group in groups.values():
+        _, bands = item_assets_info(group[0])
     return True, bands
 
 
+def iso8601_duration(seconds):
+    days, remainder = divmod(int(round(seconds)), 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    time = ''.join(f'{value}{unit}' for value, unit in ((hours, 'H'), (minutes, 'M'), (seconds, 'S')) if value)
+    duration = f'P{days}D' if days else 'P'
+    if time or not days:
+        duration = f'{duration}T{time or "0S"}'
+    return duration
+
+
+def regular_step(values, tolerance=0.0):
+    """Step between sorted values if all the differences are equal within the tolerance, else None."""
+    if len(values) < 2:
+        return None
+    differences = np.diff(values)
+    if np.ptp(differences) > tolerance:
+        return None
+    return float(np.median(differences))
+
+
+def datacube_time_values(items, tolerance=1.0):
+    """
+    Sorted unique datetimes of the items (their start_datetime when datetime is null), as ISO 8601 strings with a
+    second precision, and the ISO 8601 duration between them if they are regularly spaced (within tolerance seconds).
+    """
+    timestamps = np.fromiter(
+        (dt.timestamp() for dt in (item.datetime or item.common_metadata.start_datetime for item in items) if dt),
+        dtype=np.float64
+    )
+    timestamps = np.unique(np.round(timestamps).astype(np.int64))
+    values = np.datetime_as_string(timestamps.astype('datetime64[s]'), unit='s', timezone='UTC').tolist()
+    step = regular_step(timestamps, tolerance)
+    return values, iso8601_duration(step) if step else None
+
+
+def _item_transform(item: pystac.Item):
+    if 'proj:transform' in item.properties:
+        return item.properties['proj:transform'], item.properties.get('proj:epsg'), item.properties.get('proj:bbox')
+    # Items without a transform of their own (e.g. Sentinel-2) may have assets at different resolutions
+    asset_fields = [asset.extra_fields for asset in item.assets.values() if 'proj:transform' in asset.extra_fields]
+    if len({tuple(fields['proj:transform'][:6]) for fields in asset_fields}) != 1:
+        return None, None, None
+    return asset_fields[0]['proj:transform'], item.properties.get('proj:epsg'), asset_fields[0].get('proj:bbox')
+
+
+def datacube_spatial_steps(items, tolerance=1e-9):
+    """
+    Pixel size of the items on the x and y axis, derived from their proj:transform, if all the items share the same
+    proj:epsg and pixel size (within tolerance) and have a proj:bbox. Return the x step, the y step, the EPSG code and
+    the extent of the items in that reference system, or None.
+    """
+    transforms = []
+    bboxes = []
+    epsg_codes = set()
+    for item in items:
+        transform, epsg, bbox = _item_transform(item)
+        if transform is None or epsg is None or not bbox:
+            return None
+        transforms.append(transform[:6])
+        bboxes.append(bbox[:4])
+        epsg_codes.add(epsg)
+    if not transforms or len(epsg_codes) != 1:
+        return None
+    transforms = np.asarray(transforms, dtype=np.float64)
+    if np.ptp(transforms[:, 0]) > tolerance or np.ptp(transforms[:, 4]) > tolerance:
+        return None
+    bboxes = np.asarray(bboxes, dtype=np.float64)
+    extent = [float(bboxes[:, 0].min()), float(bboxes[:, 1].min()),
+              float(bboxes[:, 2].max()), float(bboxes[:, 3].max())]
+    return float(transforms[0, 0]), float(transforms[0, 4]), epsg_codes.pop(), extent
+
+
+LEAN_ASSET_FIELDS = {'description': 'description', 'roles': 'roles', 'type': 'media_type'}
+
+
+def lean_item_assets(collection: pystac.Collection, fields=tuple(LEAN_ASSET_FIELDS), min_items=2):
+    """
+    Move the asset fields (description, roles and media type by default) which are identical in all the items of the
+    collection into the collection item_assets, and remove them from the item assets. Only the asset keys shared by at
+    least min_items items are considered, and a field already defined differently in item_assets is left in the items.
+    """
+    items = list(collection.get_items())
+    shared_fields = {}
+    key_counts = {}
+    for item in items:
+        for key, asset in item.assets.items():
+            values = {field: getattr(asset, LEAN_ASSET_FIELDS[field]) for field in fields}
+            key_counts[key] = key_counts.get(key, 0) + 1
+            if key not in shared_fields:
+                shared_fields[key] = {field: value for field, value in values.items() if value is not None}
+            else:
+                shared_fields[key] = {field: value for field, value in shared_fields[key].items()
+                                      if values[field] == value}
+
+    definitions = {}
+    if ItemAssetsExtension.has_extension(collection):
+        definitions = dict(ItemAssetsExtension.ext(collection).item_assets or {})
+    moved_fields = {}
+    for key, key_fields in shared_fields.items():
+        if key_counts[key] < min_items:
+            continue
+        properties = dict(definitions[key].properties) if key in definitions else {}
+        key_fields = {field: value for field, value in key_fields.items()
+                      if properties.get(field, value) == value}
+        properties.update(key_fields)
+        # An item asset definition must hold at least two fields
+        if key_fields and len(properties) >= 2:
+            definitions[key] = AssetDefinition(properties)
+            moved_fields[key] = key_fields
+
+    if not moved_fields:
+        return
+    ItemAssetsExtension.ext(collection, add_if_missing=True).item_assets = definitions
+    for item in items:
+        for key, asset in item.assets.items():
+            for field in moved_fields.get(key, {}):
+                setattr(asset, LEAN_ASSET_FIELDS[field], None)
+
+
 def remove_empty_key(dictionary: dict):
     return {k: v for k, v in dictionary.items() if v}
@@ -0,0 +1,264 @@
+import itertools
+import json
+import os
+import urllib.parse
+import urllib.request
+
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pystac
+from pystac.extensions import datacube, eo, item_assets, projection, raster, sar, sat
+
+from stac_cat_utils.stac_io import CatalogStacIO
+from stac_cat_utils.utils import href_exists, split_vsi_href
+
+try:
+    import jsonschema
+    import referencing
+    import referencing.jsonschema
+    from jsonschema_specifications import REGISTRY as META_SCHEMAS
+    from referencing.exceptions import NoSuchResource, Unresolvable
+except ImportError:
+    # Validation requires jsonschema >= 4.18, which resolves the schema references with referencing
+    jsonschema = None
+
+# Schemas bundled with the package (the STAC core and DEFAULT_SCHEMA_URIS extensions schemas), see download_schemas
+DEFAULT_SCHEMA_CACHE = os.path.join(os.path.dirname(__file__), 'schemas')
+
+CORE_SCHEMA_URI = 'https://schemas.stacspec.org/v{version}/{spec}-spec/json-schema/{spec}.json'
+
+CORE_SCHEMA_SPECS = {'Feature': 'item', 'Catalog': 'catalog', 'Collection': 'collection'}
+
+DEFAULT_SCHEMA_URIS = [
+    *(CORE_SCHEMA_URI.format(version=pystac.get_stac_version(), spec=spec) for spec in CORE_SCHEMA_SPECS.values()),
+    sar.SCHEMA_URI, sat.SCHEMA_URI, eo.SCHEMA_URI, projection.SCHEMA_URI, raster.SCHEMA_URI, datacube.SCHEMA_URI,
+    item_assets.SCHEMA_URI,
+    # Version written by rio_stac in the file items
+    'https://stac-extensions.github.io/projection/v1.0.0/schema.json',
+]
+
+DEFAULT_CHUNK_SIZE = 64
+
+# Chunks submitted to the validation processes per worker, ahead of the results being read
+CHUNKS_PER_WORKER = 2
+
+
+def schema_cache_file(uri, cache_path=DEFAULT_SCHEMA_CACHE):
+    """Path of a schema in a cache folder, e.g. <cache_path>/schemas.stacspec.org/v1.0.0/item-spec/..."""
+    parsed_uri = urllib.parse.urlsplit(uri)
+    return os.path.join(cache_path, parsed_uri.netloc, *parsed_uri.path.lstrip('/').split('/'))
+
+
+def _schema_refs(schema):
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == '$ref' and isinstance(value, str):
+                yield value
+            else:
+                yield from _schema_refs(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from _schema_refs(value)
+
+
+def download_schemas(uris=tuple(DEFAULT_SCHEMA_URIS), cache_path=DEFAULT_SCHEMA_CACHE):
+    """
+    Seed a schema cache folder (on a machine with network access) with the schemas of the given URIs and all the
+    schemas they reference. Schemas already in the cache are not downloaded again. Return the cached URIs.
+    """
+    pending = list(uris)
+    cached = set()
+    while pending:
+        uri = urllib.parse.urldefrag(pending.pop())[0]
+        if uri in cached:
+            continue
+        cached.add(uri)
+        path = schema_cache_file(uri, cache_path)
+        if not os.path.exists(path):
+            with urllib.request.urlopen(uri) as response:
+                data = response.read()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as schema_file:
+                schema_file.write(data)
+        with open(path) as schema_file:
+            schema = json.load(schema_file)
+        base_uri = schema.get('$id', uri) if isinstance(schema, dict) else uri
+        pending.extend(urllib.parse.urljoin(base_uri, ref) for ref in _schema_refs(schema) if not ref.startswith('#'))
+    return sorted(cached)
+
+
+class SchemaCache:
+    """
+    Resolve the JSON schemas (and the schemas they reference) from local cache folders only, never from the network,
+    and keep one compiled validator per schema to validate any number of objects.
+    """
+
+    def __init__(self, cache_paths=None):
+        if jsonschema is None:
+            raise ImportError('Validation requires jsonschema >= 4.18')
+        self.cache_paths = [*(cache_paths or []), DEFAULT_SCHEMA_CACHE]
+        self.__resources = {}
+        self.__validators = {}
+        # The JSON Schema meta schemas (e.g. referenced by the collection schema) are bundled with jsonschema
+        self.__registry = META_SCHEMAS.combine(referencing.Registry(retrieve=self.__retrieve))
+
+    def __retrieve(self, uri):
+        if uri not in self.__resources:
+            for cache_path in self.cache_paths:
+                path = schema_cache_file(uri, cache_path)
+                if os.path.exists(path):
+                    with open(path) as schema_file:
+                        self.__resources[uri] = referencing.Resource.from_contents(
+                            json.load(schema_file), default_specification=referencing.jsonschema.DRAFT7)
+                    break
+            else:
+                raise NoSuchResource(ref=uri)
+        return self.__resources[uri]
+
+    def validator(self, uri):
+        if uri not in self.__validators:
+            schema = self.__retrieve(uri).contents
+            validator_class = jsonschema.validators.validator_for(schema, default=jsonschema.Draft7Validator)
+            # Referencing the schema by its URI resolves its relative references even when it has no $id
+            self.__validators[uri] = validator_class({'$ref': uri}, registry=self.__registry)
+        return self.__validators[uri]
+
+    def require(self, uri):
+        """Compile the validator of a schema, raising FileNotFoundError when it is not in the schema cache."""
+        try:
+            self.validator(uri)
+        except NoSuchResource:
+            raise FileNotFoundError(f'The schema {uri} is not in the schema cache folders {self.cache_paths}, '
+                                    'see stac_cat_utils.validation.download_schemas') from None
+
+    def validate(self, stac_dict):
+        """Return the (schema URI, JSON path, message) of the errors of a STAC object dict."""
+        uris = [CORE_SCHEMA_URI.format(version=stac_dict.get('stac_version'),
+                                       spec=CORE_SCHEMA_SPECS.get(stac_dict.get('type'), 'item')),
+                *stac_dict.get('stac_extensions', [])]
+        errors = []
+        for uri in uris:
+            try:
+                for error in self.validator(uri).iter_errors(stac_dict):
+                    errors.append((uri, error.json_path, error.message))
+            except (NoSuchResource, Unresolvable) as e:
+                missing_uri = getattr(e, 'ref', uri)
+                errors.append((uri, '$', 'Schema not in the schema cache' +
+                               (f' (referenced {missing_uri})' if missing_uri != uri else '')))
+        return errors
+
+
+def _missing_assets(asset_hrefs):
+    missing = []
+    for key, href in asset_hrefs.items():
+        # Only the assets on the local file system are checked
+        if urllib.parse.urlsplit(href).scheme in ('', 'file') or split_vsi_href(href):
+            if not href_exists(href[len('file://'):] if href.startswith('file://') else href):
+                missing.append(key)
+    return missing
+
+
+def _validate_object(schema_cache, task):
+    href, data, asset_hrefs = task
+    stac_dict = json.loads(data)
+    return href, schema_cache.validate(stac_dict), _missing_assets(asset_hrefs) if asset_hrefs else []
+
+
+_worker_schema_cache = None
+
+
+def _init_worker(cache_paths):
+    global _worker_schema_cache
+    _worker_schema_cache = SchemaCache(cache_paths)
+
+
+def _validate_in_worker(tasks):
+    return [_validate_object(_worker_schema_cache, task) for task in tasks]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ValidationReport:
+    """
+    Result of validate_catalog: the schema errors of each invalid object and the missing assets of each object, by
+    href (or id for unsaved objects). error_counts aggregates the errors by schema and message, so that an error
+    repeated in thousands of items is read once.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.errors = {}
+        self.missing_assets = {}
+        self.error_counts = Counter()
+
+    @property
+    def valid(self):
+        return not self.errors and not self.missing_assets
+
+    def add(self, href, errors, missing_assets):
+        self.checked += 1
+        if errors:
+            self.errors[href] = errors
+            self.error_counts.update(f'{uri}: {message}' for uri, _, message in errors)
+        if missing_assets:
+            self.missing_assets[href] = missing_assets
+
+    def __repr__(self):
+        return (f'<ValidationReport checked={self.checked} invalid={len(self.errors)} '
+                f'missing_assets={sum(len(keys) for keys in self.missing_assets.values())}>')
+
+
+def _validation_tasks(catalog: pystac.Catalog, check_assets):
+    stac_io = CatalogStacIO(compact=True)
+    for container, _, items in catalog.walk():
+        for stac_object in [container, *items]:
+            # Objects are validated as they would be written, e.g. with the numpy values read by rasterio converted
+            data = stac_io.json_dumps_bytes(stac_object.to_dict(include_self_link=False, transform_hrefs=False))
+            asset_hrefs = None
+            if check_assets and isinstance(stac_object, (pystac.Item, pystac.Collection)):
+                asset_hrefs = {key: asset.get_absolute_href() or asset.href
+                               for key, asset in stac_object.assets.items()}
+            yield stac_object.get_self_href() or stac_object.id, data, asset_hrefs
+
+
+def validate_catalog(catalog: pystac.Catalog, workers=None, check_assets=False, schema_cache_paths=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate the catalog, its collections and items against the STAC core and extension schemas of the schema cache
+    (see SchemaCache) in workers processes (in this process when workers is 1), and check that the local files of the
+    assets exist when check_assets is True. Return a ValidationReport.
+
+    The objects are sent to the workers in chunks of chunk_size, only a few chunks per worker being serialized ahead
+    of the results. A FileNotFoundError is raised when the STAC core schemas are not in the schema cache.
+    """
+    report = ValidationReport()
+    schema_cache = SchemaCache(schema_cache_paths)
+    for spec in CORE_SCHEMA_SPECS.values():
+        # The objects are written with the STAC version of pystac
+        schema_cache.require(CORE_SCHEMA_URI.format(version=pystac.get_stac_version(), spec=spec))
+    tasks = _validation_tasks(catalog, check_assets)
+    workers = workers or os.cpu_count()
+    if workers <= 1:
+        for task in tasks:
+            report.add(*_validate_object(schema_cache, task))
+        return report
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(schema_cache_paths,)) as executor:
+        submitted = deque()
+        for chunk in _chunks(tasks, chunk_size):
+            if len(submitted) >= workers * CHUNKS_PER_WORKER:
+                for result in submitted.popleft().result():
+                    report.add(*result)
+            submitted.append(executor.submit(_validate_in_worker, chunk))
+        for chunk_results in submitted:
+            for result in chunk_results.result():
+                report.add(*result)
+    return report
@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from stac_cat_utils.utils import is_chunked_store, parse_product_name
+
+logger = logging.getLogger('StacCatalogGenerator')
+
+DEFAULT_MAX_PREFETCHED = 4096
+
+
+def _scan(path):
+    with os.scandir(path) as scanned_entries:
+        dir_entries = list(scanned_entries)
+    for dir_entry in dir_entries:
+        # The type of the entries is cached by the entries, without a stat where the file system reports it
+        dir_entry.is_dir()
+    return dir_entries
+
+
+class ConcurrentLister:
+    """
+    List the folders of a tree ahead of a sequential walk with workers threads, for file systems where each listing
+    has a high latency (e.g. NFS, Lustre). The walk keeps its order and only waits for listings already running.
+
+    Every listed folder has its sub folders listed in turn, except the ignored paths and the sub folders of product
+    folders (recognized by their name) and chunked stores, which are not walked. At most max_prefetched listings are
+    kept in advance, the following ones being scheduled when the walk reaches their parent folder. The folders
+    skipped by the walk, and the folders the walk does not enter (e.g. products recognized by their content), must be
+    discarded.
+    """
+
+    def __init__(self, workers, ignore_paths=(), store_paths=None, max_prefetched=DEFAULT_MAX_PREFETCHED):
+        self.ignore_paths = set(ignore_paths)
+        self.store_paths = store_paths
+        self.max_prefetched = max_prefetched
+        self.listed = 0
+        self.started = time.monotonic()
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ConcurrentLister')
+        self.__listings = {}
+        self.__lock = threading.Lock()
+        self.__closed = False
+
+    def __prefetch_sub_folders(self, path, dir_entries, listing_path=None):
+        # Product folders and chunked stores are listed, to be recognized, but their sub folders are not walked
+        if parse_product_name(os.path.basename(path)) is not None or \
+                is_chunked_store(path, [dir_entry.name for dir_entry in dir_entries], self.store_paths)['is_store']:
+            return
+        self.__schedule([dir_entry.path for dir_entry in dir_entries
+                         if dir_entry.is_dir() and dir_entry.path not in self.ignore_paths], listing_path)
+
+    def __list(self, path):
+        dir_entries = _scan(path)
+        with self.__lock:
+            self.listed += 1
+        self.__prefetch_sub_folders(path, dir_entries, listing_path=path)
+        return dir_entries
+
+    def __schedule(self, paths, listing_path=None):
+        with self.__lock:
+            if listing_path is not None and listing_path not in self.__listings:
+                # The listing was discarded, or is already read by the walk which then schedules the sub folders
+                return
+            for path in paths:
+                if self.__closed or len(self.__listings) >= self.max_prefetched:
+                    return
+                if path not in self.__listings:
+                    self.__listings[path] = self.__executor.submit(self.__list, path)
+
+    def prefetch(self, paths):
+        self.__schedule(paths)
+
+    def list(self, path):
+        """Return the entries of a folder (as os.scandir), listed in advance or now."""
+        with self.__lock:
+            listing = self.__listings.pop(path, None)
+        if listing is None:
+            with self.__lock:
+                self.listed += 1
+            dir_entries = _scan(path)
+        else:
+            dir_entries = listing.result()
+        # The sub folders which could not be listed in advance are scheduled once the walk reaches them
+        self.__prefetch_sub_folders(path, dir_entries)
+        return dir_entries
+
+    def discard(self, path):
+        """Cancel the listings in advance of a folder and of the folders under it."""
+        sub_folders_prefix = os.path.join(path, '')
+        with self.__lock:
+            listings = [self.__listings.pop(listed_path) for listed_path in list(self.__listings)
+                        if listed_path == path or listed_path.startswith(sub_folders_prefix)]
+        for listing in listings:
+            listing.cancel()
+
+    @property
+    def prefetched(self):
+        """Number of listings kept in advance of the walk."""
+        with self.__lock:
+            return len(self.__listings)
+
+    @property
+    def rate(self):
+        """Listed folders per second since the lister was created."""
+        elapsed = time.monotonic() - self.started
+        return self.listed / elapsed if elapsed else 0.0
+
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+            listings = list(self.__listings.values())
+            self.__listings.clear()
+        # shutdown(cancel_futures=True) requires Python 3.9
+        for listing in listings:
+            listing.cancel()
+        self.__executor.shutdown(wait=True)
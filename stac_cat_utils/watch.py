@@ -0,0 +1,222 @@
+import logging
+import os
+import time
+
+from stac_cat_utils.stac_generator import CatalogRun, StacCatalogGenerator
+from stac_cat_utils.utils import is_chunked_store, is_product_archive, is_product_folder, parse_product_name, \
+    generate_path_list, path_signature
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    # Without inotify_simple (or on other platforms than Linux), src_path is polled
+    INotify = None
+
+logger = logging.getLogger('StacCatalogGenerator')
+
+DEFAULT_SETTLE_TIME = 10.0
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def delivery_path(src_path, path):
+    """
+    Path of the delivery a changed path belongs to: the product folder or archive containing it (recognized by its
+    name, as its content may be incomplete), or the path itself.
+    """
+    delivery = src_path
+    for name in os.path.relpath(path, src_path).split(os.sep):
+        delivery = os.path.join(delivery, name)
+        if parse_product_name(name) is not None:
+            return delivery
+    return path
+
+
+def _is_complete(path):
+    if parse_product_name(os.path.basename(path)) is None:
+        return True
+    # Products are complete once their metadata file (e.g. manifest.safe or *_MTL.xml) can be read
+    try:
+        if os.path.isdir(path):
+            return is_product_folder(path)['is_product']
+        return is_product_archive(path)['is_product']
+    except Exception:
+        return False
+
+
+class WatchStats:
+    """
+    Counters of a CatalogWatcher: discovered, catalogued and failed deliveries, written STAC objects, and the lag
+    between the first change of a delivery and the end of its cataloguing.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.discovered = 0
+        self.catalogued = 0
+        self.failed = 0
+        self.written = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def add_lag(self, lag):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+
+    @property
+    def mean_lag(self):
+        return self.total_lag / self.catalogued if self.catalogued else None
+
+    @property
+    def throughput(self):
+        """Catalogued deliveries per minute since the watcher was started."""
+        elapsed = time.monotonic() - self.started
+        return 60 * self.catalogued / elapsed if elapsed else 0.0
+
+    def __repr__(self):
+        return (f'<WatchStats discovered={self.discovered} catalogued={self.catalogued} failed={self.failed} '
+                f'throughput={self.throughput:.1f}/min mean_lag={self.mean_lag}>')
+
+
+class CatalogWatcher:
+    """
+    Keep the catalog of src_path saved in catalog_path up to date while deliveries land in src_path.
+
+    The catalog is first created (or updated when catalog_path already holds one, see StacCatalogGenerator.update).
+    The new paths of src_path are then found with inotify (when inotify_simple is installed) or by polling src_path
+    every poll_interval seconds. A delivery is catalogued once complete: when its product metadata file can be read
+    and its files have not changed for settle_time seconds. Only its handler is run and only the new STAC objects and
+    their containers are written (see StacCatalogGenerator.add).
+
+    create_kwargs are the arguments of StacCatalogGenerator.create, save_kwargs (stac_io, compact, compression,
+    json_backend and sqlite_index) are used to write the catalog.
+    """
+
+    def __init__(self, src_path, catalog_path, settle_time=DEFAULT_SETTLE_TIME, poll_interval=DEFAULT_POLL_INTERVAL,
+                 use_inotify=True, save_kwargs=None, **create_kwargs):
+        self.src_path = os.path.normpath(src_path)
+        self.catalog_path = catalog_path
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.save_kwargs = save_kwargs or {}
+        self.create_kwargs = create_kwargs
+        self.generator = StacCatalogGenerator()
+        self.run = None
+        self.stats = WatchStats()
+        self.__known = set()
+        self.__ignored = {os.path.abspath(path) for path in [catalog_path,
+                                                             *generate_path_list(create_kwargs.get('ignore_paths'))]}
+        # Deliveries being written: path -> (signature, first change time, last change time)
+        self.__pending = {}
+        self.__inotify = INotify() if use_inotify and INotify is not None else None
+        self.__watches = {}
+        self.__watched_folders = set()
+        self.__stopped = False
+
+    def start(self):
+        # The deliveries are added to the run of the catalog, whichever thread the watcher runs in
+        self.run = CatalogRun()
+        if os.path.exists(os.path.join(self.catalog_path, 'catalog.json')):
+            self.generator.update(self.catalog_path, self.src_path, **self.save_kwargs, **self.create_kwargs,
+                                  run=self.run)
+        else:
+            self.generator.create_run(self.src_path, run=self.run, **self.create_kwargs)
+            self.generator.save(self.catalog_path, run=self.run, **self.save_kwargs)
+        # Everything already in src_path was catalogued
+        self.__known.update(self.__scan(self.src_path))
+
+    def __is_ignored(self, path):
+        return path in self.__known or os.path.abspath(path) in self.__ignored
+
+    def __watch(self, folder):
+        if self.__inotify is not None and folder not in self.__watched_folders:
+            watch_flags = flags.CREATE | flags.MOVED_TO | flags.CLOSE_WRITE
+            self.__watches[self.__inotify.add_watch(folder, watch_flags)] = folder
+            self.__watched_folders.add(folder)
+
+    def __scan(self, folder):
+        # Deliveries of a folder: product folders and archives, chunked stores and the files of the other folders
+        self.__watch(folder)
+        with os.scandir(folder) as scanned_entries:
+            dir_entries = list(scanned_entries)
+        deliveries = []
+        for dir_entry in dir_entries:
+            if self.__is_ignored(dir_entry.path):
+                continue
+            if not dir_entry.is_dir() or parse_product_name(dir_entry.name) is not None or \
+                    is_chunked_store(dir_entry.path)['is_store']:
+                deliveries.append(dir_entry.path)
+            else:
+                deliveries.extend(self.__scan(dir_entry.path))
+        return deliveries
+
+    def __changed_paths(self):
+        if self.__inotify is None:
+            return self.__scan(self.src_path)
+        paths = []
+        for event in self.__inotify.read(timeout=int(self.poll_interval * 1000)):
+            folder = self.__watches.get(event.wd)
+            if folder is None or not event.name:
+                continue
+            path = delivery_path(self.src_path, os.path.join(folder, event.name))
+            if self.__is_ignored(path):
+                continue
+            if os.path.isdir(path) and parse_product_name(os.path.basename(path)) is None and \
+                    not is_chunked_store(path)['is_store']:
+                # Files may have been written in a new folder before it was watched
+                paths.extend(self.__scan(path))
+            else:
+                paths.append(path)
+        return paths
+
+    def poll(self):
+        """Look for new deliveries and catalogue the complete ones. Return the catalogued paths."""
+        now = time.monotonic()
+        for path in self.__changed_paths():
+            if path not in self.__pending:
+                self.__pending[path] = (None, now, now)
+                self.stats.discovered += 1
+
+        catalogued = []
+        for path, (signature, first_change, last_change) in list(self.__pending.items()):
+            if not os.path.exists(path):
+                # Moved or removed before being complete
+                del self.__pending[path]
+                continue
+            try:
+                # The signature of a delivery stops changing once it is complete
+                current_signature = path_signature(path)
+            except OSError:
+                # A file was moved or removed while the delivery was read
+                continue
+            if current_signature != signature:
+                self.__pending[path] = (current_signature, first_change, now)
+                last_change = now
+            if now - last_change < self.settle_time or not _is_complete(path):
+                continue
+            del self.__pending[path]
+            self.__known.add(path)
+            try:
+                self.stats.written += self.generator.add(path, run=self.run, **self.save_kwargs)
+                self.stats.catalogued += 1
+                self.stats.add_lag(time.monotonic() - first_change)
+                catalogued.append(path)
+                logger.info(f'{path} catalogued {self.stats.last_lag:.1f}s after it was first seen')
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f'{path} could not be catalogued: {e}')
+        return catalogued
+
+    def run(self, duration=None):
+        """Start the watcher and catalogue the new deliveries until stop is called or for duration seconds."""
+        self.start()
+        end = time.monotonic() + duration if duration is not None else None
+        while not self.__stopped and (end is None or time.monotonic() < end):
+            self.poll()
+            if self.__inotify is None:
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        self.__stopped = True
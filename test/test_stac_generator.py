@@ -1,11 +1,37 @@
+import asyncio
 import datetime
+import gc
+import gzip
+import json
 import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import time
+import weakref
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from stac_cat_utils.stac import STACCollection
+import pystac
+
+from stac_cat_utils.stac import STACCatalog, STACCollection, STACItem
 from stac_cat_utils.stac_generator import StacCatalogGenerator
-from stac_cat_utils.utils import collection_to_assets
+from stac_cat_utils.distributed import create_shard, merge, plan, work_units
+from stac_cat_utils.index import CatalogIndex
+from stac_cat_utils.journal import CreateJournal
+from stac_cat_utils.sqlite_index import query_items, write_sqlite_index
+from stac_cat_utils.stac_io import CatalogStacIO
+from stac_cat_utils.summaries import SummaryAggregator
+from stac_cat_utils.validation import CORE_SCHEMA_URI, schema_cache_file, validate_catalog
+from stac_cat_utils.walker import ConcurrentLister
+from stac_cat_utils.watch import CatalogWatcher
+from stac_cat_utils.slc import stac as stac_sentinel1_slc
+from stac_cat_utils.utils import is_datacube_compliant, group_datacube_items, group_sidecar_files, \
+    item_datacube_signature, is_product_archive, parse_product_name, find_duplicate_products, product_footprint_bbox
 
 
 class TestCaseConfig(TestCase):
@@ -105,21 +131,60 @@ class TestStacCatalogGenerator(TestCaseConfig):
         items = list(catalog.get_items())
         self.assertEqual(len(items), 6, 'Product folders should be created as a STAC Item.')
 
+    def test_product_item_adoption(self):
+        item = pystac.Item(id='product', geometry=None, bbox=None, datetime=datetime.datetime.now(), properties={})
+        item.add_asset('data', pystac.Asset(href='data.tif'))
+        adopted_item = STACItem.adopt(item)
+        self.assertIs(adopted_item, item, 'Product items should be adopted without copy.')
+        self.assertIsInstance(adopted_item, STACItem)
+        adopted_item.add_stac_element(pystac.Asset(href='metadata.xml', title='metadata'))
+        self.assertEqual(set(adopted_item.assets), {'data', 'metadata'})
+
     def test_asset_href_prefix(self):
         prefix = 'test_prefix'
+        folder_output = tempfile.mkdtemp()
         catalog = self.stac_generator.create(self.src_path,
                                              collection_paths=[f'{self.src_path}/logs'],
                                              item_paths=[f'{self.src_path}/logs/extra_logs'],
                                              asset_href_prefix=prefix)
-        assets = {}
-        for collection in catalog.get_all_collections():
-            assets = {**assets, **collection_to_assets(collection)}
+        self.stac_generator.save(dest_path=folder_output)
+        hrefs = []
+        for folder, _, file_names in os.walk(folder_output):
+            for file_name in file_names:
+                with open(os.path.join(folder, file_name)) as f:
+                    hrefs.extend(asset['href'] for asset in json.load(f).get('assets', {}).values())
+
+        self.assertTrue(hrefs)
+        for href in hrefs:
+            self.assertTrue(href.startswith(prefix))
 
         for item in catalog.get_all_items():
-            assets = {**assets, **item.assets}
+            for asset in item.assets.values():
+                self.assertFalse(asset.href.startswith(prefix), 'Asset hrefs are only rewritten in the saved files.')
+        shutil.rmtree(folder_output)
 
-        for title, asset in assets.items():
-            self.assertTrue(asset.href.startswith(prefix))
+    def test_save_twice(self):
+        def saved_hrefs(folder_output):
+            hrefs = []
+            for folder, _, file_names in os.walk(folder_output):
+                for file_name in file_names:
+                    with open(os.path.join(folder, file_name)) as f:
+                        hrefs.extend(asset['href'] for asset in json.load(f).get('assets', {}).values())
+            return sorted(hrefs)
+
+        first_output, second_output = tempfile.mkdtemp(), tempfile.mkdtemp()
+        # The hrefs of the files of a relative source folder are relative to the working directory
+        self.stac_generator.create(os.path.relpath(f'{self.src_path}/cube'))
+        self.stac_generator.save(dest_path=first_output, asset_href_prefix='/first/')
+        self.stac_generator.save(dest_path=second_output, asset_href_prefix='/second/')
+        first_hrefs, second_hrefs = saved_hrefs(first_output), saved_hrefs(second_output)
+
+        self.assertIn('/first/test_files/cube/cube_collection/test1.png', first_hrefs)
+        self.assertTrue(all(href.startswith('/first/') for href in first_hrefs))
+        self.assertEqual(second_hrefs, [href.replace('/first/', '/second/', 1) for href in first_hrefs],
+                         'Saving again elsewhere should not rebase the asset hrefs on the previous destination.')
+        shutil.rmtree(first_output)
+        shutil.rmtree(second_output)
 
     def test_save_catalog(self):
         folder_output = 'test_catalog'
@@ -164,6 +229,69 @@ class TestDatacubeGeneration(TestCaseConfig):
         cube_collection = list(catalog.get_collections())[0]
         self.assertNotIn('cube:dimensions', cube_collection.extra_fields)
 
+    def test_split_not_datacube_compliant_collection(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/cube',
+                                             collection_paths=[f'{self.src_path}/cube/not_cube_collection'])
+        collection = list(catalog.get_collections())[0]
+        summarised_fields = set(collection.summaries.to_dict())
+        self.assertTrue(summarised_fields)
+        catalog.make_datacube_compliant(split=True)
+        self.assertNotIn('cube:dimensions', collection.extra_fields)
+        self.assertEqual(len(list(collection.get_items())), 0)
+        self.assertTrue(collection.summaries.is_empty(), 'The moved items are summarised by the child collections.')
+        cube_collections = list(collection.get_collections())
+        self.assertEqual([col.id for col in cube_collections], ['not_cube_collection-cube-1'])
+        self.assertIn('cube:dimensions', cube_collections[0].extra_fields)
+        self.assertEqual(len(list(cube_collections[0].get_items())), 1)
+        self.assertEqual(set(cube_collections[0].summaries.to_dict()), summarised_fields)
+
+    def test_datacube_groups(self):
+        def create_item(item_id, coordinates, platform):
+            return pystac.Item(id=item_id, geometry={'type': 'Polygon', 'coordinates': [coordinates]},
+                               bbox=[0, 0, 1, 1], datetime=datetime.datetime(2023, 1, 1),
+                               properties={'platform': platform})
+
+        ring = [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]
+        rotated_ring = [[1, 1], [0, 1], [0, 0], [1, 0], [1, 1]]
+        items = [create_item('a', ring, 'sentinel-2a'), create_item('b', rotated_ring, 'sentinel-2a'),
+                 create_item('c', ring, 'sentinel-2b')]
+        self.assertEqual(item_datacube_signature(items[0]), item_datacube_signature(items[1]))
+        groups = group_datacube_items(items)
+        self.assertEqual([[item.id for item in group] for group in groups.values()], [['a', 'b'], ['c']])
+
+        collection = STACCollection(id='mixed', description='mixed', extent=pystac.Extent(
+            spatial=pystac.SpatialExtent([0, 0, 1, 1]), temporal=pystac.TemporalExtent([[None, None]])))
+        collection.add_items(items)
+        self.assertFalse(is_datacube_compliant(collection)[0])
+
+    def test_datacube_dimension_values(self):
+        def create_collection(days):
+            collection = STACCollection(id='cube', description='cube', extent=pystac.Extent(
+                spatial=pystac.SpatialExtent([0, 0, 1, 1]), temporal=pystac.TemporalExtent([[None, None]])))
+            for day in days:
+                collection.add_item(pystac.Item(
+                    id=f'item-{day}', geometry=None, bbox=[0, 0, 1, 1],
+                    datetime=datetime.datetime(2023, 1, day, 10, 30, tzinfo=datetime.timezone.utc),
+                    properties={'proj:epsg': 32631, 'proj:transform': [10, 0, 500000, 0, -10, 5000000],
+                                'proj:bbox': [500000, 4900000, 600000, 5000000]}))
+            collection.update_extent_from_items()
+            return collection
+
+        collection = create_collection([5, 1, 3, 3, 7])
+        collection.make_datacube_compliant(values=True)
+        dimensions = collection.extra_fields['cube:dimensions']
+        self.assertEqual(dimensions['time']['values'], ['2023-01-01T10:30:00Z', '2023-01-03T10:30:00Z',
+                                                        '2023-01-05T10:30:00Z', '2023-01-07T10:30:00Z'])
+        self.assertEqual(dimensions['time']['step'], 'P2D')
+        self.assertEqual(dimensions['x']['step'], 10)
+        self.assertEqual(dimensions['y']['step'], -10)
+        self.assertEqual(dimensions['x']['reference_system'], 32631)
+        self.assertEqual(dimensions['y']['extent'], [4900000, 5000000])
+
+        collection = create_collection([1, 2, 4])
+        collection.make_datacube_compliant(values=True)
+        self.assertNotIn('step', collection.extra_fields['cube:dimensions']['time'])
+
     def test_collection_horizontal_dimension(self):
         catalog = self.stac_generator.create(f'{self.src_path}/cube',
                                              collection_paths=[f'{self.src_path}/cube/cube_collection'])
@@ -277,4 +405,1083 @@ class TestDatacubeGeneration(TestCaseConfig):
                         'logs collection should exist')
         self.assertTrue(os.path.exists(f'{folder_output}/logs/extra_logs/extra_logs.json'),
                         'extra_logs item should exist')
-        self.remove_output_folder(folder_output)
\ No newline at end of file
+        self.remove_output_folder(folder_output)
+
+
+class TestProductArchives(TestCaseConfig):
+    slc_name = 'S1B_IW_SLC__1SDV_20210415T173631_20210415T173658_026480_032957_3A85.SAFE'
+    s2_name = 'S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.archive_folder = tempfile.mkdtemp()
+        products_path = os.path.join(cls.src_path, 'products')
+        shutil.make_archive(os.path.join(cls.archive_folder, cls.slc_name), 'zip', products_path, cls.slc_name)
+        with tarfile.open(os.path.join(cls.archive_folder, f'{cls.s2_name}.tar'), 'w') as tar:
+            tar.add(os.path.join(products_path, cls.s2_name), arcname=cls.s2_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.archive_folder)
+
+    def test_product_archives_are_recognized(self):
+        product = is_product_archive(os.path.join(self.archive_folder, f'{self.slc_name}.zip'))
+        self.assertTrue(product['is_product'])
+        self.assertEqual(product['extra_info'], 'SLC')
+        self.assertTrue(product['href'].startswith('/vsizip/'))
+        self.assertTrue(product['href'].endswith(self.slc_name))
+
+        product = is_product_archive(os.path.join(self.archive_folder, f'{self.s2_name}.tar'))
+        self.assertTrue(product['is_product'])
+        self.assertEqual(product['name'], 'S2')
+        self.assertTrue(product['href'].startswith('/vsitar/'))
+
+    def test_product_archives_catalog_creation(self):
+        catalog = self.stac_generator.create(self.archive_folder)
+        self.assertEqual(len(list(catalog.get_all_collections())), 0, 'Archives should not be generic assets.')
+        items = {item.id: item for item in catalog.get_items()}
+        self.assertEqual(len(items), 2, 'Product archives should be created as a STAC Item.')
+
+        expected = {'S1B_IW_SLC': ('/vsizip/', 19), 'S2A_MSIL2A': ('/vsitar/', 3)}
+        for item_id, item in items.items():
+            vsi_prefix, nb_assets = expected[item_id[:10]]
+            self.assertEqual(len(item.assets), nb_assets, 'Assets missing from the archive should be removed.')
+            for asset in item.assets.values():
+                self.assertTrue(asset.href.startswith(vsi_prefix))
+
+
+class TestChunkedStores(TestCaseConfig):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.store_folder = tempfile.mkdtemp()
+        zarr_path = os.path.join(cls.store_folder, 'cube.zarr')
+        metadata = {
+            '.zgroup': {'zarr_format': 2},
+            '.zattrs': {'title': 'Test cube'},
+            'time/.zarray': {'shape': [3], 'chunks': [3], 'dtype': '<i8', 'compressor': None, 'zarr_format': 2},
+            'time/.zattrs': {'_ARRAY_DIMENSIONS': ['time'], 'units': 'days since 2023-01-01', 'calendar': 'standard'},
+            'lat/.zarray': {'shape': [2], 'zarr_format': 2},
+            'lat/.zattrs': {'_ARRAY_DIMENSIONS': ['lat'], 'units': 'degrees_north', 'actual_range': [10, 11]},
+            'lon/.zarray': {'shape': [2], 'chunks': [2], 'dtype': '<f8', 'compressor': {'id': 'zlib', 'level': 1},
+                            'fill_value': 'NaN', 'zarr_format': 2},
+            'lon/.zattrs': {'_ARRAY_DIMENSIONS': ['lon'], 'units': 'degrees_east'},
+            'ndvi/.zarray': {'shape': [3, 2, 2], 'zarr_format': 2},
+            'ndvi/.zattrs': {'_ARRAY_DIMENSIONS': ['time', 'lat', 'lon'], 'long_name': 'NDVI'},
+        }
+        for key, value in metadata.items():
+            os.makedirs(os.path.dirname(os.path.join(zarr_path, key)), exist_ok=True)
+            with open(os.path.join(zarr_path, key), 'w') as f:
+                json.dump(value, f)
+        with open(os.path.join(zarr_path, '.zmetadata'), 'w') as f:
+            json.dump({'zarr_consolidated_format': 1, 'metadata': metadata}, f)
+        for chunk in ['0.0.0', '1.0.0', '2.0.0']:
+            open(os.path.join(zarr_path, 'ndvi', chunk), 'wb').close()
+        # The extents of the time and lon dimensions are read from their coordinates
+        with open(os.path.join(zarr_path, 'time', '0'), 'wb') as f:
+            f.write(struct.pack('<3q', 0, 1, 2))
+        with open(os.path.join(zarr_path, 'lon', '0'), 'wb') as f:
+            f.write(zlib.compress(struct.pack('<2d', 21.5, 20.5)))
+
+        shards_path = os.path.join(cls.store_folder, 'shards.h5d')
+        os.makedirs(shards_path)
+        for shard in range(3):
+            open(os.path.join(shards_path, f'shard_{shard}.h5'), 'wb').close()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.store_folder)
+
+    def test_zarr_store_single_item(self):
+        catalog = self.stac_generator.create(self.store_folder)
+        items = list(catalog.get_items())
+        self.assertEqual(len(items), 1, 'Zarr store should be a single STAC Item.')
+        self.assertEqual(items[0].id, 'cube.zarr')
+        self.assertEqual(list(items[0].assets), ['data'], 'Zarr chunk files should not be assets.')
+
+        dimensions = items[0].properties['cube:dimensions']
+        self.assertEqual(set(dimensions), {'time', 'lat', 'lon'})
+        self.assertEqual(dimensions['time']['type'], 'temporal')
+        self.assertEqual(dimensions['time']['extent'], ['2023-01-01T00:00:00Z', '2023-01-03T00:00:00Z'])
+        self.assertEqual(dimensions['lon']['axis'], 'x')
+        self.assertEqual(dimensions['lon']['extent'], [20.5, 21.5])
+        self.assertEqual(dimensions['lat']['extent'], [10, 11])
+        self.assertEqual(items[0].properties['cube:variables']['ndvi']['dimensions'], ['time', 'lat', 'lon'])
+
+        files_collection = list(catalog.get_collections())[0]
+        self.assertEqual(len(files_collection.assets), 3, 'Only shard files are generic assets.')
+
+    def test_store_paths_arg(self):
+        catalog = self.stac_generator.create(self.store_folder, store_paths=[f'{self.store_folder}/*.h5d'])
+        self.assertEqual(len(list(catalog.get_all_collections())), 0)
+        self.assertEqual({item.id for item in catalog.get_items()}, {'cube.zarr', 'shards.h5d'})
+
+
+class TestSidecarFiles(TestCaseConfig):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.raster_folder = tempfile.mkdtemp()
+        shutil.copy(os.path.join(cls.src_path, 'test.png'), cls.raster_folder)
+        with open(os.path.join(cls.raster_folder, 'test.png.aux.xml'), 'w') as f:
+            f.write('<PAMDataset></PAMDataset>')
+        with open(os.path.join(cls.raster_folder, 'test.pgw'), 'w') as f:
+            f.write('\n'.join(['1.0', '0.0', '0.0', '-1.0', '0.5', '0.5']))
+        with open(os.path.join(cls.raster_folder, 'orphan.ovr'), 'w') as f:
+            f.write('')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.raster_folder)
+
+    def test_sidecars_grouped_with_raster(self):
+        catalog = self.stac_generator.create(self.raster_folder)
+        collection = list(catalog.get_collections())[0]
+        items = list(collection.get_items())
+        self.assertEqual(len(items), 1)
+        self.assertEqual(len(items[0].assets), 3, 'Sidecar files should be assets of the raster item.')
+        roles = {os.path.basename(asset.href): asset.roles for asset in items[0].assets.values()}
+        self.assertEqual(roles['test.png.aux.xml'], ['metadata'])
+        self.assertEqual(roles['test.pgw'], ['metadata'])
+        self.assertEqual(len(collection.assets), 1, 'Sidecar without primary file should be a generic asset.')
+
+    def test_rpc_sidecars(self):
+        groups = group_sidecar_files(['image.tif', 'image_rpc.txt', 'other.tif', 'other.RPB', 'single.tif'])
+        self.assertEqual(groups, {'image.tif': (('image_rpc.txt',), True), 'other.tif': (('other.RPB',), True),
+                                  'single.tif': ((), False)})
+        # GDAL must list the folder to find the sidecar files which are not matched with a primary file
+        groups = group_sidecar_files(['image.tif', 'orphan_rpc.txt'])
+        self.assertEqual(groups, {'image.tif': ((), True), 'orphan_rpc.txt': ((), True)})
+
+
+class TestProductFilters(TestCaseConfig):
+
+    def test_parse_product_name(self):
+        product_info = parse_product_name('S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE')
+        self.assertEqual(product_info['platform'], 'sentinel-2a')
+        self.assertEqual(product_info['baseline'], '0509')
+        self.assertEqual(product_info['start_datetime'].isoformat(), '2023-01-21T07:52:31+00:00')
+        self.assertEqual(parse_product_name('LE07_L2SP_114034_20230330_20230424_02_T1')['platform'], 'landsat-7')
+        self.assertIsNone(parse_product_name('test.png'))
+
+    def test_platforms_filter(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/products', platforms=['sentinel-1'])
+        items = list(catalog.get_items())
+        self.assertEqual(len(items), 4)
+        self.assertTrue(all(item.id.startswith('S1') for item in items))
+
+    def test_datetime_filter(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/products', datetime='2023-01-01/2023-01-31',
+                                             platforms=['sentinel-1', 'sentinel-2'])
+        self.assertEqual({item.id[:10] for item in catalog.get_items()}, {'S1A_WV_SLC', 'S1A_S2_SLC', 'S2A_MSIL2A'})
+
+    def test_bbox_filter(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/products', bbox=[10, 40, 20, 50])
+        items = list(catalog.get_items())
+        self.assertEqual(len(items), 1, 'Only the product with a footprint in the bbox should be created.')
+        self.assertTrue(items[0].id.startswith('S1B_IW_GRDH'))
+
+    def test_unreadable_footprint(self):
+        product_name = 'S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE'
+        product_folder = os.path.join(tempfile.mkdtemp(), product_name)
+        os.mkdir(product_folder)
+        product = {'is_product': True, 'name': 'S2', 'extra_info': 'L2A'}
+        with self.assertLogs('StacCatalogGenerator', level='WARNING'):
+            self.assertIsNone(product_footprint_bbox(product, product_folder), 'The manifest is missing.')
+        with open(os.path.join(self.src_path, 'products', product_name, 'manifest.safe'), 'rb') as f:
+            manifest = f.read()
+        with open(os.path.join(product_folder, 'manifest.safe'), 'wb') as f:
+            f.write(manifest[:len(manifest) // 2])
+        with self.assertLogs('StacCatalogGenerator', level='WARNING'):
+            self.assertIsNone(product_footprint_bbox(product, product_folder), 'The manifest is truncated.')
+        shutil.rmtree(os.path.dirname(product_folder))
+
+    def test_filters_do_not_apply_to_generic_files(self):
+        catalog = self.stac_generator.create(self.src_path, ignore_paths=self.ignore_paths,
+                                             datetime='2000-01-01', platforms=['landsat-9'])
+        collections = list(catalog.get_all_collections())
+        self.assertEqual(len(collections[0].get_assets()), 7)
+
+
+class TestDuplicateProducts(TestCaseConfig):
+    s2_name = 'S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE'
+    s2_reprocessed_name = 'S2A_MSIL2A_20230121T075231_N0510_R135_T37QED_20230301T100000.SAFE'
+    s1_name = 'S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B.SAFE'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.archive_folder = tempfile.mkdtemp()
+        products_path = os.path.join(cls.src_path, 'products')
+        shutil.copytree(os.path.join(products_path, cls.s2_name), os.path.join(cls.archive_folder, cls.s2_name))
+        shutil.copytree(os.path.join(products_path, cls.s2_name),
+                        os.path.join(cls.archive_folder, 'reprocessed', cls.s2_reprocessed_name))
+        for copy_folder in ['copy_a', 'copy_b']:
+            shutil.copytree(os.path.join(products_path, cls.s1_name),
+                            os.path.join(cls.archive_folder, copy_folder, cls.s1_name))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.archive_folder)
+
+    def test_find_duplicate_products(self):
+        duplicates = find_duplicate_products(self.archive_folder)
+        self.assertEqual(duplicates, {os.path.join(self.archive_folder, self.s2_name),
+                                      os.path.join(self.archive_folder, 'copy_b', self.s1_name)})
+
+        duplicates = find_duplicate_products(self.archive_folder, policy='first',
+                                             preferred_paths=[os.path.join(self.archive_folder, 'copy_b')])
+        self.assertEqual(duplicates, {os.path.join(self.archive_folder, 'reprocessed', self.s2_reprocessed_name),
+                                      os.path.join(self.archive_folder, 'copy_a', self.s1_name)})
+
+    def test_deduplicate_arg(self):
+        catalog = self.stac_generator.create(self.archive_folder)
+        self.assertEqual(len(list(catalog.get_all_items())), 4)
+
+        catalog = self.stac_generator.create(self.archive_folder, deduplicate=True)
+        items = list(catalog.get_all_items())
+        self.assertEqual(len(items), 2, 'Only one product per scene should be created.')
+        s2_item = [item for item in items if item.id.startswith('S2A')][0]
+        self.assertTrue(all(self.s2_reprocessed_name in asset.href for asset in s2_item.assets.values()))
+
+
+class TestCatalogSerialization(TestCaseConfig):
+
+    def setUp(self) -> None:
+        self.folder_output = tempfile.mkdtemp()
+        self.stac_generator.create(self.src_path, collection_paths=[f'{self.src_path}/logs'],
+                                   ignore_paths=self.ignore_paths)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder_output)
+
+    def test_compact_save(self):
+        for json_backend in ['json', 'orjson']:
+            self.stac_generator.save(dest_path=self.folder_output, compact=True, json_backend=json_backend)
+            with open(f'{self.folder_output}/catalog.json') as f:
+                content = f.read()
+            self.assertNotIn('\n', content, 'Compact catalog should not be indented.')
+            self.assertEqual(json.loads(content)['type'], 'Catalog')
+
+    def test_compressed_save(self):
+        self.stac_generator.save(dest_path=self.folder_output, compression='gzip')
+        self.assertFalse(os.path.exists(f'{self.folder_output}/catalog.json'))
+        with gzip.open(f'{self.folder_output}/files/collection.json.gz') as f:
+            self.assertEqual(json.load(f)['id'], 'files')
+
+        catalog = pystac.Catalog.from_file(f'{self.folder_output}/catalog.json',
+                                           stac_io=CatalogStacIO(compression='gzip'))
+        self.assertEqual({collection.id for collection in catalog.get_collections()}, {'files', 'logs'})
+        self.assertEqual(len(list(catalog.get_all_items())), 1)
+
+    @staticmethod
+    def file_stats(path):
+        return {os.path.join(folder, file_name): (os.stat(os.path.join(folder, file_name)).st_mtime_ns,
+                                                  os.stat(os.path.join(folder, file_name)).st_ino)
+                for folder, _, file_names in os.walk(path) for file_name in file_names}
+
+    def test_only_changed_save(self):
+        for compression in [None, 'gzip']:
+            dest_path = os.path.join(self.folder_output, str(compression))
+            stac_io = CatalogStacIO(compression=compression)
+            self.stac_generator.save(dest_path=dest_path, stac_io=stac_io, only_changed=True)
+            saved_files = self.file_stats(dest_path)
+            self.assertEqual((stac_io.written, stac_io.skipped), (len(saved_files), 0))
+
+            stac_io = CatalogStacIO(compression=compression, only_changed=True)
+            self.stac_generator.save(dest_path=dest_path, stac_io=stac_io)
+            self.assertEqual((stac_io.written, stac_io.skipped), (0, len(saved_files)))
+            self.assertEqual(self.file_stats(dest_path), saved_files, 'Unchanged files should not be written')
+
+    def test_only_changed_save_with_manifest(self):
+        manifest_path = os.path.join(self.folder_output, 'manifest.json')
+        stac_io = CatalogStacIO(only_changed=True, manifest_path=manifest_path)
+        self.stac_generator.save(dest_path=self.folder_output, stac_io=stac_io)
+        with open(manifest_path) as f:
+            self.assertIn('catalog.json', json.load(f))
+
+        catalog_path = os.path.join(self.folder_output, 'catalog.json')
+        os.remove(catalog_path)
+        stac_io = CatalogStacIO(only_changed=True, manifest_path=manifest_path)
+        self.stac_generator.save(dest_path=self.folder_output, stac_io=stac_io)
+        self.assertEqual(stac_io.written, 1, 'Files missing on disk should be written again')
+        self.assertTrue(os.path.exists(catalog_path))
+
+    def test_files_replaced(self):
+        stac_io = CatalogStacIO(compression='gzip')
+        path = os.path.join(self.folder_output, 'catalog.json')
+        stac_io.write_bytes_to_href(path, b'{"id": "first"}')
+        linked_path = os.path.join(self.folder_output, 'linked.json.gz')
+        os.link(f'{path}.gz', linked_path)
+        stac_io.write_bytes_to_href(path, b'{"id": "second"}')
+        self.assertEqual(stac_io.read_text_from_href(path), '{"id": "second"}')
+        with gzip.open(linked_path) as f:
+            self.assertEqual(f.read(), b'{"id": "first"}', 'The files linked to a written file are left unchanged')
+        self.assertEqual(sorted(os.listdir(self.folder_output)), ['catalog.json.gz', 'linked.json.gz'])
+
+    def test_snapshot_save(self):
+        self.stac_generator.save(dest_path=self.folder_output, json_backend='json', snapshot='v1')
+        self.stac_generator.save(dest_path=self.folder_output, json_backend='json', snapshot='v2')
+        self.assertEqual(os.readlink(os.path.join(self.folder_output, 'current')), 'v2')
+        v1_stats = self.file_stats(os.path.join(self.folder_output, 'v1'))
+        for path, (_, inode) in self.file_stats(os.path.join(self.folder_output, 'v2')).items():
+            self.assertEqual(inode, v1_stats[path.replace(f'{os.sep}v2{os.sep}', f'{os.sep}v1{os.sep}')][1],
+                             'Unchanged files should be linked to the previous snapshot')
+
+        # Changed files are written without altering the previous snapshots
+        self.stac_generator.save(dest_path=self.folder_output, json_backend='json', compact=True, snapshot='v3')
+        self.assertEqual(os.readlink(os.path.join(self.folder_output, 'current')), 'v3')
+        with open(os.path.join(self.folder_output, 'v2', 'catalog.json')) as f:
+            self.assertIn('\n', f.read())
+        with open(os.path.join(self.folder_output, 'current', 'catalog.json')) as f:
+            self.assertNotIn('\n', f.read())
+
+        self.stac_generator.save(dest_path=self.folder_output, json_backend='json', snapshot=True)
+        self.stac_generator.save(dest_path=self.folder_output, json_backend='json', snapshot=True)
+        self.assertEqual(len(os.listdir(self.folder_output)), 6, 'Each timestamped snapshot has its own folder')
+
+
+class TestLeanItems(TestCaseConfig):
+    slc_name = 'S1B_IW_SLC__1SDV_20210415T173631_20210415T173658_026480_032957_3A85.SAFE'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.archive_folder = tempfile.mkdtemp()
+        cls.collection_path = os.path.join(cls.archive_folder, 'slc')
+        for unique_id in ['3A85', '3A86']:
+            shutil.copytree(os.path.join(cls.src_path, 'products', cls.slc_name),
+                            os.path.join(cls.collection_path, cls.slc_name.replace('3A85', unique_id)))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.archive_folder)
+
+    def test_lean_items(self):
+        catalog = self.stac_generator.create(self.archive_folder, collection_paths=[self.collection_path],
+                                             lean_items=True)
+        collection = list(catalog.get_collections())[0]
+        item_assets = collection.extra_fields['item_assets']
+        self.assertIn('safe-manifest', item_assets)
+        self.assertIn('General product metadata', item_assets['safe-manifest']['description'])
+        self.assertEqual(item_assets['safe-manifest']['roles'], ['metadata'])
+
+        for item in collection.get_items():
+            manifest_asset = item.assets['safe-manifest'].to_dict()
+            self.assertNotIn('description', manifest_asset)
+            self.assertNotIn('roles', manifest_asset)
+            self.assertEqual(manifest_asset['title'], 'Manifest File')
+
+    def test_lean_items_datacube(self):
+        def create_collection(collection_id, item_ids):
+            collection = STACCollection(id=collection_id, description=collection_id, extent=pystac.Extent(
+                spatial=pystac.SpatialExtent([[0, 0, 1, 1]]), temporal=pystac.TemporalExtent([[None, None]])))
+            for item_id in item_ids:
+                item = pystac.Item(id=item_id, geometry={'type': 'Point', 'coordinates': [0, 0]},
+                                   bbox=[0, 0, 1, 1], datetime=datetime.datetime(2023, 1, 1), properties={})
+                item.add_asset('image', pystac.Asset(href=f'{item_id}.png', media_type=pystac.MediaType.PNG,
+                                                     roles=['data'], extra_fields={'eo:bands': [{'name': 'red'}]}))
+                collection.add_item(item)
+            collection.make_items_lean()
+            return collection
+
+        collection = create_collection('lean', ['a', 'b'])
+        for item in collection.get_items():
+            self.assertNotIn('type', item.assets['image'].to_dict())
+        collection.make_datacube_compliant()
+        self.assertEqual(collection.extra_fields['cube:dimensions']['spectral']['values'], ['red'])
+
+        collection = create_collection('lean-split', ['a', 'b'])
+        collection.add_asset('readme', pystac.Asset(href='readme.txt', media_type=pystac.MediaType.TEXT))
+        collection.make_datacube_compliant(split=True)
+        cube_collection = list(collection.get_collections())[0]
+        self.assertEqual(cube_collection.extra_fields['item_assets']['image']['type'], pystac.MediaType.PNG)
+        self.assertEqual(cube_collection.extra_fields['cube:dimensions']['spectral']['values'], ['red'])
+
+    def test_items_are_not_lean_by_default(self):
+        catalog = self.stac_generator.create(self.archive_folder, collection_paths=[self.collection_path])
+        collection = list(catalog.get_collections())[0]
+        self.assertNotIn('item_assets', collection.extra_fields)
+        for item in collection.get_items():
+            self.assertIn('description', item.assets['safe-manifest'].to_dict())
+
+
+class TestCollectionSummaries(TestCaseConfig):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.products_path = f'{cls.src_path}/products'
+        cls.product_ignore_paths = [f'{cls.products_path}/LE07_L2SP_114034_20230330_20230424_02_T1']
+
+    def test_summaries_from_items(self):
+        catalog = self.stac_generator.create(self.src_path, collection_paths=[self.products_path],
+                                             ignore_paths=self.product_ignore_paths)
+        collection = next(col for col in catalog.get_collections() if col.id == 'products')
+        summaries = collection.summaries.to_dict()
+        self.assertCountEqual(summaries['sar:instrument_mode'], ['IW', 'WV', 'SM'])
+        self.assertCountEqual(summaries['sar:polarizations'], ['VV', 'VH', 'HH', 'HV'])
+        self.assertCountEqual(summaries['constellation'], ['sentinel-1', 'sentinel-2'])
+        self.assertIn('minimum', summaries['eo:cloud_cover'])
+        self.assertIn('blue', [band['name'] for band in summaries['eo:bands']])
+        self.assertEqual(collection.summary_aggregator.count, len(list(collection.get_items())))
+
+    def test_summaries_disabled(self):
+        catalog = self.stac_generator.create(self.src_path, collection_paths=[self.products_path],
+                                             ignore_paths=self.product_ignore_paths, summaries=False)
+        collection = next(col for col in catalog.get_collections() if col.id == 'products')
+        self.assertTrue(collection.summaries.is_empty())
+        self.assertEqual(collection.summary_aggregator.count, 0, 'The items are not aggregated')
+
+    def test_distinct_values_cap(self):
+        aggregator = SummaryAggregator(max_distinct=2)
+        for index in range(3):
+            aggregator.add_item(pystac.Item(id=f'item-{index}', geometry=None, bbox=None,
+                                            datetime=datetime.datetime(2023, 1, 1),
+                                            properties={'platform': 'sentinel-2a', 'tile': f'T{index}',
+                                                        'gsd': 10 * (index + 1)}))
+        summaries = aggregator.summaries().to_dict()
+        self.assertEqual(summaries['platform'], ['sentinel-2a'])
+        self.assertNotIn('tile', summaries)
+        self.assertEqual(summaries['gsd'], {'minimum': 10, 'maximum': 30})
+        self.assertEqual(aggregator.count, 3)
+
+    def test_slc_collection_summaries_from_items(self):
+        slc_path = f'{self.products_path}/S1A_WV_SLC__1SSV_20230101T005908_20230101T011828_046583_059526_E245.SAFE'
+        item = stac_sentinel1_slc.create_item(slc_path)
+        collection = stac_sentinel1_slc.create_collection('collection.json', items=[item])
+        summaries = collection.summaries.to_dict()
+        self.assertEqual(summaries['sar:instrument_mode'], ['WV'])
+        self.assertEqual(summaries['platform'], [item.properties['platform']])
+
+
+class TestCatalogIndex(TestCaseConfig):
+    s2_id = 'S2A_MSIL2A_20230121T075231_R135_T37QED_20230121T110753'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.output_folder = tempfile.mkdtemp()
+        cls.catalog = cls.stac_generator.create(
+            f'{cls.src_path}/products',
+            ignore_paths=[f'{cls.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1']
+        )
+        cls.stac_generator.save(os.path.join(cls.output_folder, 'catalog'), json_backend='json')
+        cls.index = cls.catalog.build_index()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.output_folder)
+
+    def test_query(self):
+        self.assertEqual(len(self.index), len(list(self.catalog.get_all_items())))
+        self.assertEqual([i.id for i in self.index.query(platform='sentinel-2a')], [self.s2_id])
+        self.assertEqual([i.id for i in self.index.query(bbox=[38, 20, 41, 22])], [self.s2_id])
+        self.assertEqual(self.index.query(bbox=[0, 0, 1, 1]), [])
+        self.assertEqual(len(self.index.query(datetime='2023-01-01/2023-01-02', constellation='sentinel-1')), 2)
+        self.assertEqual(len(self.index.query(platform=['SENTINEL-1A', 'SENTINEL-1B'])), 4)
+        self.assertIs(self.index.query(platform='sentinel-2a')[0].item.__class__, STACItem)
+
+    def test_unknown_property(self):
+        with self.assertRaises(ValueError):
+            self.index.query(gsd=10)
+
+    def test_save_and_load(self):
+        index_path = os.path.join(self.output_folder, 'catalog', 'index')
+        self.index.save(index_path)
+        index = CatalogIndex.load(index_path)
+        matches = index.query(bbox=[38, 20, 41, 22], datetime='2023-01-21', platform='sentinel-2a')
+        self.assertEqual([i.id for i in matches], [self.s2_id])
+        self.assertTrue(os.path.exists(matches[0].href))
+        self.assertEqual(matches[0].item.id, self.s2_id)
+
+
+class TestSqliteIndex(TestCaseConfig):
+    s2_name = 'S2A_MSIL2A_20230121T075231_R135_T37QED_20230121T110753'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.output_folder = tempfile.mkdtemp()
+        cls.catalog_path = os.path.join(cls.output_folder, 'catalog')
+        cls.index_path = os.path.join(cls.catalog_path, 'index.sqlite')
+        cls.product_ignore_paths = [f'{cls.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1']
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.output_folder)
+
+    def test_query_and_incremental_update(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/products', ignore_paths=self.product_ignore_paths)
+        self.stac_generator.save(self.catalog_path, json_backend='json', sqlite_index=True)
+        self.assertTrue(os.path.exists(self.index_path))
+
+        s2_href = os.path.join(self.catalog_path, self.s2_name, f'{self.s2_name}.json')
+        self.assertEqual(query_items(self.index_path, bbox=[38, 20, 41, 22]), [s2_href])
+        self.assertEqual(query_items(self.index_path, bbox=[0, 0, 1, 1]), [])
+        self.assertEqual(len(query_items(self.index_path, datetime='2023-01-01', platforms='SENTINEL-1A')), 2)
+        self.assertEqual(len(query_items(self.index_path)), len(list(catalog.get_all_items())))
+        self.assertEqual(write_sqlite_index(catalog, self.index_path), (0, 0, 0))
+
+        self.stac_generator.create(f'{self.src_path}/products',
+                                   ignore_paths=[*self.product_ignore_paths, f'{self.src_path}/products/S2A_*'])
+        self.stac_generator.save(self.catalog_path, json_backend='json', sqlite_index=True)
+        self.assertEqual(query_items(self.index_path, bbox=[38, 20, 41, 22]), [])
+        self.assertEqual(len(query_items(self.index_path)), len(list(catalog.get_all_items())) - 1)
+
+
+class TestLoadFast(TestCaseConfig):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.output_folder = tempfile.mkdtemp()
+        cls.catalog_path = os.path.join(cls.output_folder, 'catalog')
+        cls.stac_generator.create(f'{cls.src_path}/products',
+                                  ignore_paths=[f'{cls.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1'])
+        cls.stac_generator.save(cls.catalog_path, json_backend='json', sqlite_index=True)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.output_folder)
+
+    def test_load_fast(self):
+        expected_catalog = pystac.Catalog.from_file(os.path.join(self.catalog_path, 'catalog.json'))
+        def item_fields(item):
+            return {key: value for key, value in item.to_dict().items() if key != 'links'}
+
+        expected_items = {item.id: item_fields(item) for item in expected_catalog.get_all_items()}
+
+        catalog = STACCatalog.load_fast(self.catalog_path, workers=4)
+        self.assertIsInstance(catalog, STACCatalog)
+        items = list(catalog.get_all_items())
+        self.assertEqual({item.id: item_fields(item) for item in items}, expected_items)
+        for item in items:
+            self.assertIsInstance(item, STACItem)
+            self.assertIs(item.get_root(), catalog)
+            self.assertIsInstance(item.get_parent(), (STACCatalog, STACCollection))
+            self.assertTrue(all(link.is_resolved() for link in item.links if link.rel in ('root', 'parent')))
+
+    def test_load_fast_fields(self):
+        catalog = STACCatalog.load_fast(os.path.join(self.catalog_path, 'catalog.json'),
+                                        fields=['properties.platform'])
+        for item in catalog.get_all_items():
+            self.assertEqual(item.assets, {})
+            self.assertLessEqual(set(item.properties), {'platform', 'datetime', 'start_datetime', 'end_datetime'})
+
+    def test_load_fast_listing(self):
+        listing = [os.path.relpath(os.path.join(folder, file_name), self.catalog_path)
+                   for folder, _, file_names in os.walk(self.catalog_path) for file_name in file_names
+                   if file_name == 'collection.json' or 'S2A' in file_name]
+        catalog = STACCatalog.load_fast(self.catalog_path, listing=listing)
+        # Items missing from the listing are left to the lazy link resolution of pystac
+        item_links = [link for container in [catalog, *catalog.get_collections()]
+                      for link in container.get_links('item')]
+        self.assertEqual(len([link for link in item_links if link.is_resolved()]), 1)
+        self.assertEqual(len(list(catalog.get_all_items())), len(item_links))
+
+
+class TestCatalogUpdate(TestCaseConfig):
+    grd_name = 'S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B'
+    wv_name = 'S1A_WV_SLC__1SSV_20230101T005908_20230101T011828_046583_059526_E245'
+
+    def setUp(self) -> None:
+        self.archive_folder = tempfile.mkdtemp()
+        self.collection_path = os.path.join(self.archive_folder, 'products')
+        self.catalog_path = os.path.join(self.archive_folder, 'catalog')
+        shutil.copytree(os.path.join(self.src_path, 'products', f'{self.grd_name}.SAFE'),
+                        os.path.join(self.collection_path, f'{self.grd_name}.SAFE'))
+        os.makedirs(os.path.join(self.archive_folder, 'data', 'images'))
+        shutil.copy(os.path.join(self.src_path, 'test.png'), os.path.join(self.archive_folder, 'data', 'images'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.archive_folder)
+
+    def modification_times(self):
+        return {os.path.relpath(os.path.join(folder, file_name), self.catalog_path):
+                os.stat(os.path.join(folder, file_name)).st_mtime_ns
+                for folder, _, file_names in os.walk(self.catalog_path) for file_name in file_names}
+
+    def test_update(self):
+        self.stac_generator.create(self.archive_folder, collection_paths=[self.collection_path],
+                                   ignore_paths=[self.catalog_path])
+        self.stac_generator.save(self.catalog_path, json_backend='json')
+        saved_files = self.modification_times()
+
+        self.stac_generator.update(self.catalog_path, self.archive_folder, collection_paths=[self.collection_path],
+                                   ignore_paths=[self.catalog_path], json_backend='json')
+        self.assertEqual(self.modification_times(), saved_files, 'An unchanged catalog should not be written')
+
+        shutil.copytree(os.path.join(self.src_path, 'products', f'{self.wv_name}.SAFE'),
+                        os.path.join(self.collection_path, f'{self.wv_name}.SAFE'))
+        os.rename(os.path.join(self.archive_folder, 'data', 'images', 'test.png'),
+                  os.path.join(self.archive_folder, 'data', 'images', 'renamed.png'))
+        catalog = self.stac_generator.update(self.catalog_path, self.archive_folder,
+                                             collection_paths=[self.collection_path],
+                                             ignore_paths=[self.catalog_path], json_backend='json')
+        updated_files = self.modification_times()
+        changed_files = {path for path in updated_files if updated_files[path] != saved_files.get(path)}
+        self.assertEqual(changed_files, {
+            'catalog.json', 'products/collection.json', f'products/{self.wv_name}/{self.wv_name}.json',
+            'files/collection.json', 'files/renamed.png/renamed.png.json'
+        })
+        self.assertEqual(set(saved_files) - set(updated_files), {'files/test.png/test.png.json'})
+        self.assertIn(f'products/{self.grd_name}/{self.grd_name}.json', updated_files)
+
+        saved_catalog = pystac.Catalog.from_file(os.path.join(self.catalog_path, 'catalog.json'))
+        self.assertEqual(sorted(item.id for item in saved_catalog.get_all_items()),
+                         sorted(item.id for item in catalog.get_all_items()))
+
+    def test_update_collection_assets(self):
+        data_path = os.path.join(self.archive_folder, 'data')
+        shutil.copy(os.path.join(self.src_path, 'test.txt'), data_path)
+        self.stac_generator.create(self.archive_folder, collection_paths=[self.collection_path],
+                                   ignore_paths=[self.catalog_path])
+        self.stac_generator.save(self.catalog_path)
+        saved_files = self.modification_times()
+
+        shutil.copy(os.path.join(self.src_path, 'test.csv'), data_path)
+        os.remove(os.path.join(data_path, 'test.txt'))
+        self.stac_generator.update(self.catalog_path, self.archive_folder, collection_paths=[self.collection_path],
+                                   ignore_paths=[self.catalog_path])
+        updated_files = self.modification_times()
+        self.assertEqual({path for path in updated_files if updated_files[path] != saved_files.get(path)},
+                         {'catalog.json', 'files/collection.json'})
+
+        saved_collection = pystac.Collection.from_file(os.path.join(self.catalog_path, 'files', 'collection.json'))
+        self.assertEqual([os.path.basename(asset.href) for asset in saved_collection.assets.values()], ['test.csv'])
+
+
+class TestCatalogValidation(TestCaseConfig):
+
+    def setUp(self) -> None:
+        self.schema_cache = tempfile.mkdtemp()
+        self.catalog = self.stac_generator.create(self.src_path, collection_paths=[f'{self.src_path}/logs'],
+                                                  ignore_paths=self.ignore_paths)
+        self.write_schema(CORE_SCHEMA_URI.format(version='1.0.0', spec='item'), {
+            'type': 'object',
+            'required': ['id', 'properties'],
+            'properties': {'properties': {'properties': {'gsd': {'$ref': 'basics.json#/definitions/number'}}}}
+        })
+        self.write_schema(CORE_SCHEMA_URI.format(version='1.0.0', spec='item').replace('item.json', 'basics.json'),
+                          {'definitions': {'number': {'type': 'number'}}})
+        for spec in ['catalog', 'collection']:
+            self.write_schema(CORE_SCHEMA_URI.format(version='1.0.0', spec=spec),
+                              {'type': 'object', 'required': ['id', 'description']})
+        for stac_object in [self.catalog, *self.catalog.get_all_collections(), *self.catalog.get_all_items()]:
+            for uri in stac_object.stac_extensions:
+                self.write_schema(uri, {'type': 'object'})
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.schema_cache)
+
+    def write_schema(self, uri, schema):
+        path = schema_cache_file(uri, self.schema_cache)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(schema, f)
+
+    def test_validate_all(self):
+        report = self.catalog.validate_all(workers=1, check_assets=True, schema_cache_paths=[self.schema_cache])
+        self.assertTrue(report.valid, report.errors)
+        self.assertEqual(report.checked, 4)
+
+    def test_validation_errors(self):
+        item = next(self.catalog.get_all_items())
+        item.properties['gsd'] = 'unknown'
+        item.stac_extensions.append('https://stac-extensions.github.io/unknown/v1.0.0/schema.json')
+        item.add_asset('missing', pystac.Asset(href=os.path.abspath(f'{self.src_path}/missing.png')))
+
+        for workers in [1, 2]:
+            report = self.catalog.validate_all(workers=workers, check_assets=True,
+                                               schema_cache_paths=[self.schema_cache])
+            self.assertFalse(report.valid)
+            self.assertEqual(report.checked, 4)
+            self.assertEqual(list(report.errors), [item.id])
+            self.assertEqual({(uri, path) for uri, path, _ in report.errors[item.id]}, {
+                (CORE_SCHEMA_URI.format(version='1.0.0', spec='item'), '$.properties.gsd'),
+                ('https://stac-extensions.github.io/unknown/v1.0.0/schema.json', '$')
+            })
+            self.assertEqual(report.missing_assets, {item.id: ['missing']})
+            self.assertEqual(sum(report.error_counts.values()), 2)
+
+
+class TestBundledSchemas(TestCaseConfig):
+    landsat_name = 'LE07_L2SP_114034_20230330_20230424_02_T1'
+    s2_name = 'S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE'
+
+    def setUp(self) -> None:
+        self.output_folder = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_folder)
+
+    def test_products_and_datacube(self):
+        # The Sentinel-2 items use the mgrs, grid and view extensions, which are not bundled
+        catalog = self.stac_generator.create(self.src_path, collection_paths=[f'{self.src_path}/cube/cube_collection'],
+                                             ignore_paths=[f'{self.src_path}/products/{self.landsat_name}',
+                                                           f'{self.src_path}/products/{self.s2_name}'])
+        catalog.make_datacube_compliant(values=True)
+        catalog.normalize_hrefs(self.output_folder)
+        report = catalog.validate_all(workers=1)
+        self.assertTrue(report.valid, report.errors)
+        self.assertEqual(report.checked, len(list(catalog.get_all_items())) + len(list(catalog.get_children())) + 1)
+
+        item = catalog.get_item('S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B', recursive=True)
+        item.properties['sar:polarizations'] = ['XX']
+        report = catalog.validate_all(workers=2)
+        self.assertEqual(list(report.errors), [item.get_self_href()])
+        self.assertIn('https://stac-extensions.github.io/sar/v1.0.0/schema.json',
+                      {uri for uri, _, _ in report.errors[item.get_self_href()]})
+
+    def test_collection_without_items(self):
+        catalog = self.stac_generator.create(f'{self.src_path}/logs')
+        catalog.normalize_hrefs(self.output_folder)
+        report = catalog.validate_all(workers=1)
+        self.assertTrue(report.valid, report.errors)
+
+    def test_missing_core_schema(self):
+        catalog = self.stac_generator.create(self.src_path, ignore_paths=self.ignore_paths)
+        with mock.patch('stac_cat_utils.validation.DEFAULT_SCHEMA_CACHE', self.output_folder):
+            with self.assertRaises(FileNotFoundError):
+                validate_catalog(catalog, workers=1)
+
+
+class TestCatalogWatch(TestCaseConfig):
+    grd_name = 'S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B'
+
+    def setUp(self) -> None:
+        self.src_folder = tempfile.mkdtemp()
+        self.catalog_path = tempfile.mkdtemp()
+        shutil.copy(os.path.join(self.src_path, 'test.png'), os.path.join(self.src_folder, 'test.png'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.src_folder)
+        shutil.rmtree(self.catalog_path)
+
+    def deliver_product(self, with_manifest=True):
+        product_path = os.path.join(self.src_folder, 'inbox', f'{self.grd_name}.SAFE')
+        shutil.copytree(os.path.join(self.src_path, 'products', f'{self.grd_name}.SAFE'), product_path,
+                        ignore=None if with_manifest else shutil.ignore_patterns('manifest.safe'))
+        return product_path
+
+    def test_watch(self):
+        watcher = CatalogWatcher(self.src_folder, self.catalog_path, settle_time=0, use_inotify=False,
+                                 save_kwargs={'json_backend': 'json'})
+        watcher.start()
+        self.assertTrue(os.path.exists(os.path.join(self.catalog_path, 'files', 'test.png', 'test.png.json')))
+        self.assertEqual(watcher.poll(), [])
+
+        product_path = self.deliver_product(with_manifest=False)
+        self.assertEqual(watcher.poll(), [], 'A product without its manifest is not complete')
+        shutil.copy(os.path.join(self.src_path, 'products', f'{self.grd_name}.SAFE', 'manifest.safe'), product_path)
+        self.assertEqual(watcher.poll(), [product_path])
+        self.assertTrue(os.path.exists(os.path.join(self.catalog_path, self.grd_name, f'{self.grd_name}.json')))
+
+        shutil.copy(os.path.join(self.src_path, 'test.log'), os.path.join(self.src_folder, 'inbox', 'test.log'))
+        self.assertEqual(watcher.poll(), [os.path.join(self.src_folder, 'inbox', 'test.log')])
+        self.assertEqual(watcher.poll(), [])
+
+        catalog = pystac.Catalog.from_file(os.path.join(self.catalog_path, 'catalog.json'))
+        self.assertEqual(sorted(item.id for item in catalog.get_all_items()), sorted([self.grd_name, 'test.png']))
+        generic_assets = catalog.get_child('files').assets.values()
+        self.assertTrue(any(asset.href.endswith('inbox/test.log') for asset in generic_assets))
+        self.assertEqual((watcher.stats.discovered, watcher.stats.catalogued, watcher.stats.failed), (2, 2, 0))
+        self.assertIsNotNone(watcher.stats.mean_lag)
+
+    def test_watch_settle_time(self):
+        watcher = CatalogWatcher(self.src_folder, self.catalog_path, settle_time=60, use_inotify=False,
+                                 save_kwargs={'json_backend': 'json'})
+        watcher.start()
+        self.deliver_product()
+        self.assertEqual(watcher.poll(), [], 'A product is only catalogued once its files stopped changing')
+        self.assertEqual(watcher.stats.discovered, 1)
+
+
+class TestDistributedGeneration(TestCaseConfig):
+    product_names = ['S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B',
+                     'S1B_IW_SLC__1SDV_20210415T173631_20210415T173658_026480_032957_3A85']
+
+    def setUp(self) -> None:
+        self.src_folder = tempfile.mkdtemp()
+        self.output_folder = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(self.src_path, 'logs'), os.path.join(self.src_folder, 'logs'))
+        shutil.copy(os.path.join(self.src_path, 'test.png'), os.path.join(self.src_folder, 'test.png'))
+        for product_name in self.product_names:
+            shutil.copytree(os.path.join(self.src_path, 'products', f'{product_name}.SAFE'),
+                            os.path.join(self.src_folder, 'sentinel-1', f'{product_name}.SAFE'))
+        self.create_kwargs = {
+            'collection_paths': [os.path.join(self.src_folder, 'sentinel-1'), os.path.join(self.src_folder, 'logs')],
+            'item_paths': [os.path.join(self.src_folder, 'logs', 'extra_logs')],
+        }
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.src_folder)
+        shutil.rmtree(self.output_folder)
+
+    def test_plan(self):
+        units = [path for path, _, _ in work_units(self.src_folder, item_paths=self.create_kwargs['item_paths'])]
+        self.assertIn(os.path.join(self.src_folder, 'logs', 'extra_logs'), units)
+        self.assertIn(os.path.join(self.src_folder, 'sentinel-1', f'{self.product_names[0]}.SAFE'), units)
+        shards = plan(self.src_folder, 3, item_paths=self.create_kwargs['item_paths'])
+        self.assertEqual(sorted(path for shard in shards for path in shard), sorted(units))
+        self.assertTrue(all(shards), 'The two products and the other files are spread over the shards')
+        self.assertEqual(shards, plan(self.src_folder, 3, item_paths=self.create_kwargs['item_paths']))
+
+    def test_map_merge(self):
+        shards = plan(self.src_folder, 3, item_paths=self.create_kwargs['item_paths'])
+        fragment_paths = [os.path.join(self.output_folder, f'fragment{index}') for index in range(len(shards))]
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            fragments = list(executor.map(partial(create_shard, **self.create_kwargs), [self.src_folder] * len(shards),
+                                          shards, fragment_paths))
+        merged_catalog = merge(list(reversed(fragments)), os.path.join(self.output_folder, 'merged'))
+
+        generator = StacCatalogGenerator()
+        catalog = generator.create(self.src_folder, **self.create_kwargs)
+        saved_catalog = pystac.Catalog.from_file(os.path.join(self.output_folder, 'merged', 'catalog.json'))
+        for merged in [merged_catalog, saved_catalog]:
+            self.assertEqual(sorted(child.id for child in merged.get_children()),
+                             sorted(child.id for child in catalog.get_children()))
+            self.assertEqual(sorted(item.id for item in merged.get_all_items()),
+                             sorted(item.id for item in catalog.get_all_items()))
+        self.assertEqual([item.id for item in saved_catalog.get_child('sentinel-1').get_items()],
+                         sorted(self.product_names))
+
+        collection = catalog.get_child('sentinel-1')
+        merged_collection = saved_catalog.get_child('sentinel-1')
+        self.assertEqual(merged_collection.extent.spatial.bboxes, collection.extent.spatial.bboxes)
+        self.assertEqual(merged_collection.extent.temporal.intervals, collection.extent.temporal.intervals)
+        self.assertEqual(sorted(merged_collection.summaries.get_list('sar:product_type')), ['GRD', 'SLC'])
+        self.assertEqual(merged_collection.summaries.get_list('eo:bands'), collection.summaries.get_list('eo:bands'))
+
+
+class TestCreateJournal(TestCaseConfig):
+    def setUp(self) -> None:
+        self.output_folder = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.output_folder, 'journal.jsonl')
+        # Products are replayed too, only the Landsat product can not be read without network access
+        self.ignore_paths = [f'{self.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1',
+                             f'{self.src_path}/cube']
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_folder)
+
+    def saved_files(self, catalog_path):
+        saved_files = {}
+        for folder, _, file_names in os.walk(catalog_path):
+            for file_name in file_names:
+                with open(os.path.join(folder, file_name), 'rb') as saved_file:
+                    saved_files[os.path.relpath(os.path.join(folder, file_name), catalog_path)] = saved_file.read()
+        return saved_files
+
+    def test_resume(self):
+        generator = StacCatalogGenerator()
+        generator.create(self.src_path, ignore_paths=self.ignore_paths)
+        generator.save(os.path.join(self.output_folder, 'expected'))
+
+        generator.create(self.src_path, ignore_paths=self.ignore_paths, journal_path=self.journal_path)
+        with open(self.journal_path, 'rb') as journal_file:
+            lines = journal_file.read().splitlines()
+        # Interrupted run: the last unit was being written
+        with open(self.journal_path, 'wb') as journal_file:
+            journal_file.write(b'\n'.join(lines[:-2]) + b'\n' + lines[-2][:20])
+
+        journal = CreateJournal(self.journal_path)
+        self.assertIsNone(journal.replay(os.path.join(self.src_path, 'test.png')), 'Cut and missing units are run')
+        journal.close()
+
+        generator.create(self.src_path, ignore_paths=self.ignore_paths, journal_path=self.journal_path)
+        generator.save(os.path.join(self.output_folder, 'resumed'))
+        self.assertEqual(self.saved_files(os.path.join(self.output_folder, 'resumed')),
+                         self.saved_files(os.path.join(self.output_folder, 'expected')))
+        with open(self.journal_path, 'rb') as journal_file:
+            compacted_lines = journal_file.read().splitlines()
+        self.assertEqual(len(compacted_lines), len(lines))
+        self.assertEqual(sorted(json.loads(line)['path'] for line in compacted_lines),
+                         sorted(json.loads(line)['path'] for line in lines))
+
+    def test_changed_unit(self):
+        src_folder = os.path.join(self.output_folder, 'src')
+        os.makedirs(src_folder)
+        shutil.copy(os.path.join(self.src_path, 'test.png'), os.path.join(src_folder, 'test.png'))
+        StacCatalogGenerator().create(src_folder, journal_path=self.journal_path)
+
+        journal = CreateJournal(self.journal_path)
+        items = journal.replay(os.path.join(src_folder, 'test.png'))
+        self.assertEqual([item.id for item in items], ['test.png'])
+        journal.close()
+
+        shutil.copy(os.path.join(self.src_path, 'test.jpg'), os.path.join(src_folder, 'test.png'))
+        journal = CreateJournal(self.journal_path)
+        self.assertIsNone(journal.replay(os.path.join(src_folder, 'test.png')), 'Changed files are read again')
+        journal.close()
+
+
+class TestAsyncGeneration(TestCaseConfig):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ignore_paths = [f'{cls.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1',
+                            f'{cls.src_path}/cube']
+
+    def test_acreate(self):
+        catalog = asyncio.run(StacCatalogGenerator().acreate(self.src_path, ignore_paths=self.ignore_paths))
+        expected_catalog = StacCatalogGenerator().create(self.src_path, ignore_paths=self.ignore_paths)
+        self.assertEqual(sorted(item.id for item in catalog.get_all_items()),
+                         sorted(item.id for item in expected_catalog.get_all_items()))
+
+    def test_astream_items(self):
+        generator = StacCatalogGenerator()
+
+        async def consume():
+            return [item.id async for item in generator.astream_items(self.src_path, max_pending=1,
+                                                                       ignore_paths=self.ignore_paths)]
+
+        item_ids = asyncio.run(consume())
+        expected_catalog = StacCatalogGenerator().create(self.src_path, ignore_paths=self.ignore_paths)
+        self.assertEqual(sorted(item_ids), sorted(item.id for item in expected_catalog.get_all_items()))
+
+    def test_cancel(self):
+        generator = StacCatalogGenerator()
+
+        async def consume_first_item():
+            items = generator.astream_items(self.src_path, max_pending=1, ignore_paths=self.ignore_paths)
+            async for item in items:
+                await items.aclose()
+                return item
+
+        self.assertIsInstance(asyncio.run(consume_first_item()), pystac.Item)
+
+        async def cancel_create():
+            task = asyncio.create_task(generator.acreate(self.src_path, ignore_paths=self.ignore_paths))
+            await asyncio.sleep(0)
+            task.cancel()
+            await task
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(cancel_create())
+
+
+class TestConcurrentWalk(TestCaseConfig):
+    @staticmethod
+    def catalog_structure(catalog):
+        return [(container.id, [link.target.id for link in container.links if link.rel in ('child', 'item')],
+                 list(getattr(container, 'assets', {}))) for container, _, _ in catalog.walk()]
+
+    def test_same_catalog(self):
+        ignore_paths = [f'{self.src_path}/products/LE07_L2SP_114034_20230330_20230424_02_T1']
+        kwargs = {'ignore_paths': ignore_paths, 'collection_paths': [f'{self.src_path}/logs'],
+                  'item_paths': [f'{self.src_path}/logs/extra_logs']}
+        catalog = StacCatalogGenerator().create(self.src_path, **kwargs)
+        with self.assertLogs('StacCatalogGenerator', level='INFO') as logs:
+            concurrent_catalog = StacCatalogGenerator().create(self.src_path, walk_workers=4, **kwargs)
+        self.assertEqual(self.catalog_structure(concurrent_catalog), self.catalog_structure(catalog))
+        self.assertTrue(any('folders listed at' in message for message in logs.output))
+
+    def test_lister(self):
+        lister = ConcurrentLister(2, ignore_paths=[f'{self.src_path}/cube'], max_prefetched=2)
+        try:
+            dir_entries = lister.list(self.src_path)
+            self.assertEqual(sorted(dir_entry.name for dir_entry in dir_entries), sorted(os.listdir(self.src_path)))
+            products_path = os.path.join(self.src_path, 'products')
+            self.assertEqual(sorted(dir_entry.name for dir_entry in lister.list(products_path)),
+                             sorted(os.listdir(products_path)))
+            self.assertGreaterEqual(lister.listed, 2)
+        finally:
+            lister.close()
+
+    def test_lister_discard(self):
+        root_path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root_path, 'product', 'measurement', 'data'))
+        lister = ConcurrentLister(1)
+        try:
+            lister.list(root_path)
+            deadline = time.monotonic() + 10
+            while lister.listed < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            lister.discard(os.path.join(root_path, 'product'))
+            self.assertEqual(lister.prefetched, 0, 'The listings under a discarded folder are discarded')
+            self.assertEqual([dir_entry.name for dir_entry in lister.list(os.path.join(root_path, 'product'))],
+                             ['measurement'])
+        finally:
+            lister.close()
+            shutil.rmtree(root_path)
+
+
+class TestConcurrentRuns(TestCaseConfig):
+    def setUp(self) -> None:
+        self.output_folder = tempfile.mkdtemp()
+        self.product_paths = [os.path.join(self.src_path, 'products', product_name) for product_name in [
+            'S1B_IW_GRDH_1SDV_20210702T170603_20210702T170628_027618_034BD8_9A9B.SAFE',
+            'S2A_MSIL2A_20230121T075231_N0509_R135_T37QED_20230121T110753.SAFE',
+        ]]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_folder)
+
+    def test_shared_generator(self):
+        generator = StacCatalogGenerator()
+
+        def generate(product_path):
+            run = generator.create_run(product_path, catalog_name=os.path.basename(product_path))
+            catalog_path = os.path.join(self.output_folder, os.path.basename(product_path))
+            generator.save(catalog_path, run=run)
+            return pystac.Catalog.from_file(os.path.join(catalog_path, 'catalog.json')), run.catalog
+
+        with ThreadPoolExecutor(max_workers=len(self.product_paths)) as executor:
+            results = list(executor.map(generate, self.product_paths * 2))
+        for product_path, (saved_catalog, catalog) in zip(self.product_paths * 2, results):
+            self.assertEqual(saved_catalog.id, os.path.basename(product_path))
+            self.assertEqual([item.id for item in saved_catalog.get_all_items()],
+                             [item.id for item in catalog.get_all_items()])
+        self.assertIsNone(generator.current_run, 'The runs of the threads are not the run of this thread')
+
+    def test_explicit_run(self):
+        generator = StacCatalogGenerator()
+        first_run = generator.create_run(self.product_paths[0])
+        second_run = generator.create_run(self.product_paths[1])
+        self.assertIsNone(generator.current_run, 'The runs of create_run are not kept as the current run')
+        catalog = generator.create(self.product_paths[1])
+        generator.save(os.path.join(self.output_folder, 'first'), run=first_run)
+        self.assertIs(generator.current_run.catalog, catalog, 'The current run is restored after save')
+        self.assertIsNot(generator.current_run, second_run)
+        catalog = pystac.Catalog.from_file(os.path.join(self.output_folder, 'first', 'catalog.json'))
+        self.assertEqual([item.id for item in catalog.get_all_items()],
+                         [item.id for item in first_run.catalog.get_all_items()])
+
+    def test_pool_thread_jobs(self):
+        generator = StacCatalogGenerator()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            catalog = executor.submit(generator.create, self.product_paths[0]).result()
+            self.assertIsNotNone(catalog)
+            self.assertIsNone(executor.submit(lambda: generator.current_run).result(),
+                              'The next job of the thread does not inherit the run of the previous one')
+            with self.assertLogs('StacCatalogGenerator', level='ERROR'):
+                executor.submit(generator.save, os.path.join(self.output_folder, 'other_job')).result()
+        self.assertFalse(os.path.exists(os.path.join(self.output_folder, 'other_job')))
+
+    def test_runs_released(self):
+        def generate(product_path):
+            return weakref.ref(StacCatalogGenerator().create(product_path))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            catalogs = list(executor.map(generate, self.product_paths * 3))
+            gc.collect()
+            self.assertEqual([catalog() for catalog in catalogs], [None] * len(catalogs),
+                             'The runs of the released generators are released by the live worker thread')
+
+    def test_async_runs(self):
+        generator = StacCatalogGenerator(executor=ThreadPoolExecutor(max_workers=2))
+
+        async def generate(product_path):
+            catalog = await generator.acreate(product_path)
+            self.assertIs(generator.current_run.catalog, catalog, 'Each asyncio task has its current run')
+            return catalog
+
+        async def generate_all():
+            return await asyncio.gather(*(generate(product_path) for product_path in self.product_paths))
+
+        catalogs = asyncio.run(generate_all())
+        self.assertEqual([len(list(catalog.get_all_items())) for catalog in catalogs], [1, 1])
+        generator.executor.shutdown()